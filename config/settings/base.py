@@ -64,9 +64,11 @@ TEMPLATES = [
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
+                'django.template.context_processors.i18n',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'renovation.context_processors.admin_dashboard_stats',
+                'renovation.context_processors.property_data_version',
             ],
         },
     },
@@ -74,6 +76,15 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Cache (local memory by default, e.g. CACHE_URL=rediscache://127.0.0.1:6379/1 in production)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Rendered template fragments are keyed by property data version, so stale
+# entries are never served and simply expire after this many seconds
+FRAGMENT_CACHE_TIMEOUT = env.int('FRAGMENT_CACHE_TIMEOUT', default=60 * 60 * 24)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -116,9 +127,14 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
 # WhiteNoise configuration
+# Vendored assets live in static/vendor/. The manifest storage fingerprints them,
+# so WhiteNoise serves them with far-future immutable cache headers, and the
+# compressed variants are precomputed (Brotli when installed, gzip otherwise).
+# Uploaded photos and receipts are stored by content hash, so identical files
+# are kept once (run `manage.py rebuild_stored_files` after upgrading).
 STORAGES = {
     "default": {
-        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "BACKEND": "renovation.storage.ContentAddressedStorage",
     },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
@@ -130,6 +146,14 @@ MEDIA_URL = '/media/'
 # Store media files on D: drive to save space on C:
 MEDIA_ROOT = Path('D:/renovation-tracker-media')
 
+# Media is only served to the owner of the record using it (renovation/media.py).
+# After the access check the front web server sends the file:
+#   'nginx'  - X-Accel-Redirect to MEDIA_ACCEL_PREFIX, an `internal` location aliasing MEDIA_ROOT
+#   'apache' - X-Sendfile with the absolute file path (mod_xsendfile, also lighttpd)
+#   ''       - no proxy: FileResponse, sent with sendfile() by gunicorn's wsgi.file_wrapper
+MEDIA_SERVER = env('MEDIA_SERVER', default='')
+MEDIA_ACCEL_PREFIX = env('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+
 # Authentication
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
@@ -17,9 +17,9 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from django.conf.urls.i18n import i18n_patterns
 from django.views.i18n import set_language
+from renovation.views import media_file
 
 # Customize admin site headers
 admin.site.site_header = 'Panel Administracyjny Remontu'
@@ -28,13 +28,11 @@ admin.site.index_title = 'Zarządzanie remontem'
 
 urlpatterns = [
     path('i18n/setlang/', set_language, name='set_language'),
+    # Uploads are access-checked in every environment (no static() media serving)
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", media_file, name='media_file'),
 ]
 
 urlpatterns += i18n_patterns(
     path('admin/', admin.site.urls),
     path('', include('renovation.urls')),
 )
-
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,3 +1,4 @@
+from django import forms
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
@@ -10,10 +11,13 @@ from .models import (
     PurchaseCategory,
     Purchase,
     Room,
+    RoomWallFinish,
     RoomProgress,
     RoomProgressPhoto,
     WorkSession,
-    ElectricalCircuit
+    ElectricalCircuit,
+    Vendor,
+    VendorAlias
 )
 
 
@@ -122,6 +126,28 @@ class PurchaseCategoryAdmin(admin.ModelAdmin):
     get_total_spent.short_description = _('Suma wydatków')
 
 
+class VendorAliasInline(admin.TabularInline):
+    model = VendorAlias
+    extra = 1
+    fields = ['alias']
+
+
+@admin.register(Vendor)
+class VendorAdmin(admin.ModelAdmin):
+    list_display = ['name', 'normalized_name', 'get_purchase_count', 'created_at']
+    search_fields = ['name', 'normalized_name', 'aliases__alias']
+    readonly_fields = ['normalized_name', 'created_at']
+    inlines = [VendorAliasInline]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(purchase_count=Count('purchases'))
+
+    def get_purchase_count(self, obj):
+        return obj.purchase_count
+    get_purchase_count.short_description = _('Liczba zakupów')
+    get_purchase_count.admin_order_field = 'purchase_count'
+
+
 # Purchase admin removed - use custom form at /purchases/add/ instead
 # @admin.register(Purchase)
 # class PurchaseAdmin(admin.ModelAdmin):
@@ -152,16 +178,50 @@ class ElectricalCircuitInline(admin.TabularInline):
     show_change_link = True
 
 
+class WallFinishFilter(admin.SimpleListFilter):
+    title = _('Wykończenie ścian')
+    parameter_name = 'finish'
+
+    def lookups(self, request, model_admin):
+        labels = Room.wall_finish_labels()
+        finishes = RoomWallFinish.objects.values_list('finish', flat=True).distinct().order_by('finish')
+        return [(finish, labels.get(finish, finish)) for finish in finishes]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(wall_finishes__finish=self.value())
+        return queryset
+
+
+class RoomWallFinishForm(forms.ModelForm):
+    # Same choices as the room form (configurable dropdown)
+    finish = forms.ChoiceField(choices=Room.wall_finish_choices, label=_('Wykończenie ścian'))
+
+    class Meta:
+        model = RoomWallFinish
+        fields = ['finish']
+
+
+class RoomWallFinishInline(admin.TabularInline):
+    model = RoomWallFinish
+    form = RoomWallFinishForm
+    extra = 0
+
+
 @admin.register(Room)
 class RoomAdmin(admin.ModelAdmin):
-    list_display = ['get_name_display_custom', 'square_meters', 'get_progress_count', 'get_circuit_count', 'created_at']
+    list_display = ['get_name_display_custom', 'square_meters', 'floor_area', 'wall_area', 'get_progress_count', 'get_circuit_count', 'created_at']
     search_fields = ['name', 'description']
-    readonly_fields = ['created_at', 'get_progress_count', 'get_circuit_count', 'get_work_sessions_count']
-    inlines = [ElectricalCircuitInline]
+    readonly_fields = [
+        'floor_area', 'wall_area', 'volume', 'created_at', 'get_progress_count', 'get_circuit_count',
+        'get_work_sessions_count',
+    ]
+    list_filter = [WallFinishFilter]
+    inlines = [RoomWallFinishInline, ElectricalCircuitInline]
 
     fieldsets = (
         (_('Podstawowe informacje'), {
-            'fields': ('name', 'square_meters', 'description')
+            'fields': ('name', 'square_meters', 'floor_area', 'wall_area', 'volume', 'description')
         }),
         (_('Statystyki'), {
             'fields': ('get_progress_count', 'get_circuit_count', 'get_work_sessions_count'),
@@ -179,14 +239,12 @@ class RoomAdmin(admin.ModelAdmin):
     get_name_display_custom.admin_order_field = 'name'
 
     def get_progress_count(self, obj):
-        count = obj.progress_entries.count()
         url = reverse('admin:renovation_roomprogress_changelist') + f'?room__id__exact={obj.id}'
-        return format_html('<a href="{}">{} wpisów</a>', url, count)
+        return format_html('<a href="{}">{} wpisów</a>', url, obj.progress_count)
     get_progress_count.short_description = _('Postępy prac')
 
     def get_circuit_count(self, obj):
-        count = obj.circuits.count()
-        return format_html('<strong>{}</strong>', count)
+        return format_html('<strong>{}</strong>', obj.circuit_count)
     get_circuit_count.short_description = _('Obwody elektryczne')
 
     def get_work_sessions_count(self, obj):
@@ -6,3 +6,6 @@ class RenovationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'renovation'
     verbose_name = _('Remont')
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,153 @@
+"""
+ZIP archive of every progress photo, equipment photo and receipt of a property,
+streamed as it is generated.
+
+The archive is written into a small in-memory buffer that is emptied after
+every chunk, so memory use does not depend on the number or size of the files
+and nothing is written to disk. Already-compressed images are stored as is.
+"""
+import os
+import zipfile
+from collections import namedtuple
+from datetime import datetime
+
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from django.utils.translation import gettext as _
+
+from .models import Purchase, RoomProgressPhoto, Equipment, EquipmentPhoto, EquipmentAssignment
+
+
+CHUNK_SIZE = 64 * 1024
+
+# Compressing these again costs CPU and saves nothing
+STORED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.heif'}
+
+ArchiveEntry = namedtuple('ArchiveEntry', ['path', 'file', 'date_time'])
+
+
+def _name(*parts):
+    """Safe file or folder name made of the given parts"""
+    return get_valid_filename('_'.join(str(part) for part in parts if part)) or 'plik'
+
+
+def _date_time(value):
+    if isinstance(value, datetime):
+        value = timezone.localtime(value) if timezone.is_aware(value) else value
+        return max(value.timetuple()[:6], (1980, 1, 1, 0, 0, 0))
+    return max((value.year, value.month, value.day, 0, 0, 0), (1980, 1, 1, 0, 0, 0))
+
+
+def _extension(field_file):
+    return os.path.splitext(field_file.name)[1].lower()
+
+
+def property_archive_entries(property_obj):
+    """Files of a property with their paths in the archive, read lazily from the database"""
+    photos = RoomProgressPhoto.objects.filter(property=property_obj).select_related(
+        'progress__room'
+    ).order_by('progress__room', 'progress__date', 'pk')
+    for photo in photos.iterator(chunk_size=500):
+        progress = photo.progress
+        folder = f"{_('Pomieszczenia')}/{_name(progress.room.get_display_name())}/{progress.date:%Y-%m-%d}"
+        yield ArchiveEntry(
+            f"{folder}/{_name(photo.pk, photo.caption)}{_extension(photo.photo)}",
+            photo.photo,
+            _date_time(photo.uploaded_at)
+        )
+
+    purchases = Purchase.objects.filter(property=property_obj).exclude(receipt_photo='').exclude(
+        receipt_photo__isnull=True
+    ).order_by('date', 'pk')
+    for purchase in purchases.iterator(chunk_size=500):
+        folder = f"{_('Paragony')}/{purchase.date:%Y-%m}"
+        yield ArchiveEntry(
+            f"{folder}/{_name(purchase.date.isoformat(), purchase.vendor, purchase.amount, purchase.pk)}"
+            f"{_extension(purchase.receipt_photo)}",
+            purchase.receipt_photo,
+            _date_time(purchase.date)
+        )
+
+    assigned = EquipmentAssignment.objects.filter(assigned_property=property_obj).values('equipment_id')
+    equipment_items = Equipment.objects.filter(pk__in=assigned).order_by('name', 'pk')
+    for equipment in equipment_items.iterator(chunk_size=500):
+        folder = f"{_('Sprzęt')}/{_name(equipment.name, equipment.pk)}"
+        if equipment.receipt_photo:
+            yield ArchiveEntry(
+                f"{folder}/{_name(_('paragon'))}{_extension(equipment.receipt_photo)}",
+                equipment.receipt_photo,
+                _date_time(equipment.purchase_date or equipment.created_at)
+            )
+        for photo in EquipmentPhoto.objects.filter(equipment=equipment).order_by('uploaded_at', 'pk'):
+            yield ArchiveEntry(
+                f"{folder}/{_name(f'{photo.uploaded_at:%Y-%m-%d}', photo.pk, photo.caption)}{_extension(photo.photo)}",
+                photo.photo,
+                _date_time(photo.uploaded_at)
+            )
+
+
+class ZipStream:
+    """Write-only file object collecting what ZipFile writes until it is drained"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def write_member(archive, stream, info, chunks, force_zip64=False):
+    """Write one archive member from an iterable of byte chunks, yielding the archive bytes"""
+    with archive.open(info, 'w', force_zip64=force_zip64) as target:
+        for chunk in chunks:
+            target.write(chunk)
+            data = stream.drain()
+            if data:
+                yield data
+    # Data descriptor written when the member is closed
+    yield stream.drain()
+
+
+def compress_type(path):
+    if os.path.splitext(path)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def stream_zip(entries, skipped=None):
+    """
+    Yield the bytes of a ZIP archive of the given entries. Files missing from
+    storage are left out (and appended to `skipped` when a list is given).
+    """
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, 'w', allowZip64=True) as archive:
+        for entry in entries:
+            try:
+                source = entry.file.storage.open(entry.file.name, 'rb')
+            except OSError:
+                if skipped is not None:
+                    skipped.append(entry.path)
+                continue
+
+            info = zipfile.ZipInfo(entry.path, date_time=entry.date_time)
+            info.compress_type = compress_type(entry.path)
+            with source:
+                yield from write_member(
+                    archive, stream, info, source.chunks(CHUNK_SIZE),
+                    force_zip64=source.size >= zipfile.ZIP64_LIMIT
+                )
+    # Central directory written when the archive is closed
+    yield stream.drain()
+
+
+def archive_filename(property_obj):
+    return f"{_name(property_obj.name)}_{timezone.localdate():%Y-%m-%d}.zip"
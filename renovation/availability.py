@@ -0,0 +1,82 @@
+"""
+Where equipment is on a given day and what is free in a date range.
+
+An assignment covers the half-open period [start_date, end_date): equipment
+released on a day is free again that day, and an open assignment runs
+indefinitely. The database rejects overlapping periods of the same equipment
+(migration 0016). On PostgreSQL the periods are compared as daterange values,
+so the queries below are answered from the GiST indexes on
+(equipment_id, period) and (assigned_property_id, period).
+"""
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import BooleanField, DateField, F, Field, Func, Prefetch, Q, Value
+from django.db.models.functions import Cast
+
+from .models import Equipment, EquipmentAssignment
+
+
+class Period(Func):
+    """daterange(start, end, '[)') on PostgreSQL, matching the indexed expression"""
+    function = 'daterange'
+    template = "%(function)s(%(expressions)s, '[)')"
+    output_field = Field()
+
+
+class Overlaps(Func):
+    arg_joiner = ' && '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+def _overlapping(start, end):
+    """Filter for assignments whose period overlaps [start, end); end None is open-ended"""
+    if connection.vendor == 'postgresql':
+        return Overlaps(
+            Period(F('start_date'), F('end_date')),
+            Period(Cast(Value(start), DateField()), Cast(Value(end), DateField())),
+        )
+
+    condition = (Q(end_date__isnull=True) | Q(end_date__gt=start)) & (
+        Q(end_date__isnull=True) | Q(end_date__gt=F('start_date'))
+    )
+    if end is not None:
+        condition &= Q(start_date__lt=end)
+    return condition
+
+
+def assignments_during(start, end=None):
+    """Assignments that hold their equipment at some point of [start, end)"""
+    return EquipmentAssignment.objects.filter(_overlapping(start, end))
+
+
+def assignments_on(day):
+    return assignments_during(day, day + timedelta(days=1))
+
+
+def equipment_at(property_obj, day):
+    """Equipment assigned to the property on the given day"""
+    assigned = assignments_on(day).filter(assigned_property=property_obj).values('equipment_id')
+    return Equipment.objects.filter(pk__in=assigned)
+
+
+def free_equipment(owner, start, end=None):
+    """The owner's equipment (not sold) that is not assigned anywhere during [start, end)"""
+    busy = assignments_during(start, end).values('equipment_id')
+    return Equipment.objects.filter(owner=owner, is_sold=False).exclude(pk__in=busy)
+
+
+def equipment_availability(owner, start, end=None, property_obj=None):
+    """
+    The owner's equipment with the assignments overlapping [start, end) prefetched
+    as `busy_assignments`. With a property, only equipment assigned there during
+    the period is returned.
+    """
+    busy = assignments_during(start, end).select_related('assigned_property').order_by('start_date')
+    equipment = Equipment.objects.filter(owner=owner)
+    if property_obj is not None:
+        equipment = equipment.filter(pk__in=busy.filter(assigned_property=property_obj).values('equipment_id'))
+    return equipment.prefetch_related(
+        Prefetch('assignments', queryset=busy, to_attr='busy_assignments')
+    ).order_by('name', 'pk')
@@ -0,0 +1,453 @@
+"""
+Property export/import bundles for backups and moving a property between
+deployments.
+
+A bundle is a ZIP archive with:
+    manifest.json            format version and what the bundle contains
+    data/<model>.jsonl       one JSON object per record: {"id": ..., "fields": {...}}
+    media/manifest.jsonl     one line per file: {"name", "path", "sha256", "size"}
+    media/<name>             photos and receipts, each file once
+
+The export is streamed while it is generated. The import stores the media
+first, then inserts the records with batched bulk_create inside one transaction,
+mapping the IDs of the source deployment onto new ones.
+"""
+import hashlib
+import io
+import json
+import os
+import zipfile
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import images, room_counters, search, uploads, vendors
+from .archives import CHUNK_SIZE, ZipStream, archive_filename, compress_type, write_member
+from .models import (
+    Property,
+    PropertyDataVersion,
+    Purchase,
+    PurchaseCategory,
+    MonthlySpend,
+    Room,
+    RoomWallFinish,
+    RoomProgress,
+    RoomProgressPhoto,
+    WorkSession,
+    ElectricalCircuit,
+    RenovationTask,
+    ShoppingItem,
+)
+
+
+BUNDLE_FORMAT = 'renovation-tracker-bundle'
+BUNDLE_VERSION = 1
+
+BATCH_SIZE = 500
+
+# Buffer this much JSONL before handing it to the archive
+JSONL_CHUNK_SIZE = 64 * 1024
+
+
+class BundleError(ValueError):
+    """The file is not a bundle this version can import"""
+
+
+BundleModel = namedtuple('BundleModel', ['key', 'model', 'records', 'foreign_keys'])
+
+
+# In dependency order. records(property) -> queryset of the property's records;
+# foreign_keys: FK attname -> bundle key of the referenced model. Other relations
+# are not exported: the owner is the importing user and normalized vendors are
+# resolved again on import.
+BUNDLE_MODELS = [
+    BundleModel('property', Property, lambda p: Property.objects.filter(pk=p.pk), {}),
+    BundleModel('rooms', Room, lambda p: Room.objects.filter(property=p), {'property_id': 'property'}),
+    BundleModel(
+        'wall_finishes', RoomWallFinish, lambda p: RoomWallFinish.objects.filter(room__property=p), {'room_id': 'rooms'}
+    ),
+    BundleModel('purchases', Purchase, lambda p: Purchase.objects.filter(property=p), {'property_id': 'property'}),
+    BundleModel(
+        'progress', RoomProgress, lambda p: RoomProgress.objects.filter(property=p),
+        {'room_id': 'rooms', 'property_id': 'property'}
+    ),
+    BundleModel(
+        'progress_photos', RoomProgressPhoto, lambda p: RoomProgressPhoto.objects.filter(property=p),
+        {'progress_id': 'progress', 'property_id': 'property'}
+    ),
+    BundleModel(
+        'sessions', WorkSession, lambda p: WorkSession.objects.filter(related_property=p),
+        {'related_property_id': 'property'}
+    ),
+    BundleModel('circuits', ElectricalCircuit, lambda p: ElectricalCircuit.objects.filter(room__property=p), {'room_id': 'rooms'}),
+    BundleModel(
+        'tasks', RenovationTask, lambda p: RenovationTask.objects.filter(related_property=p),
+        {'related_property_id': 'property', 'room_id': 'rooms'}
+    ),
+    BundleModel(
+        'shopping_items', ShoppingItem, lambda p: ShoppingItem.objects.filter(related_property=p),
+        {'related_property_id': 'property', 'room_id': 'rooms'}
+    ),
+]
+
+# Shared lookup tables are referenced by a unique field instead of their ID
+NATURAL_KEYS = {PurchaseCategory: 'name'}
+
+
+def _exported_fields(spec):
+    """Concrete fields written to the bundle (relations only where the bundle can map them)"""
+    fields = []
+    for field in spec.model._meta.concrete_fields:
+        if field.primary_key or field.generated:
+            # Generated columns are computed by the database and cannot be inserted
+            continue
+        if field.is_relation and field.attname not in spec.foreign_keys and field.related_model not in NATURAL_KEYS:
+            continue
+        fields.append(field)
+    return fields
+
+
+def _file_fields(spec):
+    return [field for field in _exported_fields(spec) if hasattr(field, 'upload_to')]
+
+
+# Export
+
+def _record(spec, fields, instance, natural_keys):
+    values = {}
+    for field in fields:
+        if field.is_relation and field.related_model in NATURAL_KEYS:
+            values[field.name] = natural_keys[field.related_model].get(getattr(instance, field.attname))
+        elif hasattr(field, 'upload_to'):
+            values[field.attname] = getattr(instance, field.attname).name or ''
+        else:
+            values[field.attname] = field.value_from_object(instance)
+    record = {'id': instance.pk, 'fields': values}
+    if spec.model is WorkSession:
+        record['rooms'] = [room.pk for room in instance.rooms_worked_on.all()]
+    return record
+
+
+def _jsonl_chunks(spec, property_obj, natural_keys, media_names):
+    fields = _exported_fields(spec)
+    file_fields = _file_fields(spec)
+    records = spec.records(property_obj).order_by('pk')
+    if spec.model is WorkSession:
+        records = records.prefetch_related('rooms_worked_on')
+
+    buffer = []
+    size = 0
+    for instance in records.iterator(chunk_size=BATCH_SIZE):
+        for field in file_fields:
+            name = getattr(instance, field.attname).name
+            if name:
+                media_names.add(name)
+        line = json.dumps(_record(spec, fields, instance, natural_keys), cls=DjangoJSONEncoder, ensure_ascii=False)
+        buffer.append(line + '\n')
+        size += len(line)
+        if size >= JSONL_CHUNK_SIZE:
+            yield ''.join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def _hashed_chunks(source, digest):
+    for chunk in source.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+        yield chunk
+
+
+def _member(path):
+    info = zipfile.ZipInfo(path, date_time=timezone.localtime().timetuple()[:6])
+    info.compress_type = compress_type(path)
+    return info
+
+
+def stream_bundle(property_obj, skipped=None):
+    """
+    Yield the bytes of the property's bundle. Media missing from storage is left
+    out (and appended to `skipped` when a list is given).
+    """
+    natural_keys = {
+        model: dict(model.objects.values_list('pk', field)) for model, field in NATURAL_KEYS.items()
+    }
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'version': BUNDLE_VERSION,
+        'exported_at': timezone.now().isoformat(),
+        'property': property_obj.name,
+        'models': [spec.key for spec in BUNDLE_MODELS],
+    }
+
+    stream = ZipStream()
+    media_names = set()
+    with zipfile.ZipFile(stream, 'w', allowZip64=True) as archive:
+        yield from write_member(archive, stream, _member('manifest.json'), [json.dumps(manifest, indent=2).encode()])
+
+        for spec in BUNDLE_MODELS:
+            yield from write_member(
+                archive, stream, _member(f'data/{spec.key}.jsonl'),
+                _jsonl_chunks(spec, property_obj, natural_keys, media_names),
+                force_zip64=True
+            )
+
+        media_manifest = []
+        for name in sorted(media_names):
+            try:
+                source = default_storage.open(name, 'rb')
+            except OSError:
+                if skipped is not None:
+                    skipped.append(name)
+                continue
+            digest = hashlib.sha256()
+            path = f'media/{name}'
+            with source:
+                yield from write_member(
+                    archive, stream, _member(path), _hashed_chunks(source, digest),
+                    force_zip64=source.size >= zipfile.ZIP64_LIMIT
+                )
+                media_manifest.append({'name': name, 'path': path, 'sha256': digest.hexdigest(), 'size': source.size})
+
+        lines = ''.join(json.dumps(entry) + '\n' for entry in media_manifest)
+        yield from write_member(archive, stream, _member('media/manifest.jsonl'), [lines.encode()])
+    # Central directory written when the archive is closed
+    yield stream.drain()
+
+
+def bundle_filename(property_obj):
+    return archive_filename(property_obj).replace('.zip', '.bundle.zip')
+
+
+# Import
+
+class ImportedBundle:
+    """Outcome of a bundle import"""
+
+    def __init__(self):
+        self.property = None
+        self.counts = {}
+        self.media_files = 0
+        self.media_duplicates = 0
+
+
+class BundleImporter:
+    """
+    Create a copy of a bundled property owned by the given user.
+
+    Every record gets a new ID; foreign keys, room links of work sessions and
+    file names are rewritten with the ID and name mappings built on the way.
+    Derived data that bulk_create does not maintain (spending rollup, data
+    version, search documents, file reference counts, photo derivatives) is
+    refreshed at the end.
+    """
+
+    def __init__(self, owner, batch_size=BATCH_SIZE):
+        self.owner = owner
+        self.batch_size = batch_size
+        self.id_maps = {spec.key: {} for spec in BUNDLE_MODELS}
+        self.file_names = {}
+        self.stored_names = []
+        self.natural_keys = {
+            model: dict(model.objects.values_list(field, 'pk')) for model, field in NATURAL_KEYS.items()
+        }
+        self.vendor_resolver = vendors.VendorResolver()
+
+    def run(self, bundle_file):
+        result = ImportedBundle()
+        try:
+            archive = zipfile.ZipFile(bundle_file)
+        except zipfile.BadZipFile:
+            raise BundleError('Not a ZIP archive')
+
+        with archive:
+            self._check_manifest(archive)
+            try:
+                self._store_media(archive, result)
+                try:
+                    with transaction.atomic():
+                        for spec in BUNDLE_MODELS:
+                            result.counts[spec.key] = self._import_model(archive, spec)
+                        result.property = Property.objects.get(pk=next(iter(self.id_maps['property'].values())))
+                        self._refresh_derived_data(result.property)
+                except BundleError:
+                    raise
+                except (KeyError, TypeError, ValueError, StopIteration, ValidationError, IntegrityError) as exc:
+                    # Records missing fields or keys, or with values the database rejects
+                    raise BundleError(f'Invalid bundle data: {exc!r}')
+            except Exception:
+                # Files only this import stored would be left without a record
+                for name in self.stored_names:
+                    default_storage.delete(name)
+                raise
+
+        self._process_photos()
+        return result
+
+    def _check_manifest(self, archive):
+        try:
+            manifest = json.loads(archive.read('manifest.json'))
+        except (KeyError, ValueError):
+            raise BundleError('The bundle has no valid manifest.json')
+        if not isinstance(manifest, dict) or manifest.get('format') != BUNDLE_FORMAT:
+            raise BundleError('Not a property bundle')
+        version = manifest.get('version')
+        if type(version) is not int or version < 1:
+            raise BundleError(f'Invalid bundle version {version!r}')
+        if version > BUNDLE_VERSION:
+            raise BundleError(f'Bundle version {version} is newer than supported ({BUNDLE_VERSION})')
+
+    def _store_media(self, archive, result):
+        for line in self._lines(archive, 'media/manifest.jsonl'):
+            entry = json.loads(line)
+            try:
+                member = archive.open(entry['path'])
+            except KeyError:
+                raise BundleError(f"Media file {entry['path']} is missing from the bundle")
+            with member:
+                content = File(member, name=os.path.basename(entry['name']))
+                new_name = default_storage.save(os.path.basename(entry['name']), content)
+            if _stored_digest(content, new_name) != entry['sha256']:
+                if not getattr(content, 'is_duplicate', False):
+                    default_storage.delete(new_name)
+                raise BundleError(f"Checksum mismatch for {entry['name']}")
+
+            self.file_names[entry['name']] = new_name
+            result.media_files += 1
+            if getattr(content, 'is_duplicate', False):
+                result.media_duplicates += 1
+            else:
+                self.stored_names.append(new_name)
+
+    def _lines(self, archive, path):
+        try:
+            member = archive.open(path)
+        except KeyError:
+            return
+        with io.TextIOWrapper(member, encoding='utf-8') as lines:
+            for line in lines:
+                if line.strip():
+                    yield line
+
+    def _import_model(self, archive, spec):
+        fields = {field.attname: field for field in _exported_fields(spec)}
+        natural = {field.name: field for field in fields.values() if field.related_model in NATURAL_KEYS}
+        batch = []
+        count = 0
+        for line in self._lines(archive, f'data/{spec.key}.jsonl'):
+            batch.append(json.loads(line))
+            if len(batch) >= self.batch_size:
+                count += self._create(spec, fields, natural, batch)
+                batch = []
+        if batch:
+            count += self._create(spec, fields, natural, batch)
+        return count
+
+    def _instance(self, spec, fields, natural, record):
+        values = {}
+        for name, value in record['fields'].items():
+            if name in natural:
+                values[natural[name].attname] = self._natural_pk(natural[name].related_model, value)
+                continue
+            field = fields.get(name)
+            if field is None:
+                # Not an exported field
+                continue
+            if name in spec.foreign_keys:
+                values[name] = self.id_maps[spec.foreign_keys[name]].get(value) if value is not None else None
+            elif hasattr(field, 'upload_to'):
+                values[name] = self.file_names.get(value, '') if value else value
+            else:
+                values[name] = field.to_python(value)
+
+        instance = spec.model(**values)
+        if spec.model is Property:
+            instance.owner = self.owner
+        if hasattr(instance, 'normalized_vendor_id'):
+            instance.normalized_vendor_id = self.vendor_resolver.resolve(instance.vendor)
+        return instance
+
+    def _natural_pk(self, model, value):
+        if value is None:
+            return None
+        known = self.natural_keys[model]
+        if value not in known:
+            known[value] = model.objects.get_or_create(**{NATURAL_KEYS[model]: value})[0].pk
+        return known[value]
+
+    def _create(self, spec, fields, natural, records):
+        instances = [self._instance(spec, fields, natural, record) for record in records]
+        # bulk_create overwrites auto_now(_add) timestamps; put the exported ones back afterwards
+        timestamp_fields = [
+            field.attname for field in fields.values()
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+        ]
+        timestamps = [{name: getattr(instance, name) for name in timestamp_fields} for instance in instances]
+
+        spec.model.objects.bulk_create(instances, batch_size=self.batch_size)
+
+        for instance, values in zip(instances, timestamps):
+            for name, value in values.items():
+                setattr(instance, name, value)
+        if timestamp_fields:
+            spec.model.objects.bulk_update(instances, timestamp_fields, batch_size=self.batch_size)
+
+        id_map = self.id_maps[spec.key]
+        for record, instance in zip(records, instances):
+            id_map[record['id']] = instance.pk
+
+        if spec.model is WorkSession:
+            through = WorkSession.rooms_worked_on.through
+            room_ids = self.id_maps['rooms']
+            through.objects.bulk_create([
+                through(worksession_id=instance.pk, room_id=room_ids[room_id])
+                for record, instance in zip(records, instances)
+                for room_id in record.get('rooms', []) if room_id in room_ids
+            ], batch_size=self.batch_size)
+        return len(instances)
+
+    def _refresh_derived_data(self, property_obj):
+        """What the model signals would have done for each saved record"""
+        MonthlySpend.rebuild(property_obj.pk)
+        PropertyDataVersion.bump([property_obj.pk])
+        vendors.invalidate_prefix_index([self.owner.pk])
+        room_counters.reconcile(Room.objects.filter(property=property_obj))
+
+        for spec in BUNDLE_MODELS:
+            if spec.model in search.MODEL_KINDS:
+                source = search.SEARCH_SOURCES[search.MODEL_KINDS[spec.model]]
+                imported = spec.model.objects.filter(pk__in=list(self.id_maps[spec.key].values()))
+                search.index_objects(list(imported.select_related(*source.related)), self.batch_size)
+
+            if spec.model in uploads.STORED_FILE_FIELDS:
+                for field in uploads.STORED_FILE_FIELDS[spec.model]:
+                    names = spec.model.objects.filter(
+                        pk__in=list(self.id_maps[spec.key].values())
+                    ).exclude(**{field: ''}).values_list(field, flat=True)
+                    for name in names:
+                        uploads.acquire(spec.model, field, name)
+
+    def _process_photos(self):
+        """Dimensions are imported; this creates the derivatives missing on this deployment"""
+        for spec in BUNDLE_MODELS:
+            if spec.model in images.PHOTO_FIELDS:
+                photos = spec.model.objects.filter(pk__in=list(self.id_maps[spec.key].values()))
+                for photo in photos.iterator(chunk_size=self.batch_size):
+                    images.process_photo(photo, images.PHOTO_FIELDS[spec.model])
+
+
+def _stored_digest(content, name):
+    """SHA-256 of a stored file, as computed by content-addressed storage or read back"""
+    digest = getattr(content, 'sha256', None)
+    if digest:
+        return digest
+    digest = hashlib.sha256()
+    with default_storage.open(name, 'rb') as stored:
+        for chunk in stored.chunks(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,135 @@
+"""
+Per-property data versions used for HTTP conditional GET handling and
+template fragment caching
+"""
+import hashlib
+from datetime import date
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import messages
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.utils import translation
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+
+from .models import PropertyDataVersion
+
+
+def get_property_data_version(request, property_obj):
+    """Get (and memoize on the request) the data version row of a property"""
+    cached = getattr(request, '_property_data_version', None)
+    if cached is None or cached.property_id != property_obj.pk:
+        cached = PropertyDataVersion.for_property(property_obj.pk)
+        request._property_data_version = cached
+    return cached
+
+
+def cache_month():
+    """Month part of fragment keys: "this month" statistics change without any write"""
+    return date.today().strftime('%Y-%m')
+
+
+def fragment_vary_on(request, property_obj):
+    """
+    Vary-on values for property fragments, matching the template usage:
+    {% cache fragment_cache_timeout 'name' current_property.pk data_version LANGUAGE_CODE cache_month %}
+    """
+    version = get_property_data_version(request, property_obj)
+    return [property_obj.pk, version.version, translation.get_language(), cache_month()]
+
+
+def cached_fragments(fragment_names, vary_on):
+    """Return the names of the fragments already rendered into the cache"""
+    keys = {make_template_fragment_key(name, vary_on): name for name in fragment_names}
+    return {keys[key] for key in cache.get_many(list(keys))}
+
+
+def _page_version(request):
+    """
+    Return the data version behind the current property's pages, or None when
+    the response must not be answered from the browser cache.
+    """
+    from .views import get_current_property
+
+    # Queued flash messages are only shown by a full render
+    if len(messages.get_messages(request)):
+        return None
+
+    current_property = get_current_property(request)
+    if not current_property:
+        return None
+    return get_property_data_version(request, current_property)
+
+
+def property_page_etag(request, *args, **kwargs):
+    version = _page_version(request)
+    if version is None:
+        return None
+
+    parts = [
+        request.user.pk,
+        version.property_id,
+        version.version,
+        translation.get_language(),
+        request.session.session_key,
+        # Month-based statistics change without any write
+        date.today().isoformat(),
+    ]
+    return hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def property_page_last_modified(request, *args, **kwargs):
+    version = _page_version(request)
+    return version.updated_at if version else None
+
+
+def _conditional_validators(request):
+    """ETag and Last-Modified timestamp of the page, as the condition decorator computes them"""
+    etag = property_page_etag(request)
+    last_modified = property_page_last_modified(request)
+    return (
+        quote_etag(etag) if etag is not None else None,
+        int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def property_conditional(view_func):
+    """
+    Answer repeat GETs of a property page with 304 Not Modified while nothing
+    in the current property has changed, skipping the queries and rendering.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            # The validators read the session and database, so keep them off the event loop
+            etag, last_modified = await sync_to_async(_conditional_validators)(request)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return async_wrapper
+
+    conditional_view = condition(
+        etag_func=property_page_etag,
+        last_modified_func=property_page_last_modified
+    )(view_func)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        # Let the browser keep the page but always revalidate it
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    return wrapper
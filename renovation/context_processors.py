@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db.models import Sum, Count
+from django.utils.functional import SimpleLazyObject
 from datetime import timedelta
 from .models import Purchase, RoomProgress, RoomProgressPhoto, WorkSession, PurchaseCategory, Room
 
@@ -62,3 +64,29 @@ def admin_dashboard_stats(request):
         'category_spending': category_spending,
         'room_progress': room_progress,
     }
+
+
+def property_data_version(request):
+    """
+    Expose the current property's data version for {% cache %} keys, so
+    fragments are re-rendered only after the property's data changes.
+    """
+
+    def current_version():
+        from .caching import get_property_data_version
+        from .views import get_current_property
+
+        if not request.user.is_authenticated:
+            return ''
+        current_property = get_current_property(request)
+        if not current_property:
+            return ''
+        return get_property_data_version(request, current_property).version
+
+    from .caching import cache_month
+
+    return {
+        'data_version': SimpleLazyObject(current_version),
+        'cache_month': SimpleLazyObject(cache_month),
+        'fragment_cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+    }
@@ -1,4 +1,5 @@
 from django import forms
+from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Submit, Row, Column, Div, HTML, Field
@@ -6,6 +7,17 @@ from crispy_forms.bootstrap import FormActions
 from .models import Purchase, PurchaseCategory, Room, RoomProgress, RoomProgressPhoto, WorkSession, ElectricalCircuit, Property, DropdownChoice, Equipment, EquipmentPhoto, EquipmentAssignment, RenovationTask, ShoppingItem
 
 
+class VendorAutocompleteInput(forms.TextInput):
+    """Free-text vendor input with suggestions fetched from the vendor autocomplete API"""
+
+    def __init__(self, attrs=None):
+        super().__init__({
+            'autocomplete': 'off',
+            'data-vendor-autocomplete': reverse_lazy('vendor_autocomplete'),
+            **(attrs or {}),
+        })
+
+
 class PurchaseForm(forms.ModelForm):
     """Form for adding/editing purchases with beautiful UI"""
 
@@ -14,6 +26,7 @@ class PurchaseForm(forms.ModelForm):
         fields = ['date', 'category', 'vendor', 'amount', 'description', 'notes', 'receipt_photo']
         widgets = {
             'date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+            'vendor': VendorAutocompleteInput(),
             'description': forms.Textarea(attrs={'rows': 3}),
             'notes': forms.Textarea(attrs={'rows': 2}),
         }
@@ -47,6 +60,65 @@ class PurchaseForm(forms.ModelForm):
         )
 
 
+class PurchaseImportForm(forms.Form):
+    """Form for importing purchases from a bank/receipt CSV or XLSX file"""
+
+    file = forms.FileField(
+        label=_('Plik CSV/XLSX'),
+        help_text=_('Wymagane kolumny: data, kwota, sklep. Opcjonalne: opis, kategoria, notatki.')
+    )
+    default_category = forms.ModelChoiceField(
+        queryset=PurchaseCategory.objects.all(),
+        required=False,
+        label=_('Kategoria domyślna'),
+        help_text=_('Używana gdy wiersz nie ma kategorii lub jest ona nieznana')
+    )
+    amount_sign = forms.ChoiceField(
+        choices=[
+            ('negative', _('Wydatki ze znakiem minus (wyciąg bankowy)')),
+            ('positive', _('Wydatki jako kwoty dodatnie (eksport paragonów)')),
+        ],
+        initial='negative',
+        label=_('Znak kwot'),
+        help_text=_('Wiersze z przeciwnym znakiem (wpływy, zwroty) są pomijane i zgłaszane jako błędy')
+    )
+    decimal_separator = forms.ChoiceField(
+        choices=[
+            ('', _('Wykryj automatycznie')),
+            (',', _('Przecinek (1 234,56)')),
+            ('.', _('Kropka (1,234.56)')),
+        ],
+        required=False,
+        label=_('Separator dziesiętny'),
+        help_text=_('Przy wykrywaniu kwoty typu 1.234 są odrzucane jako niejednoznaczne')
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.helper = FormHelper()
+        self.helper.form_method = 'post'
+        self.helper.form_enctype = 'multipart/form-data'
+        self.helper.layout = Layout(
+            Row(
+                Column('file', css_class='form-group col-md-8 mb-3'),
+                Column('default_category', css_class='form-group col-md-4 mb-3'),
+            ),
+            Row(
+                Column('amount_sign', css_class='form-group col-md-6 mb-3'),
+                Column('decimal_separator', css_class='form-group col-md-6 mb-3'),
+            ),
+            FormActions(
+                Submit('submit', _('Importuj zakupy'), css_class='btn btn-primary btn-lg'),
+            )
+        )
+
+    def clean_file(self):
+        uploaded_file = self.cleaned_data['file']
+        if not uploaded_file.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError(_('Obsługiwane są tylko pliki CSV i XLSX.'))
+        return uploaded_file
+
+
 class RoomProgressForm(forms.ModelForm):
     """Form for adding room progress"""
 
@@ -104,6 +176,7 @@ class WorkSessionForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         current_property = kwargs.pop('current_property', None)
         super().__init__(*args, **kwargs)
+        self.session_property = current_property or self.instance.related_property
 
         # Filter rooms by current property
         if current_property:
@@ -130,6 +203,15 @@ class WorkSessionForm(forms.ModelForm):
             )
         )
 
+    def clean_rooms_worked_on(self):
+        rooms = self.cleaned_data['rooms_worked_on']
+        property_ids = {room.property_id for room in rooms}
+        if self.session_property:
+            property_ids.add(self.session_property.pk)
+        if len(property_ids) > 1:
+            raise forms.ValidationError(_('Wszystkie pomieszczenia sesji pracy muszą należeć do jej nieruchomości.'))
+        return rooms
+
 
 class ElectricalCircuitForm(forms.ModelForm):
     """Form for documenting electrical circuits"""
@@ -213,19 +295,17 @@ class RoomForm(forms.ModelForm):
             if floor_choices:
                 self.fields['floor_type'].choices = [('', '---------')] + floor_choices
 
-            wall_finish_choices = DropdownChoice.get_choices_for_type('wall_finish')
-            if wall_finish_choices:
-                self.fields['wall_finishes_multi'].choices = wall_finish_choices
-            else:
-                # Fallback to hardcoded choices if no dynamic choices exist
-                self.fields['wall_finishes_multi'].choices = Room.WALL_FINISH_CHOICES
+            # Configured choices, or the hardcoded ones if none exist
+            self.fields['wall_finishes_multi'].choices = Room.wall_finish_choices()
         except:
             # Fallback to hardcoded choices if DropdownChoice table doesn't exist
             self.fields['wall_finishes_multi'].choices = Room.WALL_FINISH_CHOICES
 
         # Pre-populate wall finishes from stored value
-        if self.instance and self.instance.wall_finishes:
-            self.fields['wall_finishes_multi'].initial = self.instance.wall_finishes.split(',')
+        if self.instance.pk:
+            self.fields['wall_finishes_multi'].initial = list(
+                self.instance.wall_finishes.values_list('finish', flat=True)
+            )
 
         self.helper = FormHelper()
         self.helper.form_method = 'post'
@@ -266,14 +346,10 @@ class RoomForm(forms.ModelForm):
             )
         )
 
-    def save(self, commit=True):
-        instance = super().save(commit=False)
-        # Convert multi-select wall finishes to comma-separated string
-        wall_finishes = self.cleaned_data.get('wall_finishes_multi', [])
-        instance.wall_finishes = ','.join(wall_finishes)
-        if commit:
-            instance.save()
-        return instance
+    def _save_m2m(self):
+        # Wall finishes are rows of their own, saved with the relations once the room exists
+        super()._save_m2m()
+        self.instance.set_wall_finishes(self.cleaned_data.get('wall_finishes_multi', []))
 
 
 class PropertyForm(forms.ModelForm):
@@ -369,6 +445,7 @@ class EquipmentForm(forms.ModelForm):
         widgets = {
             'purpose': forms.Textarea(attrs={'rows': 3}),
             'notes': forms.Textarea(attrs={'rows': 2}),
+            'vendor': VendorAutocompleteInput(),
             'purchase_date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
             'sold_date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
         }
@@ -520,6 +597,7 @@ class ShoppingItemForm(forms.ModelForm):
         fields = ['title', 'description', 'room', 'vendor', 'quantity', 'unit', 'estimated_price', 'status', 'priority']
         widgets = {
             'description': forms.Textarea(attrs={'rows': 3}),
+            'vendor': VendorAutocompleteInput(),
         }
 
     def __init__(self, *args, **kwargs):
@@ -531,15 +609,6 @@ class ShoppingItemForm(forms.ModelForm):
             self.fields['room'].queryset = Room.objects.filter(property=current_property)
             self.fields['room'].required = False
 
-        # Make vendor a dropdown with choices from DropdownChoice
-        vendor_choices = DropdownChoice.get_choices_for_type('vendor')
-        if vendor_choices:
-            self.fields['vendor'] = forms.ChoiceField(
-                choices=[('', '---------')] + vendor_choices,
-                required=False,
-                label=_('Sklep')
-            )
-
         self.helper = FormHelper()
         self.helper.form_method = 'post'
         self.helper.layout = Layout(
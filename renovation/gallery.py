@@ -0,0 +1,139 @@
+"""
+Photo gallery of a property: progress photos and photos of the equipment
+assigned to it, newest first, paginated by keyset on (uploaded_at, id).
+
+Progress photos are read with their (property, uploaded_at, id) index and
+equipment photos with their (uploaded_at, id) index, and the two pages are
+merged, so every page costs two short index range scans no matter how deep
+the user has scrolled.
+"""
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from . import images
+from .models import RoomProgressPhoto, EquipmentPhoto, EquipmentAssignment
+
+
+PAGE_SIZE = 60
+MAX_PAGE_SIZE = 200
+
+# Thumbnails are laid out at least this wide (see static/js/photo-gallery.js)
+THUMBNAIL_MIN_WIDTH = 320
+
+# Rank breaks ties between the two tables for photos uploaded at the same instant
+GallerySource = namedtuple('GallerySource', ['kind', 'rank'])
+
+PROGRESS = GallerySource('progress', 1)
+EQUIPMENT = GallerySource('equipment', 0)
+
+
+def encode_cursor(uploaded_at, rank, pk):
+    raw = json.dumps([uploaded_at.isoformat(), rank, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """(uploaded_at, rank, id) of a cursor; raises ValueError when it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        uploaded_at, rank, pk = json.loads(raw)
+        return datetime.fromisoformat(uploaded_at), int(rank), int(pk)
+    except (TypeError, ValueError, OverflowError, UnicodeDecodeError):
+        raise ValueError('Invalid gallery cursor')
+
+
+def _after_cursor(source, cursor):
+    """Rows of a source that come after the cursor in (uploaded_at, rank, id) descending order"""
+    uploaded_at, rank, pk = cursor
+    if source.rank < rank:
+        return Q(uploaded_at__lte=uploaded_at)
+    if source.rank > rank:
+        return Q(uploaded_at__lt=uploaded_at)
+    return Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, id__lt=pk)
+
+
+def _day_start(day):
+    # In UTC, as the database stores it; raises OverflowError at the edges of the range
+    return timezone.make_aware(datetime.combine(day, time.min)).astimezone(dt_timezone.utc)
+
+
+def upload_range(date_from=None, date_to=None):
+    """
+    Upload time bounds [start, end) covering the given days (None when open);
+    raises ValueError for days at the edge of the datetime range.
+    """
+    try:
+        start = _day_start(date_from) if date_from else None
+        end = _day_start(date_to + timedelta(days=1)) if date_to else None
+    except OverflowError:
+        raise ValueError('Gallery dates out of range')
+    return start, end
+
+
+def _progress_photos(property_obj, room_id):
+    photos = RoomProgressPhoto.objects.filter(property=property_obj).select_related('progress__room')
+    if room_id:
+        photos = photos.filter(progress__room_id=room_id)
+    return photos
+
+
+def _equipment_photos(property_obj):
+    assigned = EquipmentAssignment.objects.filter(assigned_property=property_obj).values('equipment_id')
+    return EquipmentPhoto.objects.filter(equipment_id__in=assigned).select_related('equipment')
+
+
+def _item(source, photo):
+    if source is PROGRESS:
+        title = photo.progress.room.get_display_name()
+        link = reverse('room_detail', args=[photo.progress.room_id])
+    else:
+        title = photo.equipment.name
+        link = reverse('equipment_detail', args=[photo.equipment_id])
+    return {
+        'kind': source.kind,
+        'id': photo.pk,
+        'url': photo.photo.url,
+        'thumbnail': images.thumbnail_url(photo.photo, THUMBNAIL_MIN_WIDTH),
+        'srcset': images.srcset(photo.photo),
+        'width': photo.width,
+        'height': photo.height,
+        'caption': photo.caption,
+        'title': title,
+        'link': link,
+        'uploaded_at': photo.uploaded_at.isoformat(),
+    }
+
+
+def gallery_page(property_obj, room_id=None, uploaded_from=None, uploaded_before=None, cursor=None,
+                 limit=PAGE_SIZE):
+    """
+    One page of the property's photos, newest first, and the cursor of the next
+    page (None on the last one). Equipment photos have no room, so a room filter
+    leaves only progress photos. The upload bounds come from upload_range().
+    """
+    sources = [(PROGRESS, _progress_photos(property_obj, room_id))]
+    if not room_id:
+        sources.append((EQUIPMENT, _equipment_photos(property_obj)))
+
+    rows = []
+    for source, photos in sources:
+        # Datetime bounds (not __date) keep the uploaded_at index usable
+        if uploaded_from:
+            photos = photos.filter(uploaded_at__gte=uploaded_from)
+        if uploaded_before:
+            photos = photos.filter(uploaded_at__lt=uploaded_before)
+        if cursor:
+            photos = photos.filter(_after_cursor(source, cursor))
+        rows.extend((photo.uploaded_at, source.rank, photo.pk, source, photo)
+                    for photo in photos.order_by('-uploaded_at', '-id')[:limit + 1])
+
+    rows.sort(key=lambda row: row[:3], reverse=True)
+    page = rows[:limit]
+    next_cursor = encode_cursor(*page[-1][:3]) if len(rows) > limit else None
+    return [_item(source, photo) for _uploaded_at, _rank, _pk, source, photo in page], next_cursor
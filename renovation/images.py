@@ -0,0 +1,113 @@
+"""
+Pixel dimensions and downscaled copies of progress and equipment photos,
+used by the {% responsive_img %} template tag for width/height and srcset
+"""
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .models import RoomProgressPhoto, EquipmentPhoto
+from .storage import DERIVATIVE_WIDTHS, blob_digest, derivative_name
+
+
+# Photo models -> their image field; each has `width` and `height` fields
+PHOTO_FIELDS = {
+    RoomProgressPhoto: 'photo',
+    EquipmentPhoto: 'photo',
+}
+
+WEBP_QUALITY = 80
+
+
+def derivative_widths(width):
+    """Derivative widths available for a photo of the given width (smaller ones only)"""
+    if not width:
+        return []
+    return [candidate for candidate in DERIVATIVE_WIDTHS if candidate < width]
+
+
+def srcset(image):
+    """srcset value over a photo's derivatives and original, or '' when it has none"""
+    width = getattr(image.instance, 'width', None)
+    digest = blob_digest(image.name)
+    candidates = derivative_widths(width) if digest else []
+    if not candidates:
+        return ''
+    entries = [f'{image.storage.url(derivative_name(digest, target))} {target}w' for target in candidates]
+    entries.append(f'{image.url} {width}w')
+    return ', '.join(entries)
+
+
+def thumbnail_url(image, min_width):
+    """URL of the smallest derivative at least min_width px wide, falling back to the original"""
+    digest = blob_digest(image.name)
+    if digest:
+        for target in derivative_widths(getattr(image.instance, 'width', None)):
+            if target >= min_width:
+                return image.storage.url(derivative_name(digest, target))
+    return image.url
+
+
+def _open_oriented(field_file):
+    field_file.open('rb')
+    try:
+        image = Image.open(field_file)
+        # Decode big JPEGs at reduced scale when only small copies are needed
+        image.draft('RGB', (max(DERIVATIVE_WIDTHS), max(DERIVATIVE_WIDTHS)))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    finally:
+        field_file.close()
+    return image
+
+
+def _oriented_size(field_file):
+    """Displayed size of the photo: browsers apply the EXIF orientation"""
+    field_file.open('rb')
+    try:
+        image = Image.open(field_file)
+        width, height = image.size
+        if image.getexif().get(0x0112) in (5, 6, 7, 8):
+            width, height = height, width
+    finally:
+        field_file.close()
+    return width, height
+
+
+def process_photo(instance, field='photo'):
+    """
+    Store the photo's dimensions and create its missing derivatives.
+    Derivatives are shared by all records using the same content-addressed file.
+    """
+    field_file = getattr(instance, field)
+    if not field_file:
+        return
+
+    width, height = _oriented_size(field_file)
+    if (instance.width, instance.height) != (width, height):
+        instance.width, instance.height = width, height
+        # Update only the dimension columns, without signals running again
+        type(instance).objects.filter(pk=instance.pk).update(width=width, height=height)
+
+    digest = blob_digest(field_file.name)
+    if digest is None:
+        # Only content-addressed files get derivatives (see rebuild_stored_files)
+        return
+    storage = field_file.storage
+    missing = [
+        target for target in derivative_widths(width)
+        if not storage.exists(derivative_name(digest, target))
+    ]
+    if not missing:
+        return
+
+    image = _open_oriented(field_file)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    for target in missing:
+        copy = image.copy()
+        copy.thumbnail((target, round(target * height / width) or 1), Image.LANCZOS)
+        output = BytesIO()
+        copy.save(output, 'WEBP', quality=WEBP_QUALITY, method=4)
+        storage.save(derivative_name(digest, target), ContentFile(output.getvalue()))
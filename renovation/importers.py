@@ -0,0 +1,345 @@
+"""
+Bulk purchase import from bank statements and receipt exports (CSV/XLSX)
+"""
+import csv
+import io
+import re
+import zipfile
+from xml.etree.ElementTree import ParseError
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import translation
+from django.utils.translation import gettext as _
+
+from . import search, vendors
+from .models import DropdownChoice, MonthlySpend, Purchase, PurchaseCategory, PropertyDataVersion
+
+
+# Accepted column headers (lower-cased) for each purchase field
+COLUMN_ALIASES = {
+    'date': ['date', 'data', 'data operacji', 'data transakcji', 'data zakupu'],
+    'amount': ['amount', 'kwota', 'kwota transakcji'],
+    'vendor': ['vendor', 'sklep', 'dostawca', 'kontrahent', 'odbiorca', 'nadawca/odbiorca'],
+    'description': ['description', 'opis', 'tytuł', 'tytul', 'opis operacji'],
+    'category': ['category', 'kategoria'],
+    'notes': ['notes', 'notatki', 'uwagi'],
+}
+
+DATE_FORMATS = ['%Y-%m-%d', '%d.%m.%Y', '%d-%m-%Y', '%d/%m/%Y', '%Y.%m.%d']
+
+VENDOR_MAX_LENGTH = Purchase._meta.get_field('vendor').max_length
+
+
+def normalize_text(value):
+    """Lower-case and collapse whitespace for case-insensitive matching"""
+    return ' '.join(str(value).split()).casefold()
+
+
+class ImportResult:
+    """Outcome of a single import run"""
+
+    def __init__(self):
+        self.total_rows = 0
+        self.created = 0
+        self.duplicates = 0
+        self.errors = []  # list of (row_number, message)
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+    @property
+    def has_errors(self):
+        return bool(self.errors)
+
+
+class PurchaseImporter:
+    """
+    Import purchases for one property from a CSV or XLSX statement.
+
+    Rows are read one at a time, validated in batches, checked against
+    existing purchases on (property, date, amount, vendor) and written with
+    bulk_create inside a single transaction.
+    """
+
+    def __init__(self, property_obj, default_category=None, decimal_separator=None, expenses_negative=True,
+                 batch_size=500):
+        self.property = property_obj
+        self.default_category = default_category
+        # None detects the separator per value and rejects ambiguous ones
+        self.decimal_separator = decimal_separator
+        # Bank statements list expenses as negative debits, receipt exports as positive amounts
+        self.expenses_negative = expenses_negative
+        self.batch_size = batch_size
+        self.vendor_lookup = self._build_vendor_lookup()
+        # Longest names first so "Leroy Merlin" wins over "Leroy"
+        self.vendor_prefixes = sorted(self.vendor_lookup.items(), key=lambda item: -len(item[0]))
+        self.category_lookup = self._build_category_lookup()
+        self.seen_keys = set()
+        self.touched_buckets = set()
+        self.vendor_resolver = vendors.VendorResolver()
+
+    def run(self, uploaded_file):
+        result = ImportResult()
+        batch = []
+
+        with transaction.atomic():
+            for row_number, row in self.iter_rows(uploaded_file):
+                result.total_rows += 1
+                try:
+                    batch.append((row_number, self.parse_row(row)))
+                except ValueError as exc:
+                    result.add_error(row_number, str(exc))
+                    continue
+
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, result)
+                    batch = []
+
+            if batch:
+                self._flush(batch, result)
+
+            # bulk_create skips signals, so refresh the spending rollup and data version here
+            for month, category_id in self.touched_buckets:
+                MonthlySpend.refresh(self.property.pk, month, category_id)
+            if result.created:
+                PropertyDataVersion.bump([self.property.pk])
+
+        return result
+
+    # Reading
+
+    def iter_rows(self, uploaded_file):
+        """Yield (row_number, {field: value}) pairs from the uploaded file"""
+        name = (uploaded_file.name or '').lower()
+        if name.endswith('.xlsx'):
+            rows = self._iter_xlsx(uploaded_file)
+        else:
+            rows = self._iter_csv(uploaded_file)
+
+        header = None
+        for row_number, values in rows:
+            if header is None:
+                header = self._map_header(values)
+                continue
+            if not any(v not in (None, '') for v in values):
+                continue
+            yield row_number, {
+                field: values[index] if index < len(values) else None
+                for field, index in header.items()
+            }
+
+        if header is None:
+            raise ValueError(_('Plik jest pusty.'))
+
+    def _iter_csv(self, uploaded_file):
+        uploaded_file.seek(0)
+        stream = io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', newline='')
+        try:
+            sample = stream.read(4096)
+            stream.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=';,\t')
+            except csv.Error:
+                dialect = csv.excel
+            for row_number, values in enumerate(csv.reader(stream, dialect), start=1):
+                yield row_number, values
+        except (UnicodeDecodeError, csv.Error):
+            # Binary files, other encodings and NUL bytes
+            raise ValueError(_('Plik nie jest poprawnym plikiem CSV w kodowaniu UTF-8.'))
+        finally:
+            stream.detach()
+
+    def _iter_xlsx(self, uploaded_file):
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+
+        # Raised by openpyxl for files that are not (intact) workbooks
+        invalid_file_errors = (zipfile.BadZipFile, KeyError, InvalidFileException, ParseError)
+
+        uploaded_file.seek(0)
+        try:
+            workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+        except invalid_file_errors:
+            raise ValueError(_('Plik nie jest poprawnym plikiem XLSX.'))
+        try:
+            sheet = workbook.active
+            for row_number, values in enumerate(sheet.iter_rows(values_only=True), start=1):
+                yield row_number, list(values)
+        except invalid_file_errors:
+            raise ValueError(_('Plik nie jest poprawnym plikiem XLSX.'))
+        finally:
+            workbook.close()
+
+    def _map_header(self, values):
+        header = {}
+        for index, value in enumerate(values):
+            key = normalize_text(value or '')
+            for field, aliases in COLUMN_ALIASES.items():
+                if key in aliases and field not in header:
+                    header[field] = index
+
+        missing = [field for field in ('date', 'amount', 'vendor') if field not in header]
+        if missing:
+            raise ValueError(_('Brak wymaganych kolumn: {}').format(', '.join(missing)))
+        return header
+
+    # Validation
+
+    def parse_row(self, row):
+        """Convert a raw row into Purchase field values or raise ValueError"""
+        vendor = self.match_vendor(row.get('vendor'))
+        if not vendor:
+            raise ValueError(_('Brak sklepu/dostawcy.'))
+        if len(vendor) > VENDOR_MAX_LENGTH:
+            raise ValueError(_('Nazwa sklepu jest za długa.'))
+
+        category = self.match_category(row.get('category'))
+        if category is None:
+            raise ValueError(_('Nieznana kategoria i brak kategorii domyślnej.'))
+
+        description = str(row.get('description') or '').strip() or vendor
+
+        return {
+            'date': self.parse_date(row.get('date')),
+            'amount': self.parse_amount(row.get('amount')),
+            'vendor': vendor,
+            'category': category,
+            'description': description,
+            'notes': str(row.get('notes') or '').strip(),
+        }
+
+    def parse_date(self, value):
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+
+        text = str(value or '').strip()
+        for date_format in DATE_FORMATS:
+            try:
+                return datetime.strptime(text, date_format).date()
+            except ValueError:
+                continue
+        raise ValueError(_('Nieprawidłowa data: {}').format(text))
+
+    def parse_amount(self, value):
+        if isinstance(value, (int, float, Decimal)):
+            amount = Decimal(str(value))
+        else:
+            # Accept bank formats like "-1 234,56 zł" and "1,234.56"
+            text = re.sub(r'[^\d,.\-]', '', str(value or ''))
+            try:
+                amount = Decimal(self._normalize_amount_text(text, value))
+            except InvalidOperation:
+                raise ValueError(_('Nieprawidłowa kwota: {}').format(value))
+
+        # Refunds and incoming transfers are not purchases
+        if self.expenses_negative:
+            if amount > 0:
+                raise ValueError(_('Pominięto wpływ (kwota dodatnia): {}').format(value))
+        elif amount < 0:
+            raise ValueError(_('Pominięto zwrot (kwota ujemna): {}').format(value))
+
+        amount = abs(amount).quantize(Decimal('0.01'))
+        if amount < Decimal('0.01'):
+            raise ValueError(_('Kwota musi być większa od zera.'))
+        return amount
+
+    def _normalize_amount_text(self, text, value):
+        """Amount text with "." as the decimal point and no digit grouping"""
+        decimal_separator = self.decimal_separator
+        if decimal_separator is None:
+            separators = [char for char in text if char in ',.']
+            if not separators:
+                return text
+            last = separators[-1]
+            if separators.count(last) > 1:
+                # "1.234.567" - the only separator repeats, so it groups digits
+                decimal_separator = ',' if last == '.' else '.'
+            elif len(set(separators)) == 1 and len(text) - text.rindex(last) - 1 == 3:
+                # "1.234" is 1234 in Polish notation but 1.234 in English
+                raise ValueError(_('Niejednoznaczna kwota: {} (wybierz separator dziesiętny)').format(value))
+            else:
+                decimal_separator = last
+
+        grouping = ',' if decimal_separator == '.' else '.'
+        integer, _separator, fraction = text.partition(decimal_separator)
+        if decimal_separator in fraction or grouping in fraction:
+            raise InvalidOperation
+        if grouping in integer:
+            if not re.fullmatch(r'-?\d{1,3}(%s\d{3})+' % re.escape(grouping), integer):
+                raise InvalidOperation
+            integer = integer.replace(grouping, '')
+        return f'{integer}.{fraction}' if _separator else integer
+
+    def match_vendor(self, value):
+        """Map a raw vendor string onto a configured vendor label when possible"""
+        raw = ' '.join(str(value or '').split())
+        key = raw.casefold()
+        if not key:
+            return ''
+        if key in self.vendor_lookup:
+            return self.vendor_lookup[key]
+
+        # Bank descriptions append location/terminal, e.g. "CASTORAMA KRAKOW 12"
+        for known_key, label in self.vendor_prefixes:
+            if key.startswith(known_key + ' '):
+                return label
+        return raw
+
+    def match_category(self, value):
+        key = normalize_text(value or '')
+        if key and key in self.category_lookup:
+            return self.category_lookup[key]
+        return self.default_category
+
+    def _build_vendor_lookup(self):
+        lookup = {}
+        vendors = DropdownChoice.objects.filter(choice_type='vendor', is_active=True)
+        for choice in vendors:
+            for key in (choice.value, choice.label_pl, choice.label_en):
+                if key:
+                    lookup.setdefault(normalize_text(key), choice.label_pl)
+        return lookup
+
+    def _build_category_lookup(self):
+        lookup = {}
+        for category in PurchaseCategory.objects.all():
+            lookup[normalize_text(category.name)] = category
+            for language in ('pl', 'en'):
+                with translation.override(language):
+                    lookup.setdefault(normalize_text(category.get_name_display()), category)
+        return lookup
+
+    # Writing
+
+    def _flush(self, batch, result):
+        """Skip duplicates in a validated batch and bulk insert the rest"""
+        dates = {values['date'] for _row, values in batch}
+        existing = set(
+            Purchase.objects.filter(
+                property=self.property,
+                date__in=dates,
+            ).values_list('date', 'amount', 'vendor')
+        )
+
+        purchases = []
+        for _row, values in batch:
+            key = (values['date'], values['amount'], values['vendor'])
+            if key in existing or key in self.seen_keys:
+                result.duplicates += 1
+                continue
+            self.seen_keys.add(key)
+            self.touched_buckets.add((MonthlySpend.month_start(values['date']), values['category'].pk))
+            purchases.append(Purchase(
+                property=self.property,
+                normalized_vendor_id=self.vendor_resolver.resolve(values['vendor']),
+                **values
+            ))
+
+        Purchase.objects.bulk_create(purchases, batch_size=self.batch_size)
+        search.index_objects(purchases, batch_size=self.batch_size)
+        vendors.invalidate_prefix_index([self.property.owner_id])
+        result.created += len(purchases)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from PIL import UnidentifiedImageError
+from renovation.images import PHOTO_FIELDS, process_photo
+from renovation.models import Property, PropertyDataVersion
+
+
+class Command(BaseCommand):
+    help = 'Store pixel dimensions and create the downscaled copies of progress and equipment photos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing-only',
+            action='store_true',
+            help='Only process photos without stored dimensions'
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        failed = 0
+        for model, field in PHOTO_FIELDS.items():
+            photos = model.objects.exclude(**{field: ''}).order_by('pk')
+            if options['missing_only']:
+                photos = photos.filter(width__isnull=True)
+            for photo in photos.iterator(chunk_size=200):
+                try:
+                    process_photo(photo, field)
+                except (OSError, UnidentifiedImageError) as exc:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f'{model.__name__} #{photo.pk}: {exc}'))
+                else:
+                    processed += 1
+
+        if processed:
+            # Dimensions are stored without signals; refresh the pages showing the photos
+            PropertyDataVersion.bump(Property.objects.values_list('pk', flat=True))
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} photos ({failed} failed)'))
@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from renovation.bundles import stream_bundle
+from renovation.models import Property
+
+
+class Command(BaseCommand):
+    help = 'Export a property with all its records and media as a bundle for import_property'
+
+    def add_arguments(self, parser):
+        parser.add_argument('property_id', type=int, help='ID of the property')
+        parser.add_argument('output', help='Path of the bundle to write, or - for standard output')
+
+    def handle(self, *args, **options):
+        try:
+            property_obj = Property.objects.get(pk=options['property_id'])
+        except Property.DoesNotExist:
+            raise CommandError(f"Property {options['property_id']} does not exist")
+
+        skipped = []
+        to_stdout = options['output'] == '-'
+        output = sys.stdout.buffer if to_stdout else open(options['output'], 'wb')
+        try:
+            for chunk in stream_bundle(property_obj, skipped):
+                output.write(chunk)
+        finally:
+            if not to_stdout:
+                output.close()
+
+        # Keep standard output clean for the bundle itself
+        report = self.stderr if to_stdout else self.stdout
+        for name in skipped:
+            report.write(self.style.WARNING(f'Missing file skipped: {name}'))
+        if not to_stdout:
+            self.stdout.write(self.style.SUCCESS(f'Exported {property_obj.name} to {options["output"]}'))
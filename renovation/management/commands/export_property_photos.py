@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from renovation.archives import property_archive_entries, stream_zip
+from renovation.models import Property
+
+
+class Command(BaseCommand):
+    help = 'Write a ZIP of all progress photos, equipment photos and receipts of a property'
+
+    def add_arguments(self, parser):
+        parser.add_argument('property_id', type=int, help='ID of the property')
+        parser.add_argument('output', help='Path of the ZIP file to write, or - for standard output')
+
+    def handle(self, *args, **options):
+        try:
+            property_obj = Property.objects.get(pk=options['property_id'])
+        except Property.DoesNotExist:
+            raise CommandError(f"Property {options['property_id']} does not exist")
+
+        skipped = []
+        to_stdout = options['output'] == '-'
+        output = sys.stdout.buffer if to_stdout else open(options['output'], 'wb')
+        try:
+            for chunk in stream_zip(property_archive_entries(property_obj), skipped):
+                output.write(chunk)
+        finally:
+            if not to_stdout:
+                output.close()
+
+        # Keep standard output clean for the archive itself
+        report = self.stderr if to_stdout else self.stdout
+        for path in skipped:
+            report.write(self.style.WARNING(f'Missing file skipped: {path}'))
+        if not to_stdout:
+            self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
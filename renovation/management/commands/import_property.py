@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from renovation.bundles import BundleError, BundleImporter
+
+
+class Command(BaseCommand):
+    help = 'Import a property bundle created by export_property as a new property'
+
+    def add_arguments(self, parser):
+        parser.add_argument('bundle', help='Path of the bundle file')
+        parser.add_argument('--owner', required=True, help='Username of the owner of the imported property')
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(username=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['owner']} does not exist")
+
+        try:
+            with open(options['bundle'], 'rb') as bundle_file:
+                result = BundleImporter(owner).run(bundle_file)
+        except (OSError, BundleError) as exc:
+            raise CommandError(str(exc))
+
+        for key, count in result.counts.items():
+            self.stdout.write(f'{key}: {count}')
+        self.stdout.write(f'media: {result.media_files} ({result.media_duplicates} already stored)')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.property.name} as property {result.property.pk}'
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from renovation.models import MonthlySpend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the monthly spending rollup from purchases'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--property',
+            type=int,
+            dest='property_id',
+            help='Only rebuild the rollup for this property ID'
+        )
+
+    def handle(self, *args, **options):
+        created = MonthlySpend.rebuild(property_id=options['property_id'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt monthly spending rollup: {created} rows'))
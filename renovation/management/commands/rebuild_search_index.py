@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from renovation.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search documents from purchases, progress, tasks, equipment and circuits'
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search index: {indexed} documents'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from renovation.uploads import rebuild_stored_files, stored_file_stats
+
+
+class Command(BaseCommand):
+    help = 'Move photos and receipts into content-addressed storage and recompute their reference counts'
+
+    def handle(self, *args, **options):
+        moved, _stored = rebuild_stored_files(stdout=self.stdout)
+        files, references = stored_file_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {moved} files; {files} stored files used by {references} records '
+            f'({references - files} duplicates)'
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from renovation.models import Room
+from renovation.room_counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute the summary counters of rooms and correct the ones that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--property',
+            type=int,
+            dest='property_id',
+            help='Only reconcile the rooms of this property ID'
+        )
+
+    def handle(self, *args, **options):
+        rooms = Room.objects.all()
+        if options['property_id']:
+            rooms = rooms.filter(property_id=options['property_id'])
+        corrected = reconcile(rooms)
+        self.stdout.write(self.style.SUCCESS(f'Reconciled room counters: {corrected} rooms corrected'))
@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from renovation.models import Property, Purchase, Room
+from renovation.models import Property, PropertyDataVersion, Purchase, Room
 
 
 class Command(BaseCommand):
@@ -39,5 +39,8 @@ class Command(BaseCommand):
         rooms_updated = Room.objects.filter(property__isnull=True).update(property=property_obj)
         self.stdout.write(self.style.SUCCESS(f'Linked {rooms_updated} rooms to property'))
 
+        if purchases_updated or rooms_updated:
+            PropertyDataVersion.bump([property_obj.pk])
+
         self.stdout.write(self.style.SUCCESS('Setup complete!'))
         self.stdout.write(f'Property: {property_obj.full_address}')
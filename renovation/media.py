@@ -0,0 +1,137 @@
+"""
+Access-checked serving of uploaded photos and receipts.
+
+Django only decides whether the user may see a file. The bytes are sent by the
+front web server (X-Accel-Redirect for nginx, X-Sendfile for Apache), or without
+a proxy by FileResponse, which WSGI servers pass to sendfile() instead of
+copying the file through Python.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .storage import blob_digest
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Blob names change with the content, so browsers never need to revalidate them
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+class FileRange:
+    """
+    Part of an open file. Keeps fileno() and the file position at the range
+    start, so gunicorn can still sendfile() it (limited by Content-Length).
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    (start, end) of a single-range Range header, None to send the whole file,
+    or False when the range cannot be satisfied
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        # Malformed and multi-range requests get the whole file
+        return None
+    first, last = match.groups()
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _file_etag(name, stat):
+    digest = blob_digest(name)
+    if digest:
+        return quote_etag(digest)
+    return quote_etag(f'{int(stat.st_mtime)}-{stat.st_size}')
+
+
+def _accel_response(name, path, content_type):
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SERVER == 'nginx':
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + quote(name)
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def _file_response(request, path, stat, content_type, etag):
+    file = open(path, 'rb')
+    byte_range = None
+    header = request.headers.get('Range')
+    # A Range only applies to the version of the file the client already has part of
+    if header and request.headers.get('If-Range', etag) == etag:
+        byte_range = parse_range(header, stat.st_size)
+
+    if byte_range is False:
+        file.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(file, start, end - start + 1), content_type=content_type, status=206)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def serve_media(request, name, storage):
+    """
+    Respond with a stored file the caller has already been allowed to see,
+    answering revalidations with 304 Not Modified.
+    """
+    path = storage.path(name)
+    stat = os.stat(path)
+    etag = _file_etag(name, stat)
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        if settings.MEDIA_SERVER in ('nginx', 'apache'):
+            response = _accel_response(name, path, content_type)
+        else:
+            response = _file_response(request, path, stat, content_type, etag)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if blob_digest(name):
+        patch_cache_control(response, private=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
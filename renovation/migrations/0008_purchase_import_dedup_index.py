@@ -0,0 +1,17 @@
+# Generated by Django 5.0 on 2026-10-19 08:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('renovation', '0007_alter_purchase_property_alter_room_property_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['property', 'date', 'amount', 'vendor'], name='renovation__propert_9c3dc1_idx'),
+        ),
+    ]
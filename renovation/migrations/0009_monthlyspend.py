@@ -0,0 +1,48 @@
+# Generated by Django 5.0 on 2026-10-19 08:55
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def populate_monthly_spend(apps, schema_editor):
+    Purchase = apps.get_model('renovation', 'Purchase')
+    MonthlySpend = apps.get_model('renovation', 'MonthlySpend')
+
+    rows = Purchase.objects.annotate(
+        month=TruncMonth('date')
+    ).values('property_id', 'month', 'category_id').annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by()
+    MonthlySpend.objects.bulk_create([MonthlySpend(**row) for row in rows], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('renovation', '0008_purchase_import_dedup_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySpend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Miesiąc')),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Suma')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Liczba zakupów')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_spend', to='renovation.purchasecategory', verbose_name='Kategoria')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_spend', to='renovation.property', verbose_name='Nieruchomość')),
+            ],
+            options={
+                'verbose_name': 'Wydatki miesięczne',
+                'verbose_name_plural': 'Wydatki miesięczne',
+                'ordering': ['property', 'month', 'category'],
+                'unique_together': {('property', 'month', 'category')},
+            },
+        ),
+        migrations.RunPython(populate_monthly_spend, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0 on 2026-10-19 08:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('renovation', '0009_monthlyspend'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyDataVersion',
+            fields=[
+                ('property', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='data_version', serialize=False, to='renovation.property', verbose_name='Nieruchomość')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Wersja')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data aktualizacji')),
+            ],
+            options={
+                'verbose_name': 'Wersja danych nieruchomości',
+                'verbose_name_plural': 'Wersje danych nieruchomości',
+            },
+        ),
+    ]
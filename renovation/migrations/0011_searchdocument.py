@@ -0,0 +1,183 @@
+# Generated by Django 5.0 on 2026-10-19 09:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+BATCH_SIZE = 500
+
+# "ł" is not a letter with a diacritic in Unicode, so neither tokenizer folds it;
+# the indexed text is folded here and the query in renovation/search.py
+POSTGRESQL_INDEX = [
+    """
+    ALTER TABLE renovation_searchdocument ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', translate(coalesce(title, ''), 'łŁ', 'lL')), 'A') ||
+        setweight(to_tsvector('simple', translate(coalesce(body, ''), 'łŁ', 'lL')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX renovation_searchdocument_vector_idx ON renovation_searchdocument USING GIN (search_vector)",
+]
+
+
+def _sqlite_folded(row):
+    return f"replace(replace({row}.title, 'ł', 'l'), 'Ł', 'L'), replace(replace({row}.body, 'ł', 'l'), 'Ł', 'L')"
+
+
+# The external-content FTS table indexes folded text; highlight() and snippet()
+# mark the same token positions in the original text
+SQLITE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE renovation_searchdocument_fts USING fts5(
+        title, body,
+        content='renovation_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER renovation_searchdocument_fts_insert AFTER INSERT ON renovation_searchdocument BEGIN
+        INSERT INTO renovation_searchdocument_fts(rowid, title, body) VALUES (new.id, {_sqlite_folded('new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER renovation_searchdocument_fts_delete AFTER DELETE ON renovation_searchdocument BEGIN
+        INSERT INTO renovation_searchdocument_fts(renovation_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, {_sqlite_folded('old')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER renovation_searchdocument_fts_update AFTER UPDATE ON renovation_searchdocument BEGIN
+        INSERT INTO renovation_searchdocument_fts(renovation_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, {_sqlite_folded('old')});
+        INSERT INTO renovation_searchdocument_fts(rowid, title, body) VALUES (new.id, {_sqlite_folded('new')});
+    END
+    """,
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS renovation_searchdocument_fts_insert",
+    "DROP TRIGGER IF EXISTS renovation_searchdocument_fts_delete",
+    "DROP TRIGGER IF EXISTS renovation_searchdocument_fts_update",
+    "DROP TABLE IF EXISTS renovation_searchdocument_fts",
+]
+
+
+def create_search_index(apps, schema_editor):
+    """tsvector + GIN on PostgreSQL, FTS5 external-content table on SQLite"""
+    statements = {
+        'postgresql': POSTGRESQL_INDEX,
+        'sqlite': SQLITE_INDEX,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def _join(*parts):
+    return '\n'.join(str(part) for part in parts if part)
+
+
+def _room_name(room):
+    return room.short_name or room.get_name_display()
+
+
+# Frozen copy of the search documents at the time of this migration:
+# model name -> (related fields to load, record -> document fields)
+DOCUMENT_SOURCES = {
+    'purchase': ('Purchase', ['property'], lambda purchase: {
+        'owner_id': purchase.property.owner_id,
+        'property_id': purchase.property_id,
+        'link_pk': purchase.pk,
+        'title': f"{purchase.vendor} - {purchase.amount} PLN ({purchase.date:%d.%m.%Y})",
+        'body': _join(purchase.description, purchase.notes),
+    }),
+    'progress': ('RoomProgress', ['room__property'], lambda progress: {
+        'owner_id': progress.room.property.owner_id,
+        'property_id': progress.room.property_id,
+        'link_pk': progress.room_id,
+        'title': f"{_room_name(progress.room)} ({progress.date:%d.%m.%Y})",
+        'body': _join(progress.description, progress.notes),
+    }),
+    'task': ('RenovationTask', ['related_property'], lambda task: {
+        'owner_id': task.related_property.owner_id,
+        'property_id': task.related_property_id,
+        'link_pk': task.pk,
+        'title': task.title,
+        'body': task.description,
+    }),
+    'shopping': ('ShoppingItem', ['related_property'], lambda item: {
+        'owner_id': item.related_property.owner_id,
+        'property_id': item.related_property_id,
+        'link_pk': item.pk,
+        'title': item.title,
+        'body': _join(item.description, item.vendor),
+    }),
+    'equipment': ('Equipment', [], lambda equipment: {
+        'owner_id': equipment.owner_id,
+        'property_id': None,
+        'link_pk': equipment.pk,
+        'title': equipment.name,
+        'body': _join(equipment.purpose, equipment.vendor, equipment.notes),
+    }),
+    'circuit': ('ElectricalCircuit', ['room__property'], lambda circuit: {
+        'owner_id': circuit.room.property.owner_id,
+        'property_id': circuit.room.property_id,
+        'link_pk': circuit.room_id,
+        'title': f"{circuit.breaker_number} - {circuit.circuit_name}",
+        'body': _join(circuit.connected_appliances, circuit.notes),
+    }),
+}
+
+
+def index_existing_records(apps, schema_editor):
+    """Search documents for the records created before this migration"""
+    SearchDocument = apps.get_model('renovation', 'SearchDocument')
+    for kind, (model_name, related, document) in DOCUMENT_SOURCES.items():
+        records = apps.get_model('renovation', model_name).objects.select_related(*related).order_by('pk')
+        batch = []
+        for record in records.iterator(chunk_size=BATCH_SIZE):
+            batch.append(SearchDocument(kind=kind, object_id=record.pk, **document(record)))
+            if len(batch) >= BATCH_SIZE:
+                SearchDocument.objects.bulk_create(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+
+
+def drop_search_index(apps, schema_editor):
+    # The PostgreSQL column and index go away with the table
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_DROP:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('renovation', '0010_propertydataversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=30, verbose_name='Rodzaj')),
+                ('object_id', models.PositiveIntegerField(verbose_name='ID obiektu')),
+                ('link_pk', models.PositiveIntegerField(help_text='Klucz obiektu, którego strona pokazuje ten rekord', verbose_name='ID strony wyniku')),
+                ('title', models.CharField(max_length=255, verbose_name='Tytuł')),
+                ('body', models.TextField(blank=True, verbose_name='Treść')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Data aktualizacji')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to=settings.AUTH_USER_MODEL, verbose_name='Właściciel')),
+                ('property', models.ForeignKey(blank=True, help_text='Puste dla rekordów wspólnych dla wszystkich nieruchomości (np. sprzęt)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='renovation.property', verbose_name='Nieruchomość')),
+            ],
+            options={
+                'verbose_name': 'Dokument wyszukiwania',
+                'verbose_name_plural': 'Dokumenty wyszukiwania',
+                'indexes': [models.Index(fields=['owner', 'property'], name='renovation__owner_i_96f486_idx')],
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(index_existing_records, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,119 @@
+# Generated by Django 5.0 on 2026-10-19 09:08
+
+import re
+import unicodedata
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+# Frozen copy of the vendor name normalization at the time of this migration
+LETTER_REPLACEMENTS = str.maketrans({'ł': 'l', 'đ': 'd', 'ø': 'o', 'ß': 'ss'})
+
+
+def normalize_vendor_name(name):
+    name = unicodedata.normalize('NFKD', str(name).casefold().translate(LETTER_REPLACEMENTS))
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[\W_]+', ' ', name).split())
+
+
+def backfill_vendors(apps, schema_editor):
+    """Create vendors from existing vendor strings and link rows to them in batches"""
+    Vendor = apps.get_model('renovation', 'Vendor')
+    source_models = [apps.get_model('renovation', name) for name in ('Purchase', 'Equipment', 'ShoppingItem')]
+
+    # The most common spelling of a normalized name becomes the vendor name
+    spellings = Counter()
+    for model in source_models:
+        rows = model.objects.exclude(vendor='').values_list('vendor').annotate(uses=models.Count('id')).order_by()
+        for vendor, uses in rows:
+            spellings[vendor] += uses
+    vendor_ids = {}
+    for vendor, _uses in spellings.most_common():
+        key = normalize_vendor_name(vendor)
+        if key and key not in vendor_ids:
+            vendor_ids[key] = Vendor.objects.get_or_create(
+                normalized_name=key, defaults={'name': ' '.join(vendor.split())}
+            )[0].pk
+
+    for model in source_models:
+        last_pk = 0
+        while True:
+            batch = list(model.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'vendor')[:BATCH_SIZE])
+            if not batch:
+                break
+            for row in batch:
+                row.normalized_vendor_id = vendor_ids.get(normalize_vendor_name(row.vendor))
+            model.objects.bulk_update(batch, ['normalized_vendor'], batch_size=BATCH_SIZE)
+            last_pk = batch[-1].pk
+
+
+def create_trigram_index(apps, schema_editor):
+    """GIN trigram index on vendor names for autocomplete (PostgreSQL only)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute('CREATE INDEX renovation_vendor_name_trgm ON renovation_vendor USING GIN (name gin_trgm_ops)')
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS renovation_vendor_name_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('renovation', '0011_searchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Vendor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='Nazwa')),
+                ('normalized_name', models.CharField(help_text='Małe litery, bez polskich znaków i interpunkcji', max_length=200, unique=True, verbose_name='Nazwa znormalizowana')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data utworzenia')),
+            ],
+            options={
+                'verbose_name': 'Sklep',
+                'verbose_name_plural': 'Sklepy',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='normalized_vendor',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='equipment', to='renovation.vendor', verbose_name='Sklep (znormalizowany)'),
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='normalized_vendor',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='purchases', to='renovation.vendor', verbose_name='Sklep (znormalizowany)'),
+        ),
+        migrations.AddField(
+            model_name='shoppingitem',
+            name='normalized_vendor',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='shopping_items', to='renovation.vendor', verbose_name='Sklep (znormalizowany)'),
+        ),
+        migrations.CreateModel(
+            name='VendorAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(help_text='Zapisywany w postaci znormalizowanej', max_length=200, unique=True, verbose_name='Alias')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='renovation.vendor', verbose_name='Sklep')),
+            ],
+            options={
+                'verbose_name': 'Alias sklepu',
+                'verbose_name_plural': 'Aliasy sklepów',
+                'ordering': ['vendor', 'alias'],
+            },
+        ),
+        migrations.RunPython(backfill_vendors, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0 on 2026-10-19 09:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('renovation', '0012_vendor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Ścieżka pliku')),
+                ('sha256', models.CharField(db_index=True, max_length=64, verbose_name='Skrót SHA-256')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='Rozmiar (bajty)')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='Liczba odwołań')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data utworzenia')),
+            ],
+            options={
+                'verbose_name': 'Plik',
+                'verbose_name_plural': 'Pliki',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
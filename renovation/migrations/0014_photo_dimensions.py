@@ -0,0 +1,33 @@
+# Generated by Django 5.0 on 2026-10-19 09:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('renovation', '0013_storedfile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmentphoto',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Wysokość (px)'),
+        ),
+        migrations.AddField(
+            model_name='equipmentphoto',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Szerokość (px)'),
+        ),
+        migrations.AddField(
+            model_name='roomprogressphoto',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Wysokość (px)'),
+        ),
+        migrations.AddField(
+            model_name='roomprogressphoto',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Szerokość (px)'),
+        ),
+    ]
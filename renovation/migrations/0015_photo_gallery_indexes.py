@@ -0,0 +1,21 @@
+# Generated by Django 5.0 on 2026-10-19 09:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('renovation', '0014_photo_dimensions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipmentphoto',
+            index=models.Index(fields=['uploaded_at', 'id'], name='renovation__uploade_9e408a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomprogressphoto',
+            index=models.Index(fields=['uploaded_at', 'id'], name='renovation__uploade_8e6f7e_idx'),
+        ),
+    ]
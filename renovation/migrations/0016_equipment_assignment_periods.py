@@ -0,0 +1,116 @@
+# Generated by Django 5.0 on 2026-10-19 09:22
+
+from django.db import migrations, models
+
+
+# An assignment covers the half-open period [start_date, end_date); an open
+# assignment (end_date NULL) runs indefinitely.
+POSTGRESQL_GUARD = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    """
+    ALTER TABLE renovation_equipmentassignment ADD CONSTRAINT renovation_equipmentassignment_no_overlap
+    EXCLUDE USING gist (equipment_id WITH =, daterange(start_date, end_date, '[)') WITH &&)
+    """,
+    """
+    CREATE INDEX renovation_equipmentassignment_period_idx ON renovation_equipmentassignment
+    USING gist (assigned_property_id, daterange(start_date, end_date, '[)'))
+    """,
+]
+
+POSTGRESQL_DROP = [
+    "DROP INDEX IF EXISTS renovation_equipmentassignment_period_idx",
+    "ALTER TABLE renovation_equipmentassignment DROP CONSTRAINT IF EXISTS renovation_equipmentassignment_no_overlap",
+]
+
+# Same overlap test as the daterange && operator; empty periods overlap nothing
+SQLITE_OVERLAP = """
+    EXISTS (
+        SELECT 1 FROM renovation_equipmentassignment a
+        WHERE a.equipment_id = NEW.equipment_id
+          AND a.id IS NOT NEW.id
+          AND a.start_date < coalesce(NEW.end_date, '9999-12-31')
+          AND coalesce(a.end_date, '9999-12-31') > NEW.start_date
+          AND a.start_date < coalesce(a.end_date, '9999-12-31')
+    )
+    AND NEW.start_date < coalesce(NEW.end_date, '9999-12-31')
+"""
+
+SQLITE_GUARD = [
+    """
+    CREATE UNIQUE INDEX renovation_equipmentassignment_open_uniq
+    ON renovation_equipmentassignment (equipment_id) WHERE end_date IS NULL
+    """,
+    f"""
+    CREATE TRIGGER renovation_equipmentassignment_overlap_insert
+    BEFORE INSERT ON renovation_equipmentassignment
+    WHEN {SQLITE_OVERLAP}
+    BEGIN
+        SELECT RAISE(ABORT, 'overlapping equipment assignment');
+    END
+    """,
+    f"""
+    CREATE TRIGGER renovation_equipmentassignment_overlap_update
+    BEFORE UPDATE OF equipment_id, start_date, end_date ON renovation_equipmentassignment
+    WHEN {SQLITE_OVERLAP}
+    BEGIN
+        SELECT RAISE(ABORT, 'overlapping equipment assignment');
+    END
+    """,
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS renovation_equipmentassignment_overlap_insert",
+    "DROP TRIGGER IF EXISTS renovation_equipmentassignment_overlap_update",
+    "DROP INDEX IF EXISTS renovation_equipmentassignment_open_uniq",
+]
+
+
+def close_overlapping_assignments(apps, schema_editor):
+    """End every assignment no later than the start of the next one of the same equipment"""
+    EquipmentAssignment = apps.get_model('renovation', 'EquipmentAssignment')
+    previous = None
+    for assignment in EquipmentAssignment.objects.order_by('equipment_id', 'start_date', 'id'):
+        if assignment.end_date is not None and assignment.end_date < assignment.start_date:
+            assignment.end_date = assignment.start_date
+            assignment.save(update_fields=['end_date'])
+        if previous is not None and previous.equipment_id == assignment.equipment_id:
+            if previous.end_date is None or previous.end_date > assignment.start_date:
+                previous.end_date = max(previous.start_date, assignment.start_date)
+                previous.save(update_fields=['end_date'])
+        previous = assignment
+
+
+def create_overlap_guard(apps, schema_editor):
+    """GiST exclusion constraint on PostgreSQL, partial unique index and triggers on SQLite"""
+    statements = {
+        'postgresql': POSTGRESQL_GUARD,
+        'sqlite': SQLITE_GUARD,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_overlap_guard(apps, schema_editor):
+    statements = {
+        'postgresql': POSTGRESQL_DROP,
+        'sqlite': SQLITE_DROP,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('renovation', '0015_photo_gallery_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_overlapping_assignments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='equipmentassignment',
+            constraint=models.CheckConstraint(check=models.Q(('end_date__isnull', True), ('end_date__gte', models.F('start_date')), _connector='OR'), name='equipment_assignment_end_after_start'),
+        ),
+        # After AddConstraint: rebuilding the table on SQLite would drop the triggers
+        migrations.RunPython(create_overlap_guard, drop_overlap_guard),
+    ]
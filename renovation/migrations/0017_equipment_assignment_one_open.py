@@ -0,0 +1,36 @@
+# Generated by Django 5.0 on 2026-10-19 09:24
+
+from django.db import migrations, models
+
+
+# Migration 0016 created the same partial index by hand on SQLite only; the
+# constraint now declares it for every database.
+SQLITE_OPEN_INDEX = """
+    CREATE UNIQUE INDEX renovation_equipmentassignment_open_uniq
+    ON renovation_equipmentassignment (equipment_id) WHERE end_date IS NULL
+"""
+
+
+def drop_sqlite_open_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP INDEX IF EXISTS renovation_equipmentassignment_open_uniq")
+
+
+def create_sqlite_open_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(SQLITE_OPEN_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('renovation', '0016_equipment_assignment_periods'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_sqlite_open_index, create_sqlite_open_index),
+        migrations.AddConstraint(
+            model_name='equipmentassignment',
+            constraint=models.UniqueConstraint(condition=models.Q(('end_date__isnull', True)), fields=('equipment',), name='equipment_assignment_one_open'),
+        ),
+    ]
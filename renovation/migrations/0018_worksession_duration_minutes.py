@@ -0,0 +1,34 @@
+# Generated by Django 5.0 on 2026-10-19 09:26
+
+from datetime import datetime, timedelta
+
+from django.db import migrations, models
+
+
+def fill_duration_minutes(apps, schema_editor):
+    """Same calculation as WorkSession.duration (a session may end after midnight)"""
+    WorkSession = apps.get_model('renovation', 'WorkSession')
+    sessions = WorkSession.objects.filter(end_time__isnull=False)
+    for session in sessions.iterator(chunk_size=500):
+        start = datetime.combine(session.date, session.start_time)
+        end = datetime.combine(session.date, session.end_time)
+        if end < start:
+            end += timedelta(days=1)
+        session.duration_minutes = int((end - start).total_seconds() // 60)
+        session.save(update_fields=['duration_minutes'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('renovation', '0017_equipment_assignment_one_open'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='worksession',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Wyliczany przy zapisie, sumowany w kalendarzu pracy', null=True, verbose_name='Czas trwania (min)'),
+        ),
+        migrations.RunPython(fill_duration_minutes, migrations.RunPython.noop),
+    ]
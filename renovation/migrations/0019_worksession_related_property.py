@@ -0,0 +1,43 @@
+# Generated by Django 5.0 on 2026-10-19 09:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Subquery
+
+
+BATCH_SIZE = 1000
+
+
+def fill_session_property(apps, schema_editor):
+    """Property of each session's rooms, one UPDATE per batch of sessions"""
+    WorkSession = apps.get_model('renovation', 'WorkSession')
+    Link = WorkSession.rooms_worked_on.through
+    room_property = Link.objects.filter(worksession_id=OuterRef('pk')).values('worksession_id').annotate(
+        property_id=Min('room__property_id')
+    ).values('property_id')
+
+    pks = list(WorkSession.objects.filter(related_property__isnull=True).order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(pks), BATCH_SIZE):
+        WorkSession.objects.filter(pk__in=pks[start:start + BATCH_SIZE]).update(
+            related_property_id=Subquery(room_property)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('renovation', '0018_worksession_duration_minutes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='worksession',
+            name='related_property',
+            field=models.ForeignKey(blank=True, help_text='Uzupełniana z pomieszczeń; wszystkie pomieszczenia sesji należą do tej nieruchomości', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='work_sessions', to='renovation.property', verbose_name='Nieruchomość'),
+        ),
+        migrations.AddIndex(
+            model_name='worksession',
+            index=models.Index(fields=['related_property', '-date'], name='renovation__related_78e0dc_idx'),
+        ),
+        migrations.RunPython(fill_session_property, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.0 on 2026-10-19 09:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_progress_property(apps, schema_editor):
+    """One UPDATE per table: progress from its room, photos from their progress entry"""
+    Room = apps.get_model('renovation', 'Room')
+    RoomProgress = apps.get_model('renovation', 'RoomProgress')
+    RoomProgressPhoto = apps.get_model('renovation', 'RoomProgressPhoto')
+
+    RoomProgress.objects.update(
+        property_id=Subquery(Room.objects.filter(pk=OuterRef('room_id')).values('property_id'))
+    )
+    RoomProgressPhoto.objects.update(
+        property_id=Subquery(RoomProgress.objects.filter(pk=OuterRef('progress_id')).values('property_id'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('renovation', '0019_worksession_related_property'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='roomprogressphoto',
+            name='renovation__uploade_8e6f7e_idx',
+        ),
+        migrations.AddField(
+            model_name='roomprogress',
+            name='property',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='progress_entries', to='renovation.property', verbose_name='Nieruchomość'),
+        ),
+        migrations.AddField(
+            model_name='roomprogressphoto',
+            name='property',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='progress_photos', to='renovation.property', verbose_name='Nieruchomość'),
+        ),
+        migrations.RunPython(fill_progress_property, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='roomprogress',
+            name='property',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='progress_entries', to='renovation.property', verbose_name='Nieruchomość'),
+        ),
+        migrations.AlterField(
+            model_name='roomprogressphoto',
+            name='property',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='progress_photos', to='renovation.property', verbose_name='Nieruchomość'),
+        ),
+        migrations.AddIndex(
+            model_name='roomprogress',
+            index=models.Index(fields=['property', '-date'], name='renovation__propert_675ea2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomprogressphoto',
+            index=models.Index(fields=['property', 'uploaded_at', 'id'], name='renovation__propert_0cfc3d_idx'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.0 on 2026-10-19 09:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_room_counters(apps, schema_editor):
+    """Compute the counters of every room with one UPDATE of correlated subqueries"""
+    Room = apps.get_model('renovation', 'Room')
+    RoomProgress = apps.get_model('renovation', 'RoomProgress')
+    RoomProgressPhoto = apps.get_model('renovation', 'RoomProgressPhoto')
+    ElectricalCircuit = apps.get_model('renovation', 'ElectricalCircuit')
+    RenovationTask = apps.get_model('renovation', 'RenovationTask')
+    SessionRooms = apps.get_model('renovation', 'WorkSession').rooms_worked_on.through
+
+    def count(queryset, group_by='room_id'):
+        counts = queryset.order_by().values(group_by).annotate(count=Count('*')).values('count')
+        return Coalesce(Subquery(counts), Value(0))
+
+    progress = RoomProgress.objects.filter(room=OuterRef('pk'))
+    photos = RoomProgressPhoto.objects.filter(progress__room=OuterRef('pk'))
+    session_minutes = SessionRooms.objects.filter(room=OuterRef('pk')).order_by().values('room_id').annotate(
+        minutes=Sum('worksession__duration_minutes')
+    ).values('minutes')
+
+    Room.objects.update(
+        progress_count=count(progress),
+        photo_count=count(photos, 'progress__room'),
+        circuit_count=count(ElectricalCircuit.objects.filter(room=OuterRef('pk'))),
+        open_task_count=count(RenovationTask.objects.filter(room=OuterRef('pk')).exclude(status='completed')),
+        session_minutes=Coalesce(Subquery(session_minutes), Value(0)),
+        last_progress_date=Subquery(progress.order_by('-date', '-created_at').values('date')[:1]),
+        latest_photo=Subquery(photos.order_by(
+            '-progress__date', '-progress__created_at', 'uploaded_at', 'id'
+        ).values('pk')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('renovation', '0020_progress_property'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='circuit_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Liczba obwodów'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='last_progress_date',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Data ostatniego postępu'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='latest_photo',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='renovation.roomprogressphoto', verbose_name='Najnowsze zdjęcie'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='open_task_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Liczba otwartych zadań'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='photo_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Liczba zdjęć'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='progress_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Liczba wpisów postępu'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='session_minutes',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Łączny czas sesji pracy obejmujących to pomieszczenie', verbose_name='Minuty pracy'),
+        ),
+        migrations.RunPython(fill_room_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.0 on 2026-10-19 09:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+def split_wall_finishes(apps, schema_editor):
+    """One row per finish from the comma-separated values, a batch of rooms at a time"""
+    Room = apps.get_model('renovation', 'Room')
+    RoomWallFinish = apps.get_model('renovation', 'RoomWallFinish')
+
+    # values_list: the new reverse accessor shadows the old field on the model
+    rooms = Room.objects.exclude(wall_finishes='').order_by('pk').values_list('pk', 'wall_finishes')
+    batch = []
+    for room_id, value in rooms.iterator(chunk_size=BATCH_SIZE):
+        finishes = {finish.strip() for finish in value.split(',')} - {''}
+        batch.extend(RoomWallFinish(room_id=room_id, finish=finish) for finish in sorted(finishes))
+        if len(batch) >= BATCH_SIZE:
+            RoomWallFinish.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    RoomWallFinish.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def join_wall_finishes(apps, schema_editor):
+    Room = apps.get_model('renovation', 'Room')
+    RoomWallFinish = apps.get_model('renovation', 'RoomWallFinish')
+
+    finishes = {}
+    for room_id, finish in RoomWallFinish.objects.order_by('room_id', 'pk').values_list('room_id', 'finish'):
+        finishes.setdefault(room_id, []).append(finish)
+    for room_id, values in finishes.items():
+        Room.objects.filter(pk=room_id).update(wall_finishes=','.join(values)[:200])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('renovation', '0021_room_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomWallFinish',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('finish', models.CharField(db_index=True, max_length=100, verbose_name='Wykończenie ścian')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wall_finishes', to='renovation.room', verbose_name='Pomieszczenie')),
+            ],
+            options={
+                'verbose_name': 'Wykończenie ścian pomieszczenia',
+                'verbose_name_plural': 'Wykończenia ścian pomieszczeń',
+                'ordering': ['room', 'finish'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='roomwallfinish',
+            constraint=models.UniqueConstraint(fields=('room', 'finish'), name='room_wall_finish_unique'),
+        ),
+        migrations.RunPython(split_wall_finishes, join_wall_finishes),
+        migrations.RemoveField(
+            model_name='room',
+            name='wall_finishes',
+        ),
+    ]
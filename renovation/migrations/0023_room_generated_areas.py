@@ -0,0 +1,29 @@
+# Generated by Django 5.0 on 2026-10-19 09:38
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('renovation', '0022_room_wall_finishes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='floor_area',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('width'), '*', models.F('length')), output_field=models.DecimalField(decimal_places=2, max_digits=12), verbose_name='Powierzchnia podłogi (m²)'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='volume',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('width'), '*', models.F('length')), '*', models.F('height')), output_field=models.DecimalField(decimal_places=2, max_digits=14), verbose_name='Kubatura (m³)'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='wall_area',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('width'), '+', models.F('length')), '*', models.F('height')), '*', models.Value(2)), help_text='Bez odliczenia okien i drzwi', output_field=models.DecimalField(decimal_places=2, max_digits=12), verbose_name='Powierzchnia ścian (m²)'),
+        ),
+    ]
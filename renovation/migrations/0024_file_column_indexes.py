@@ -0,0 +1,33 @@
+# Generated by Django 5.0 on 2026-10-19 09:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('renovation', '0023_room_generated_areas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='equipment',
+            name='receipt_photo',
+            field=models.ImageField(blank=True, db_index=True, null=True, upload_to='equipment/receipts/%Y/%m/', verbose_name='Zdjęcie paragonu'),
+        ),
+        migrations.AlterField(
+            model_name='equipmentphoto',
+            name='photo',
+            field=models.ImageField(db_index=True, upload_to='equipment/photos/%Y/%m/', verbose_name='Zdjęcie'),
+        ),
+        migrations.AlterField(
+            model_name='purchase',
+            name='receipt_photo',
+            field=models.ImageField(blank=True, db_index=True, null=True, upload_to='receipts/%Y/%m/', verbose_name='Zdjęcie paragonu'),
+        ),
+        migrations.AlterField(
+            model_name='roomprogressphoto',
+            name='photo',
+            field=models.ImageField(db_index=True, upload_to='progress/%Y/%m/', verbose_name='Zdjęcie'),
+        ),
+    ]
@@ -1,8 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Property(models.Model):
@@ -89,6 +91,57 @@ class Property(models.Model):
         return f"{self.street_address}, {self.postal_code} {self.city}, {self.country}"
 
 
+class PropertyDataVersion(models.Model):
+    """Cheap per-property change marker, bumped on every write to property data"""
+
+    property = models.OneToOneField(
+        Property,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='data_version',
+        verbose_name=_('Nieruchomość')
+    )
+    version = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name=_('Wersja')
+    )
+    updated_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name=_('Data aktualizacji')
+    )
+
+    class Meta:
+        verbose_name = _('Wersja danych nieruchomości')
+        verbose_name_plural = _('Wersje danych nieruchomości')
+
+    def __str__(self):
+        return f"{self.property_id} v{self.version}"
+
+    @classmethod
+    def for_property(cls, property_id):
+        """Get the version row for a property, creating it on first use"""
+        version, _created = cls.objects.get_or_create(property_id=property_id)
+        return version
+
+    @classmethod
+    def bump(cls, property_ids):
+        """Mark data of the given properties as changed"""
+        property_ids = {pk for pk in property_ids if pk}
+        if not property_ids:
+            return
+
+        now = timezone.now()
+        cls.objects.filter(property_id__in=property_ids).update(
+            version=models.F('version') + 1,
+            updated_at=now
+        )
+        existing = set(cls.objects.filter(property_id__in=property_ids).values_list('property_id', flat=True))
+        cls.objects.bulk_create(
+            [cls(property_id=pk, version=1, updated_at=now) for pk in property_ids - existing],
+            ignore_conflicts=True
+        )
+
+
 class PurchaseCategory(models.Model):
     """Category for renovation purchases"""
 
@@ -127,6 +180,70 @@ class PurchaseCategory(models.Model):
         return self.get_name_display()
 
 
+class Vendor(models.Model):
+    """Shop or supplier shared by purchases, equipment and shopping items"""
+
+    name = models.CharField(
+        max_length=200,
+        verbose_name=_('Nazwa')
+    )
+    normalized_name = models.CharField(
+        max_length=200,
+        unique=True,
+        verbose_name=_('Nazwa znormalizowana'),
+        help_text=_('Małe litery, bez polskich znaków i interpunkcji')
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_('Data utworzenia')
+    )
+
+    class Meta:
+        verbose_name = _('Sklep')
+        verbose_name_plural = _('Sklepy')
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        from .vendors import normalize_vendor_name
+
+        self.normalized_name = normalize_vendor_name(self.name)
+        super().save(*args, **kwargs)
+
+
+class VendorAlias(models.Model):
+    """Alternative spelling of a vendor name, e.g. "CASTORAMA Kraków" for Castorama"""
+
+    vendor = models.ForeignKey(
+        Vendor,
+        on_delete=models.CASCADE,
+        related_name='aliases',
+        verbose_name=_('Sklep')
+    )
+    alias = models.CharField(
+        max_length=200,
+        unique=True,
+        verbose_name=_('Alias'),
+        help_text=_('Zapisywany w postaci znormalizowanej')
+    )
+
+    class Meta:
+        verbose_name = _('Alias sklepu')
+        verbose_name_plural = _('Aliasy sklepów')
+        ordering = ['vendor', 'alias']
+
+    def __str__(self):
+        return f"{self.alias} -> {self.vendor}"
+
+    def save(self, *args, **kwargs):
+        from .vendors import normalize_vendor_name
+
+        self.alias = normalize_vendor_name(self.alias)
+        super().save(*args, **kwargs)
+
+
 class Purchase(models.Model):
     """Record of a purchase made for the renovation"""
 
@@ -155,11 +272,21 @@ class Purchase(models.Model):
         max_length=200,
         verbose_name=_('Sklep/Dostawca')
     )
+    normalized_vendor = models.ForeignKey(
+        Vendor,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='purchases',
+        verbose_name=_('Sklep (znormalizowany)')
+    )
     description = models.TextField(
         verbose_name=_('Opis')
     )
     receipt_photo = models.ImageField(
         upload_to='receipts/%Y/%m/',
+        db_index=True,
         blank=True,
         null=True,
         verbose_name=_('Zdjęcie paragonu')
@@ -184,12 +311,150 @@ class Purchase(models.Model):
         indexes = [
             models.Index(fields=['-date']),
             models.Index(fields=['category', '-date']),
+            # Duplicate detection for bulk imports
+            models.Index(fields=['property', 'date', 'amount', 'vendor']),
         ]
 
     def __str__(self):
         return f"{self.date} - {self.vendor} - {self.amount} PLN"
 
 
+class MonthlySpend(models.Model):
+    """Monthly spending rollup per property and category, maintained from purchases"""
+
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        related_name='monthly_spend',
+        verbose_name=_('Nieruchomość')
+    )
+    month = models.DateField(
+        verbose_name=_('Miesiąc')
+    )
+    category = models.ForeignKey(
+        PurchaseCategory,
+        on_delete=models.CASCADE,
+        related_name='monthly_spend',
+        verbose_name=_('Kategoria')
+    )
+    total = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name=_('Suma')
+    )
+    count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Liczba zakupów')
+    )
+
+    class Meta:
+        verbose_name = _('Wydatki miesięczne')
+        verbose_name_plural = _('Wydatki miesięczne')
+        ordering = ['property', 'month', 'category']
+        unique_together = [['property', 'month', 'category']]
+
+    def __str__(self):
+        return f"{self.property.name} - {self.month:%Y-%m} - {self.category}: {self.total} PLN"
+
+    @staticmethod
+    def month_start(day):
+        """First day of the month containing the given date"""
+        return day.replace(day=1)
+
+    @staticmethod
+    def add_months(month, months):
+        """Shift a first-of-month date by a number of months"""
+        index = month.year * 12 + month.month - 1 + months
+        return month.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+    @classmethod
+    def monthly_totals(cls, property_obj, start, end):
+        """Spending per month between two months (inclusive), zero-filled"""
+        start, end = cls.month_start(start), cls.month_start(end)
+        totals = dict(
+            cls.objects.filter(
+                property=property_obj,
+                month__range=(start, end)
+            ).values('month').annotate(
+                month_total=models.Sum('total')
+            ).values_list('month', 'month_total')
+        )
+
+        result = []
+        month = start
+        while month <= end:
+            result.append((month, totals.get(month, Decimal('0.00'))))
+            if month == end:
+                # The month after December 9999 does not exist
+                break
+            month = cls.add_months(month, 1)
+        return result
+
+    @classmethod
+    def category_totals(cls, property_obj, start=None, end=None):
+        """Spending and purchase count per category, largest first"""
+        rows = cls.objects.filter(property=property_obj)
+        if start:
+            rows = rows.filter(month__gte=cls.month_start(start))
+        if end:
+            rows = rows.filter(month__lte=cls.month_start(end))
+        return rows.values('category__name').annotate(
+            category_total=models.Sum('total'),
+            category_count=models.Sum('count')
+        ).order_by('-category_total')
+
+    @classmethod
+    def refresh(cls, property_id, month, category_id):
+        """Recalculate a single (property, month, category) bucket from purchases"""
+        from calendar import monthrange
+
+        month = cls.month_start(month)
+        month_end = month.replace(day=monthrange(month.year, month.month)[1])
+        totals = Purchase.objects.filter(
+            property_id=property_id,
+            category_id=category_id,
+            date__range=(month, month_end)
+        ).aggregate(total=models.Sum('amount'), count=models.Count('id'))
+
+        if totals['count']:
+            cls.objects.update_or_create(
+                property_id=property_id,
+                month=month,
+                category_id=category_id,
+                defaults={'total': totals['total'], 'count': totals['count']}
+            )
+        else:
+            cls.objects.filter(property_id=property_id, month=month, category_id=category_id).delete()
+
+    @classmethod
+    def rebuild(cls, property_id=None):
+        """Rebuild the rollup from scratch, for one property or all of them"""
+        from django.db import transaction
+        from django.db.models.functions import TruncMonth
+
+        purchases = Purchase.objects.all()
+        rollup = cls.objects.all()
+        if property_id is not None:
+            purchases = purchases.filter(property_id=property_id)
+            rollup = rollup.filter(property_id=property_id)
+
+        rows = purchases.annotate(
+            month=TruncMonth('date')
+        ).values('property_id', 'month', 'category_id').annotate(
+            total=models.Sum('amount'),
+            count=models.Count('id')
+        ).order_by()
+
+        with transaction.atomic():
+            rollup.delete()
+            created = cls.objects.bulk_create(
+                [cls(**row) for row in rows],
+                batch_size=500
+            )
+        return len(created)
+
+
 class Room(models.Model):
     """Rooms in the property being renovated"""
 
@@ -225,6 +490,11 @@ class Room(models.Model):
         ('mikrocement', _('Mikrocement')),
     ]
 
+    COUNTER_FIELDS = (
+        'progress_count', 'photo_count', 'last_progress_date', 'latest_photo',
+        'circuit_count', 'open_task_count', 'session_minutes',
+    )
+
     property = models.ForeignKey(
         Property,
         on_delete=models.CASCADE,
@@ -276,6 +546,27 @@ class Room(models.Model):
         verbose_name=_('Powierzchnia (m²)')
     )
 
+    # Computed by the database from the dimensions
+    floor_area = models.GeneratedField(
+        expression=models.F('width') * models.F('length'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
+        verbose_name=_('Powierzchnia podłogi (m²)')
+    )
+    wall_area = models.GeneratedField(
+        expression=(models.F('width') + models.F('length')) * models.F('height') * 2,
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
+        verbose_name=_('Powierzchnia ścian (m²)'),
+        help_text=_('Bez odliczenia okien i drzwi')
+    )
+    volume = models.GeneratedField(
+        expression=models.F('width') * models.F('length') * models.F('height'),
+        output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        db_persist=True,
+        verbose_name=_('Kubatura (m³)')
+    )
+
     # Finishes
     floor_type = models.CharField(
         max_length=50,
@@ -283,12 +574,7 @@ class Room(models.Model):
         blank=True,
         verbose_name=_('Typ podłogi')
     )
-    wall_finishes = models.CharField(
-        max_length=200,
-        blank=True,
-        verbose_name=_('Wykończenie ścian'),
-        help_text=_('Oddziel przecinkami, np: farba,tapeta')
-    )
+    # Wall finishes are stored as RoomWallFinish rows (room.wall_finishes)
 
     # Status and progress
     current_status = models.TextField(
@@ -313,6 +599,50 @@ class Room(models.Model):
         blank=True,
         verbose_name=_('Opis')
     )
+
+    # Summary counters, kept up to date by signals (renovation/room_counters.py)
+    progress_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('Liczba wpisów postępu')
+    )
+    photo_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('Liczba zdjęć')
+    )
+    last_progress_date = models.DateField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name=_('Data ostatniego postępu')
+    )
+    latest_photo = models.ForeignKey(
+        'RoomProgressPhoto',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        editable=False,
+        related_name='+',
+        verbose_name=_('Najnowsze zdjęcie')
+    )
+    circuit_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('Liczba obwodów')
+    )
+    open_task_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('Liczba otwartych zadań')
+    )
+    session_minutes = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('Minuty pracy'),
+        help_text=_('Łączny czas sesji pracy obejmujących to pomieszczenie')
+    )
+
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name=_('Data utworzenia')
@@ -333,12 +663,92 @@ class Room(models.Model):
             return f"{self.property.name} - {self.short_name}"
         return f"{self.property.name} - {self.get_name_display()}"
 
+    def clean(self):
+        super().clean()
+        if self.pk and self.property_id and self.split_work_sessions(self.property_id).exists():
+            raise ValidationError(_('Pomieszczenie ma sesje pracy obejmujące pomieszczenia innej nieruchomości.'))
+
+    @staticmethod
+    def wall_finish_choices():
+        """Wall finishes offered for rooms: the configured dropdown choices, or the built-in list"""
+        return DropdownChoice.get_choices_for_type('wall_finish') or Room.WALL_FINISH_CHOICES
+
+    @staticmethod
+    def wall_finish_labels():
+        """Labels of the offered wall finishes and of built-in ones stored before the dropdown was configured"""
+        return {**dict(Room.WALL_FINISH_CHOICES), **dict(Room.wall_finish_choices())}
+
+    def split_work_sessions(self, property_id):
+        """Work sessions of this room that also cover rooms outside the given property"""
+        return self.work_sessions.filter(
+            pk__in=WorkSession.rooms_worked_on.through.objects.exclude(room_id=self.pk).exclude(
+                room__property_id=property_id
+            ).values('worksession_id')
+        )
+
     def get_display_name(self):
         """Get the display name for the room"""
         if self.short_name:
             return self.short_name
         return self.get_name_display()
 
+    def set_wall_finishes(self, finishes):
+        """Replace the room's wall finishes with the given values"""
+        finishes = set(finishes)
+        self.wall_finishes.exclude(finish__in=finishes).delete()
+        RoomWallFinish.objects.bulk_create(
+            [RoomWallFinish(room=self, finish=finish) for finish in sorted(finishes)],
+            ignore_conflicts=True
+        )
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and not args:
+            # Unset generated fields look deferred, and Django 5.0 would turn the save into an update
+            kwargs.setdefault('force_insert', True)
+        elif not self._state.adding and kwargs.get('update_fields') is None:
+            # Counters only change through F() updates; a stale copy must not overwrite them
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and not field.generated and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
+class RoomWallFinish(models.Model):
+    """Wall finish used in a room, one row per finish so rooms can be filtered by it"""
+
+    room = models.ForeignKey(
+        Room,
+        on_delete=models.CASCADE,
+        related_name='wall_finishes',
+        verbose_name=_('Pomieszczenie')
+    )
+    # Choices come from Room.wall_finish_choices(), which can be configured
+    finish = models.CharField(
+        max_length=100,
+        db_index=True,
+        verbose_name=_('Wykończenie ścian')
+    )
+
+    class Meta:
+        verbose_name = _('Wykończenie ścian pomieszczenia')
+        verbose_name_plural = _('Wykończenia ścian pomieszczeń')
+        ordering = ['room', 'finish']
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'finish'], name='room_wall_finish_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.room} - {self.get_finish_display()}"
+
+    def clean(self):
+        super().clean()
+        if self.finish and self.finish not in dict(Room.wall_finish_choices()):
+            raise ValidationError({'finish': _('Nieznane wykończenie ścian.')})
+
+    def get_finish_display(self):
+        return Room.wall_finish_labels().get(self.finish, self.finish)
+
 
 class RoomProgress(models.Model):
     """Track progress photos and updates for each room"""
@@ -349,6 +759,14 @@ class RoomProgress(models.Model):
         related_name='progress_entries',
         verbose_name=_('Pomieszczenie')
     )
+    # Copy of room.property, so per-property queries need no join
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        editable=False,
+        related_name='progress_entries',
+        verbose_name=_('Nieruchomość')
+    )
     date = models.DateField(
         verbose_name=_('Data')
     )
@@ -375,11 +793,16 @@ class RoomProgress(models.Model):
         indexes = [
             models.Index(fields=['room', '-date']),
             models.Index(fields=['-date']),
+            models.Index(fields=['property', '-date']),
         ]
 
     def __str__(self):
         return f"{self.room} - {self.date}"
 
+    def save(self, *args, **kwargs):
+        self.property_id = self.room.property_id
+        super().save(*args, **kwargs)
+
 
 class RoomProgressPhoto(models.Model):
     """Photos associated with room progress entries"""
@@ -390,10 +813,32 @@ class RoomProgressPhoto(models.Model):
         related_name='photos',
         verbose_name=_('Postęp')
     )
+    # Copy of progress.property, so per-property queries need no join
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        editable=False,
+        related_name='progress_photos',
+        verbose_name=_('Nieruchomość')
+    )
     photo = models.ImageField(
         upload_to='progress/%Y/%m/',
+        db_index=True,
         verbose_name=_('Zdjęcie')
     )
+    # Filled in when the photo is stored (renovation/images.py), after EXIF rotation
+    width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('Szerokość (px)')
+    )
+    height = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('Wysokość (px)')
+    )
     caption = models.CharField(
         max_length=200,
         blank=True,
@@ -408,14 +853,31 @@ class RoomProgressPhoto(models.Model):
         verbose_name = _('Zdjęcie postępu')
         verbose_name_plural = _('Zdjęcia postępu')
         ordering = ['uploaded_at']
+        indexes = [
+            # Keyset pagination of the photo gallery
+            models.Index(fields=['property', 'uploaded_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.progress} - {self.caption or 'Photo'}"
 
+    def save(self, *args, **kwargs):
+        self.property_id = self.progress.property_id
+        super().save(*args, **kwargs)
+
 
 class WorkSession(models.Model):
     """Track work sessions/visits to the renovation site"""
 
+    related_property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='work_sessions',
+        verbose_name=_('Nieruchomość'),
+        help_text=_('Uzupełniana z pomieszczeń; wszystkie pomieszczenia sesji należą do tej nieruchomości')
+    )
     date = models.DateField(
         verbose_name=_('Data')
     )
@@ -430,6 +892,13 @@ class WorkSession(models.Model):
     notes = models.TextField(
         verbose_name=_('Notatki')
     )
+    duration_minutes = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name=_('Czas trwania (min)'),
+        help_text=_('Wyliczany przy zapisie, sumowany w kalendarzu pracy')
+    )
     rooms_worked_on = models.ManyToManyField(
         Room,
         blank=True,
@@ -451,12 +920,21 @@ class WorkSession(models.Model):
         ordering = ['-date', '-start_time']
         indexes = [
             models.Index(fields=['-date', '-start_time']),
+            models.Index(fields=['related_property', '-date']),
         ]
 
     def __str__(self):
         end = f" - {self.end_time}" if self.end_time else ""
         return f"{self.date} {self.start_time}{end}"
 
+    def save(self, *args, **kwargs):
+        duration = self.duration
+        self.duration_minutes = int(duration.total_seconds() // 60) if duration is not None else None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'start_time', 'end_time'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'duration_minutes'}
+        super().save(*args, **kwargs)
+
     @property
     def duration(self):
         """Calculate duration of work session"""
@@ -648,8 +1126,18 @@ class Equipment(models.Model):
         blank=True,
         verbose_name=_('Miejsce zakupu')
     )
+    normalized_vendor = models.ForeignKey(
+        Vendor,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='equipment',
+        verbose_name=_('Sklep (znormalizowany)')
+    )
     receipt_photo = models.ImageField(
         upload_to='equipment/receipts/%Y/%m/',
+        db_index=True,
         blank=True,
         null=True,
         verbose_name=_('Zdjęcie paragonu')
@@ -731,8 +1219,22 @@ class EquipmentPhoto(models.Model):
     )
     photo = models.ImageField(
         upload_to='equipment/photos/%Y/%m/',
+        db_index=True,
         verbose_name=_('Zdjęcie')
     )
+    # Filled in when the photo is stored (renovation/images.py), after EXIF rotation
+    width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('Szerokość (px)')
+    )
+    height = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('Wysokość (px)')
+    )
     caption = models.CharField(
         max_length=200,
         blank=True,
@@ -747,6 +1249,10 @@ class EquipmentPhoto(models.Model):
         verbose_name = _('Zdjęcie sprzętu')
         verbose_name_plural = _('Zdjęcia sprzętu')
         ordering = ['uploaded_at']
+        indexes = [
+            # Keyset pagination of the photo gallery
+            models.Index(fields=['uploaded_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.equipment.name} - {self.caption or 'Zdjęcie'}"
@@ -793,6 +1299,20 @@ class EquipmentAssignment(models.Model):
             models.Index(fields=['equipment', 'end_date']),
             models.Index(fields=['assigned_property', 'end_date']),
         ]
+        # Overlapping assignments of the same equipment are rejected by the
+        # database itself (see migration 0016 and renovation/availability.py)
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(end_date__isnull=True) | models.Q(end_date__gte=models.F('start_date')),
+                name='equipment_assignment_end_after_start',
+            ),
+            # At most one open assignment per equipment; also makes assigning a single INSERT
+            models.UniqueConstraint(
+                fields=['equipment'],
+                condition=models.Q(end_date__isnull=True),
+                name='equipment_assignment_one_open',
+            ),
+        ]
 
     def __str__(self):
         status = _('aktywne') if not self.end_date else f"{_('do')} {self.end_date}"
@@ -981,6 +1501,16 @@ class ShoppingItem(models.Model):
         verbose_name=_('Sklep')
     )
 
+    normalized_vendor = models.ForeignKey(
+        Vendor,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='shopping_items',
+        verbose_name=_('Sklep (znormalizowany)')
+    )
+
     estimated_price = models.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -1037,3 +1567,127 @@ class ShoppingItem(models.Model):
         if self.estimated_price and self.quantity:
             return self.estimated_price * self.quantity
         return self.estimated_price or Decimal('0.00')
+
+
+class SearchDocument(models.Model):
+    """
+    Denormalized full-text search entry, one per indexed record.
+
+    The search index itself lives outside the ORM: a generated tsvector column
+    with a GIN index on PostgreSQL and an FTS5 table on SQLite (see
+    migration 0011 and renovation/search.py).
+    """
+
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='search_documents',
+        verbose_name=_('Właściciel')
+    )
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='search_documents',
+        verbose_name=_('Nieruchomość'),
+        help_text=_('Puste dla rekordów wspólnych dla wszystkich nieruchomości (np. sprzęt)')
+    )
+    kind = models.CharField(
+        max_length=30,
+        verbose_name=_('Rodzaj')
+    )
+    object_id = models.PositiveIntegerField(
+        verbose_name=_('ID obiektu')
+    )
+    link_pk = models.PositiveIntegerField(
+        verbose_name=_('ID strony wyniku'),
+        help_text=_('Klucz obiektu, którego strona pokazuje ten rekord')
+    )
+    title = models.CharField(
+        max_length=255,
+        verbose_name=_('Tytuł')
+    )
+    body = models.TextField(
+        blank=True,
+        verbose_name=_('Treść')
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_('Data aktualizacji')
+    )
+
+    class Meta:
+        verbose_name = _('Dokument wyszukiwania')
+        verbose_name_plural = _('Dokumenty wyszukiwania')
+        unique_together = [['kind', 'object_id']]
+        indexes = [
+            models.Index(fields=['owner', 'property']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}: {self.title}"
+
+
+class StoredFile(models.Model):
+    """
+    Reference count of a content-addressed media file (see renovation/storage.py).
+
+    Photos and receipts with identical bytes share one file; it is deleted when
+    the last record using it is deleted or gets another file.
+    """
+
+    name = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name=_('Ścieżka pliku')
+    )
+    sha256 = models.CharField(
+        max_length=64,
+        db_index=True,
+        verbose_name=_('Skrót SHA-256')
+    )
+    size = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name=_('Rozmiar (bajty)')
+    )
+    ref_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Liczba odwołań')
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_('Data utworzenia')
+    )
+
+    class Meta:
+        verbose_name = _('Plik')
+        verbose_name_plural = _('Pliki')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+    @classmethod
+    def acquire(cls, name, sha256, size=0):
+        """Count one more record using the file"""
+        with transaction.atomic():
+            stored, created = cls.objects.select_for_update().get_or_create(
+                name=name,
+                defaults={'sha256': sha256, 'size': size, 'ref_count': 1}
+            )
+            if not created:
+                cls.objects.filter(pk=stored.pk).update(ref_count=models.F('ref_count') + 1)
+
+    @classmethod
+    def release(cls, name, storage):
+        """Count one record less using the file; delete the file after the last one"""
+        with transaction.atomic():
+            stored = cls.objects.select_for_update().filter(name=name).first()
+            if stored is None:
+                return
+            if stored.ref_count > 1:
+                cls.objects.filter(pk=stored.pk).update(ref_count=models.F('ref_count') - 1)
+                return
+            stored.delete()
+        transaction.on_commit(lambda: storage.delete(name))
@@ -0,0 +1,110 @@
+"""
+Summary counters kept on Room: progress entries, photos, the latest progress
+date and photo, electrical circuits, open tasks and minutes of work sessions.
+
+Signal handlers (signals.py) apply every change as an F() increment in a single
+UPDATE, so concurrent writers never lose each other's changes, and room
+listings read the counters without touching the related tables. The latest
+progress date and photo are not additive and are recomputed with subqueries.
+reconcile() rebuilds all counters from the source tables to fix any drift
+(see the reconcile_room_counters command).
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import PropertyDataVersion, Room, RoomProgress, RoomProgressPhoto, ElectricalCircuit, RenovationTask, WorkSession
+
+
+def _rooms(room_ids):
+    """Rooms by a list of IDs (None entries ignored) or a queryset of room IDs"""
+    if isinstance(room_ids, (list, tuple, set)):
+        room_ids = [pk for pk in room_ids if pk]
+        if not room_ids:
+            return Room.objects.none()
+    return Room.objects.filter(pk__in=room_ids)
+
+
+def adjust(room_ids, **deltas):
+    """Add the given deltas to the counters of the rooms"""
+    changes = {}
+    for field, delta in deltas.items():
+        if delta > 0:
+            changes[field] = F(field) + delta
+        elif delta < 0:
+            # A counter that has drifted low stays at zero until it is reconciled
+            changes[field] = Greatest(F(field) - (-delta), Value(0))
+    if changes:
+        _rooms(room_ids).update(**changes)
+
+
+def _latest_progress():
+    return RoomProgress.objects.filter(room=OuterRef('pk')).order_by('-date', '-created_at')
+
+
+def _latest_photo():
+    """First photo of the most recent progress entry that has photos"""
+    return RoomProgressPhoto.objects.filter(progress__room=OuterRef('pk')).order_by(
+        '-progress__date', '-progress__created_at', 'uploaded_at', 'id'
+    )
+
+
+def latest_values():
+    return {
+        'last_progress_date': Subquery(_latest_progress().values('date')[:1]),
+        'latest_photo': Subquery(_latest_photo().values('pk')[:1]),
+    }
+
+
+def refresh_latest(room_ids):
+    _rooms(room_ids).update(**latest_values())
+
+
+def _count(queryset):
+    counts = queryset.order_by().values('room_id').annotate(count=Count('*')).values('count')
+    return Coalesce(Subquery(counts), Value(0))
+
+
+def counter_values():
+    """Expressions computing every counter of a room from the source tables"""
+    session_links = WorkSession.rooms_worked_on.through.objects.filter(room=OuterRef('pk'))
+    session_minutes = session_links.order_by().values('room_id').annotate(
+        minutes=Sum('worksession__duration_minutes')
+    ).values('minutes')
+    return {
+        'progress_count': _count(RoomProgress.objects.filter(room=OuterRef('pk'))),
+        'photo_count': Coalesce(Subquery(
+            RoomProgressPhoto.objects.filter(progress__room=OuterRef('pk')).order_by().values(
+                'progress__room'
+            ).annotate(count=Count('*')).values('count')
+        ), Value(0)),
+        'circuit_count': _count(ElectricalCircuit.objects.filter(room=OuterRef('pk'))),
+        'open_task_count': _count(
+            RenovationTask.objects.filter(room=OuterRef('pk')).exclude(status=RenovationTask.STATUS_COMPLETED)
+        ),
+        'session_minutes': Coalesce(Subquery(session_minutes), Value(0)),
+        **latest_values(),
+    }
+
+
+def reconcile(rooms=None):
+    """
+    Recompute the counters of the given rooms (all by default) and store the
+    ones that drifted. Returns the number of rooms that were corrected.
+    """
+    rooms = Room.objects.all() if rooms is None else rooms
+    expected = {f'expected_{field}': value for field, value in counter_values().items()}
+    fields = [field if field != 'latest_photo' else 'latest_photo_id' for field in Room.COUNTER_FIELDS]
+
+    drifted = []
+    rows = rooms.annotate(**expected).values('pk', *fields, *expected)
+    for row in rows.iterator(chunk_size=500):
+        actual = [row[field] for field in fields]
+        wanted = [row[f'expected_{field}'] for field in Room.COUNTER_FIELDS]
+        if actual != wanted:
+            drifted.append(row['pk'])
+
+    for start in range(0, len(drifted), 500):
+        rooms = Room.objects.filter(pk__in=drifted[start:start + 500])
+        rooms.update(**counter_values())
+        PropertyDataVersion.bump(rooms.values_list('property_id', flat=True).distinct())
+    return len(drifted)
@@ -0,0 +1,256 @@
+"""
+Full-text search across purchases, progress notes, tasks, shopping items,
+equipment and electrical circuits.
+
+Every indexed record gets one SearchDocument row. Matching and ranking run in
+the database: a weighted tsvector column with a GIN index on PostgreSQL and an
+FTS5 table on SQLite, both created by migration 0011. Both index the text with
+"ł" folded to "l", which their tokenizers leave alone.
+"""
+import re
+from collections import namedtuple
+
+from django.db import connection
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from django.utils.translation import gettext_lazy as _
+
+from .models import (
+    Purchase,
+    RoomProgress,
+    RenovationTask,
+    ShoppingItem,
+    Equipment,
+    ElectricalCircuit,
+    SearchDocument,
+)
+
+
+# Highlight markers that cannot appear in user text, replaced after escaping
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+MAX_QUERY_TERMS = 8
+
+
+def _join(*parts):
+    return '\n'.join(str(part) for part in parts if part)
+
+
+def _purchase(purchase):
+    return {
+        'owner_id': purchase.property.owner_id,
+        'property_id': purchase.property_id,
+        'link_pk': purchase.pk,
+        'title': f"{purchase.vendor} - {purchase.amount} PLN ({purchase.date:%d.%m.%Y})",
+        'body': _join(purchase.description, purchase.notes),
+    }
+
+
+def _room_progress(progress):
+    return {
+        'owner_id': progress.room.property.owner_id,
+        'property_id': progress.room.property_id,
+        'link_pk': progress.room_id,
+        'title': f"{progress.room.get_display_name()} ({progress.date:%d.%m.%Y})",
+        'body': _join(progress.description, progress.notes),
+    }
+
+
+def _renovation_task(task):
+    return {
+        'owner_id': task.related_property.owner_id,
+        'property_id': task.related_property_id,
+        'link_pk': task.pk,
+        'title': task.title,
+        'body': task.description,
+    }
+
+
+def _shopping_item(item):
+    return {
+        'owner_id': item.related_property.owner_id,
+        'property_id': item.related_property_id,
+        'link_pk': item.pk,
+        'title': item.title,
+        'body': _join(item.description, item.vendor),
+    }
+
+
+def _equipment(equipment):
+    return {
+        'owner_id': equipment.owner_id,
+        'property_id': None,
+        'link_pk': equipment.pk,
+        'title': equipment.name,
+        'body': _join(equipment.purpose, equipment.vendor, equipment.notes),
+    }
+
+
+def _electrical_circuit(circuit):
+    return {
+        'owner_id': circuit.room.property.owner_id,
+        'property_id': circuit.room.property_id,
+        'link_pk': circuit.room_id,
+        'title': f"{circuit.breaker_number} - {circuit.circuit_name}",
+        'body': _join(circuit.connected_appliances, circuit.notes),
+    }
+
+
+SearchSource = namedtuple('SearchSource', ['model', 'label', 'url_name', 'document', 'related'])
+
+# kind -> how records of a model become search documents
+SEARCH_SOURCES = {
+    'purchase': SearchSource(Purchase, _('Zakup'), 'purchase_edit', _purchase, ['property']),
+    'progress': SearchSource(RoomProgress, _('Postęp'), 'room_detail', _room_progress, ['room__property']),
+    'task': SearchSource(RenovationTask, _('Zadanie'), 'renovation_task_edit', _renovation_task, ['related_property']),
+    'shopping': SearchSource(ShoppingItem, _('Zakupy do zrobienia'), 'shopping_item_edit', _shopping_item, ['related_property']),
+    'equipment': SearchSource(Equipment, _('Sprzęt'), 'equipment_detail', _equipment, []),
+    'circuit': SearchSource(ElectricalCircuit, _('Obwód'), 'room_detail', _electrical_circuit, ['room__property']),
+}
+
+MODEL_KINDS = {source.model: kind for kind, source in SEARCH_SOURCES.items()}
+
+
+def index_object(instance):
+    """Create or refresh the search document of a record"""
+    kind = MODEL_KINDS[type(instance)]
+    SearchDocument.objects.update_or_create(
+        kind=kind,
+        object_id=instance.pk,
+        defaults=SEARCH_SOURCES[kind].document(instance)
+    )
+
+
+def remove_object(instance):
+    SearchDocument.objects.filter(kind=MODEL_KINDS[type(instance)], object_id=instance.pk).delete()
+
+
+def index_objects(instances, batch_size=500):
+    """Index many records of one model at once (e.g. after bulk_create)"""
+    instances = [instance for instance in instances if instance.pk]
+    if not instances:
+        return
+    kind = MODEL_KINDS[type(instances[0])]
+    source = SEARCH_SOURCES[kind]
+
+    SearchDocument.objects.filter(kind=kind, object_id__in=[instance.pk for instance in instances]).delete()
+    SearchDocument.objects.bulk_create(
+        [SearchDocument(kind=kind, object_id=instance.pk, **source.document(instance)) for instance in instances],
+        batch_size=batch_size
+    )
+
+
+def rebuild_index(batch_size=500):
+    """Recreate all search documents from the source tables"""
+    SearchDocument.objects.all().delete()
+    total = 0
+    for source in SEARCH_SOURCES.values():
+        queryset = source.model.objects.select_related(*source.related).order_by('pk')
+        batch = []
+        for instance in queryset.iterator(chunk_size=batch_size):
+            batch.append(instance)
+            if len(batch) >= batch_size:
+                index_objects(batch, batch_size)
+                total += len(batch)
+                batch = []
+        index_objects(batch, batch_size)
+        total += len(batch)
+    return total
+
+
+def _query_terms(query):
+    """
+    Split user input into plain word terms (no search operators), with "ł"
+    folded like the indexed text (migration 0011)
+    """
+    return re.findall(r'\w+', query.lower().replace('ł', 'l'))[:MAX_QUERY_TERMS]
+
+
+def _postgresql_search(terms, owner_id, property_id, limit):
+    # Every term must match, the last one as a prefix so results appear while typing
+    tsquery = ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+    sql = f"""
+        SELECT d.id,
+               ts_headline('simple', d.title, q, 'HighlightAll=true, StartSel={MATCH_START}, StopSel={MATCH_END}'),
+               ts_headline('simple', d.body, q, 'MaxFragments=2, MaxWords=20, MinWords=8, FragmentDelimiter=" … ", StartSel={MATCH_START}, StopSel={MATCH_END}')
+        FROM renovation_searchdocument d, to_tsquery('simple', %s) q
+        WHERE d.owner_id = %s
+          AND (d.property_id = %s OR d.property_id IS NULL)
+          AND d.search_vector @@ q
+        ORDER BY ts_rank(d.search_vector, q) DESC, d.updated_at DESC
+        LIMIT %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [tsquery, owner_id, property_id, limit])
+        return cursor.fetchall()
+
+
+def _sqlite_search(terms, owner_id, property_id, limit):
+    match = ' '.join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+    sql = f"""
+        SELECT d.id,
+               highlight(renovation_searchdocument_fts, 0, '{MATCH_START}', '{MATCH_END}'),
+               snippet(renovation_searchdocument_fts, 1, '{MATCH_START}', '{MATCH_END}', ' … ', 24)
+        FROM renovation_searchdocument_fts
+        JOIN renovation_searchdocument d ON d.id = renovation_searchdocument_fts.rowid
+        WHERE renovation_searchdocument_fts MATCH %s
+          AND d.owner_id = %s
+          AND (d.property_id = %s OR d.property_id IS NULL)
+        ORDER BY bm25(renovation_searchdocument_fts, 10.0, 1.0), d.updated_at DESC
+        LIMIT %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match.strip(), owner_id, property_id, limit])
+        return cursor.fetchall()
+
+
+def _fallback_search(terms, owner_id, property_id, limit):
+    """Unranked substring search for databases without a full-text index"""
+    documents = SearchDocument.objects.filter(owner_id=owner_id).filter(
+        Q(property_id=property_id) | Q(property__isnull=True)
+    )
+    for term in terms:
+        documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+    return [(doc.id, doc.title, doc.body[:200]) for doc in documents.order_by('-updated_at')[:limit]]
+
+
+def _highlight(text):
+    """Escape a database snippet and turn the match markers into <mark> tags"""
+    text = escape(text or '')
+    return mark_safe(text.replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
+
+
+SearchResult = namedtuple('SearchResult', ['kind', 'label', 'url', 'title', 'snippet'])
+
+
+def search(user, property_obj, query, limit=50):
+    """
+    Ranked search in the documents of the given user's current property
+    (plus documents shared across properties), with highlighted snippets.
+    """
+    terms = _query_terms(query)
+    if not terms:
+        return []
+
+    backend = {
+        'postgresql': _postgresql_search,
+        'sqlite': _sqlite_search,
+    }.get(connection.vendor, _fallback_search)
+    rows = backend(terms, user.pk, property_obj.pk if property_obj else None, limit)
+
+    documents = SearchDocument.objects.in_bulk([row[0] for row in rows])
+    results = []
+    for doc_id, title, snippet in rows:
+        document = documents[doc_id]
+        source = SEARCH_SOURCES[document.kind]
+        results.append(SearchResult(
+            kind=document.kind,
+            label=source.label,
+            url=reverse(source.url_name, args=[document.link_pk]),
+            title=_highlight(title),
+            snippet=_highlight(snippet),
+        ))
+    return results
@@ -0,0 +1,480 @@
+"""
+Signal handlers keeping derived data in sync with the source models
+"""
+from django.db.models import Sum
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.dispatch import receiver
+from django.utils.translation import gettext as _
+
+from . import images, room_counters, search, uploads, utilization, vendors
+from .models import (
+    Property,
+    PropertyDataVersion,
+    Purchase,
+    MonthlySpend,
+    Room,
+    RoomProgress,
+    RoomProgressPhoto,
+    WorkSession,
+    ElectricalCircuit,
+    Equipment,
+    EquipmentPhoto,
+    EquipmentAssignment,
+    RenovationTask,
+    ShoppingItem,
+    DropdownChoice,
+    Vendor,
+    VendorAlias,
+)
+
+
+# Monthly spending rollup
+
+def _spend_bucket(purchase):
+    return (purchase.property_id, MonthlySpend.month_start(purchase.date), purchase.category_id)
+
+
+@receiver(pre_save, sender=Purchase)
+def remember_purchase_bucket(sender, instance, **kwargs):
+    """Remember the bucket an edited purchase belonged to before the change"""
+    instance._previous_spend_bucket = None
+    if instance.pk:
+        previous = Purchase.objects.filter(pk=instance.pk).only('property_id', 'date', 'category_id').first()
+        if previous:
+            instance._previous_spend_bucket = _spend_bucket(previous)
+
+
+@receiver(post_save, sender=Purchase)
+def update_monthly_spend_on_save(sender, instance, **kwargs):
+    bucket = _spend_bucket(instance)
+    MonthlySpend.refresh(*bucket)
+
+    previous = getattr(instance, '_previous_spend_bucket', None)
+    if previous and previous != bucket:
+        MonthlySpend.refresh(*previous)
+
+
+@receiver(post_delete, sender=Purchase)
+def update_monthly_spend_on_delete(sender, instance, **kwargs):
+    MonthlySpend.refresh(*_spend_bucket(instance))
+
+
+# Property data versions (HTTP conditional GET and fragment caching)
+
+def affected_property_ids(instance):
+    """Return IDs of the properties whose pages show the given object"""
+    if isinstance(instance, Property):
+        return [instance.pk]
+    if isinstance(instance, (Purchase, Room)):
+        return [instance.property_id]
+    if isinstance(instance, (RenovationTask, ShoppingItem)):
+        return [instance.related_property_id]
+    if isinstance(instance, (RoomProgress, RoomProgressPhoto)):
+        return [instance.property_id]
+    if isinstance(instance, ElectricalCircuit):
+        return Room.objects.filter(pk=instance.room_id).values_list('property_id', flat=True)
+    if isinstance(instance, WorkSession):
+        return [instance.related_property_id]
+    if isinstance(instance, Equipment):
+        # Equipment is listed per owner, so every property of the owner changes
+        return Property.objects.filter(owner_id=instance.owner_id).values_list('pk', flat=True)
+    if isinstance(instance, (EquipmentPhoto, EquipmentAssignment)):
+        return Property.objects.filter(owner__equipment=instance.equipment_id).values_list('pk', flat=True)
+    return []
+
+
+VERSIONED_MODELS = [
+    Property, Purchase, Room, RoomProgress, RoomProgressPhoto, WorkSession, ElectricalCircuit,
+    Equipment, EquipmentPhoto, EquipmentAssignment, RenovationTask, ShoppingItem,
+]
+
+
+def bump_property_version(sender, instance, **kwargs):
+    PropertyDataVersion.bump(list(affected_property_ids(instance)))
+
+
+def bump_property_version_on_rooms_change(sender, instance, action, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    property_ids = set(affected_property_ids(instance))
+    if pk_set:
+        property_ids.update(Room.objects.filter(pk__in=pk_set).values_list('property_id', flat=True))
+    PropertyDataVersion.bump(property_ids)
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(bump_property_version, sender=model, dispatch_uid=f'bump_version_save_{model.__name__}')
+    # pre_delete so related rows are still there to resolve the property
+    pre_delete.connect(bump_property_version, sender=model, dispatch_uid=f'bump_version_delete_{model.__name__}')
+
+m2m_changed.connect(
+    bump_property_version_on_rooms_change,
+    sender=WorkSession.rooms_worked_on.through,
+    dispatch_uid='bump_version_session_rooms'
+)
+
+
+# Property copied onto the records of a room
+
+@receiver(pre_save, sender=Room)
+def remember_room_property(sender, instance, **kwargs):
+    """Remember the property of an edited room"""
+    instance._previous_property_id = None
+    if instance.pk:
+        instance._previous_property_id = Room.objects.filter(pk=instance.pk).values_list(
+            'property_id', flat=True
+        ).order_by().first()
+
+
+@receiver(post_save, sender=Room)
+def move_room_progress(sender, instance, created, **kwargs):
+    """
+    A room moved to another property takes its progress entries, photos, tasks,
+    shopping items and work sessions along. Forms refuse moves that would split
+    a work session (Room.clean); a session split by other code loses this room.
+    """
+    previous = getattr(instance, '_previous_property_id', None)
+    if created or previous is None or previous == instance.property_id:
+        return
+    RoomProgress.objects.filter(room=instance).update(property_id=instance.property_id)
+    RoomProgressPhoto.objects.filter(progress__room=instance).update(property_id=instance.property_id)
+    RenovationTask.objects.filter(room=instance).update(related_property_id=instance.property_id)
+    ShoppingItem.objects.filter(room=instance).update(related_property_id=instance.property_id)
+
+    split = list(instance.split_work_sessions(instance.property_id))
+    if split:
+        instance.work_sessions.remove(*split)
+    WorkSession.objects.filter(rooms_worked_on=instance).update(related_property_id=instance.property_id)
+    # The version of the new property is bumped for the room itself
+    PropertyDataVersion.bump([previous])
+
+
+@receiver(post_save, sender=RoomProgress)
+def move_progress_photos(sender, instance, created, **kwargs):
+    """Photos follow a progress entry moved to a room of another property"""
+    if created:
+        return
+    instance.photos.exclude(property_id=instance.property_id).update(property_id=instance.property_id)
+
+
+# Property of work sessions
+
+def check_session_rooms(sender, instance, action, pk_set, reverse, **kwargs):
+    """
+    Fill the session's property from its first rooms and keep every room in that
+    property. Forms validate this themselves (WorkSessionForm); raising here only
+    guards the data against code that bypasses them.
+    """
+    if action != 'pre_add' or not pk_set:
+        return
+    if reverse:
+        # room.work_sessions.add(...)
+        sessions = WorkSession.objects.filter(pk__in=pk_set)
+        sessions.filter(related_property__isnull=True).update(related_property_id=instance.property_id)
+        if sessions.exclude(related_property_id=instance.property_id).exists():
+            raise ValidationError(_('Wszystkie pomieszczenia sesji pracy muszą należeć do jej nieruchomości.'))
+        return
+
+    property_ids = set(Room.objects.filter(pk__in=pk_set).values_list('property_id', flat=True))
+    if instance.related_property_id is None and len(property_ids) == 1:
+        instance.related_property_id = property_ids.pop()
+        instance.save(update_fields=['related_property'])
+        return
+    if property_ids - {instance.related_property_id}:
+        raise ValidationError(_('Wszystkie pomieszczenia sesji pracy muszą należeć do jej nieruchomości.'))
+
+
+m2m_changed.connect(
+    check_session_rooms,
+    sender=WorkSession.rooms_worked_on.through,
+    dispatch_uid='check_session_rooms'
+)
+
+
+# Full-text search documents
+
+def update_search_document(sender, instance, **kwargs):
+    search.index_object(instance)
+
+
+def remove_search_document(sender, instance, **kwargs):
+    search.remove_object(instance)
+
+
+for model in search.MODEL_KINDS:
+    post_save.connect(update_search_document, sender=model, dispatch_uid=f'search_save_{model.__name__}')
+    post_delete.connect(remove_search_document, sender=model, dispatch_uid=f'search_delete_{model.__name__}')
+
+
+@receiver(post_save, sender=Room)
+def reindex_room_documents(sender, instance, created, **kwargs):
+    """Progress entries and circuits show the room name in their search title"""
+    if created:
+        return
+    search.index_objects(list(instance.progress_entries.select_related('room__property')))
+    search.index_objects(list(instance.circuits.select_related('room__property')))
+
+
+# Normalized vendors
+
+def resolve_normalized_vendor(sender, instance, **kwargs):
+    instance.normalized_vendor_id = vendors.VendorResolver().resolve(instance.vendor)
+
+
+for model in (Purchase, Equipment, ShoppingItem):
+    pre_save.connect(resolve_normalized_vendor, sender=model, dispatch_uid=f'resolve_vendor_{model.__name__}')
+
+
+@receiver(pre_save, sender=VendorAlias)
+def remember_alias_vendor(sender, instance, **kwargs):
+    instance._previous_vendor_id = None
+    if instance.pk:
+        instance._previous_vendor_id = VendorAlias.objects.filter(pk=instance.pk).values_list(
+            'vendor_id', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=VendorAlias)
+def link_aliased_records(sender, instance, **kwargs):
+    """Records already stored under the aliased name move to the alias's vendor"""
+    vendors.apply_alias(instance, getattr(instance, '_previous_vendor_id', None))
+
+
+# Vendor autocomplete prefix index
+
+def vendor_owner_ids(instance):
+    if isinstance(instance, Equipment):
+        return [instance.owner_id]
+    if isinstance(instance, Purchase):
+        return Property.objects.filter(pk=instance.property_id).values_list('owner_id', flat=True)
+    if isinstance(instance, ShoppingItem):
+        return Property.objects.filter(pk=instance.related_property_id).values_list('owner_id', flat=True)
+    # Configured vendors and vendor names are shared by everyone
+    return User.objects.values_list('pk', flat=True)
+
+
+def invalidate_vendor_index(sender, instance, **kwargs):
+    vendors.invalidate_prefix_index(vendor_owner_ids(instance))
+
+
+for model in (Purchase, Equipment, ShoppingItem, DropdownChoice, Vendor):
+    post_save.connect(invalidate_vendor_index, sender=model, dispatch_uid=f'vendor_index_save_{model.__name__}')
+    post_delete.connect(invalidate_vendor_index, sender=model, dispatch_uid=f'vendor_index_delete_{model.__name__}')
+
+
+# Content-addressed photo and receipt files
+
+def remember_stored_files(sender, instance, **kwargs):
+    """Remember the files an edited record used before the change"""
+    instance._previous_file_names = {}
+    if instance.pk:
+        fields = uploads.STORED_FILE_FIELDS[sender]
+        previous = sender.objects.filter(pk=instance.pk).values(*fields).first()
+        if previous:
+            instance._previous_file_names = {field: name or '' for field, name in previous.items()}
+
+
+def update_stored_file_refs(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_file_names', {})
+    for field, name in uploads.file_names(instance).items():
+        old_name = previous.get(field, '')
+        if name == old_name:
+            continue
+        if name:
+            uploads.acquire(sender, field, name)
+        if old_name:
+            uploads.release(sender, field, old_name)
+
+
+def release_stored_files(sender, instance, **kwargs):
+    for field, name in uploads.file_names(instance).items():
+        if name:
+            uploads.release(sender, field, name)
+
+
+for model in uploads.STORED_FILE_FIELDS:
+    pre_save.connect(remember_stored_files, sender=model, dispatch_uid=f'stored_files_pre_{model.__name__}')
+    post_save.connect(update_stored_file_refs, sender=model, dispatch_uid=f'stored_files_save_{model.__name__}')
+    post_delete.connect(release_stored_files, sender=model, dispatch_uid=f'stored_files_delete_{model.__name__}')
+
+
+# Photo dimensions and downscaled copies
+
+def process_photo(sender, instance, **kwargs):
+    field = images.PHOTO_FIELDS[sender]
+    # Previous file names are remembered by remember_stored_files
+    previous = getattr(instance, '_previous_file_names', {}).get(field)
+    if instance.width and previous == getattr(instance, field).name:
+        return
+    images.process_photo(instance, field)
+
+
+for model in images.PHOTO_FIELDS:
+    post_save.connect(process_photo, sender=model, dispatch_uid=f'process_photo_{model.__name__}')
+
+
+# Equipment utilization report
+
+def utilization_owner_ids(instance):
+    if isinstance(instance, EquipmentAssignment):
+        return Equipment.objects.filter(pk=instance.equipment_id).values_list('owner_id', flat=True)
+    return [instance.owner_id]
+
+
+def invalidate_utilization_report(sender, instance, **kwargs):
+    utilization.invalidate_report(utilization_owner_ids(instance))
+
+
+# Property names are shown in the report
+for model in (Equipment, EquipmentAssignment, Property):
+    post_save.connect(invalidate_utilization_report, sender=model, dispatch_uid=f'utilization_save_{model.__name__}')
+    post_delete.connect(invalidate_utilization_report, sender=model, dispatch_uid=f'utilization_delete_{model.__name__}')
+
+
+# Room summary counters
+
+def _previous_values(instance, *fields):
+    if not instance.pk:
+        return None
+    return type(instance).objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(pre_save, sender=RoomProgress)
+@receiver(pre_save, sender=ElectricalCircuit)
+def remember_counted_room(sender, instance, **kwargs):
+    previous = _previous_values(instance, 'room_id')
+    instance._previous_room_id = previous['room_id'] if previous else None
+
+
+@receiver(post_save, sender=RoomProgress)
+def count_progress_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_room_id', None)
+    if created:
+        room_counters.adjust([instance.room_id], progress_count=1)
+    elif previous and previous != instance.room_id:
+        photos = instance.photos.count()
+        room_counters.adjust([previous], progress_count=-1, photo_count=-photos)
+        room_counters.adjust([instance.room_id], progress_count=1, photo_count=photos)
+    # The date of an edited entry may change which one is the latest
+    room_counters.refresh_latest([instance.room_id, previous])
+
+
+@receiver(post_delete, sender=RoomProgress)
+def count_progress_on_delete(sender, instance, **kwargs):
+    room_counters.adjust([instance.room_id], progress_count=-1)
+    room_counters.refresh_latest([instance.room_id])
+
+
+def _photo_room_ids(photo):
+    return RoomProgress.objects.filter(pk=photo.progress_id).values('room_id')
+
+
+@receiver(post_save, sender=RoomProgressPhoto)
+def count_photo_on_save(sender, instance, created, **kwargs):
+    if created:
+        room_counters.adjust(_photo_room_ids(instance), photo_count=1)
+        room_counters.refresh_latest(_photo_room_ids(instance))
+
+
+@receiver(post_delete, sender=RoomProgressPhoto)
+def count_photo_on_delete(sender, instance, **kwargs):
+    room_counters.adjust(_photo_room_ids(instance), photo_count=-1)
+    room_counters.refresh_latest(_photo_room_ids(instance))
+
+
+@receiver(post_save, sender=ElectricalCircuit)
+def count_circuit_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_room_id', None)
+    if created or previous != instance.room_id:
+        room_counters.adjust([previous], circuit_count=-1)
+        room_counters.adjust([instance.room_id], circuit_count=1)
+
+
+@receiver(post_delete, sender=ElectricalCircuit)
+def count_circuit_on_delete(sender, instance, **kwargs):
+    room_counters.adjust([instance.room_id], circuit_count=-1)
+
+
+def _open_task_room_id(room_id, status):
+    """The room whose open task count includes a task with the given room and status"""
+    return room_id if status != RenovationTask.STATUS_COMPLETED else None
+
+
+@receiver(pre_save, sender=RenovationTask)
+def remember_open_task_room(sender, instance, **kwargs):
+    previous = _previous_values(instance, 'room_id', 'status')
+    instance._previous_open_task_room_id = _open_task_room_id(**previous) if previous else None
+
+
+@receiver(post_save, sender=RenovationTask)
+def count_open_task_on_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_open_task_room_id', None)
+    current = _open_task_room_id(instance.room_id, instance.status)
+    if previous != current:
+        room_counters.adjust([previous], open_task_count=-1)
+        room_counters.adjust([current], open_task_count=1)
+
+
+@receiver(post_delete, sender=RenovationTask)
+def count_open_task_on_delete(sender, instance, **kwargs):
+    room_counters.adjust([_open_task_room_id(instance.room_id, instance.status)], open_task_count=-1)
+
+
+def _session_room_ids(session):
+    return WorkSession.rooms_worked_on.through.objects.filter(worksession_id=session.pk).values('room_id')
+
+
+@receiver(pre_save, sender=WorkSession)
+def remember_session_minutes(sender, instance, **kwargs):
+    previous = _previous_values(instance, 'duration_minutes')
+    instance._previous_duration_minutes = previous['duration_minutes'] if previous else None
+
+
+@receiver(post_save, sender=WorkSession)
+def count_session_minutes_on_save(sender, instance, created, **kwargs):
+    if created:
+        # A new session has no rooms yet, they are counted when added
+        return
+    delta = (instance.duration_minutes or 0) - (getattr(instance, '_previous_duration_minutes', None) or 0)
+    room_counters.adjust(_session_room_ids(instance), session_minutes=delta)
+
+
+@receiver(pre_delete, sender=WorkSession)
+def count_session_minutes_on_delete(sender, instance, **kwargs):
+    # Before the delete, while the session is still linked to its rooms
+    room_counters.adjust(_session_room_ids(instance), session_minutes=-(instance.duration_minutes or 0))
+
+
+def count_session_minutes_on_rooms_change(sender, instance, action, pk_set, reverse, **kwargs):
+    # Removals are counted before they happen, so only existing links are subtracted
+    if action not in ('post_add', 'pre_remove', 'pre_clear'):
+        return
+    sign = 1 if action == 'post_add' else -1
+
+    if not reverse:
+        # instance is a session, pk_set holds rooms
+        room_ids = _session_room_ids(instance)
+        if action == 'post_add':
+            room_ids = list(pk_set)
+        elif action == 'pre_remove':
+            room_ids = room_ids.filter(room_id__in=pk_set)
+        room_counters.adjust(room_ids, session_minutes=sign * (instance.duration_minutes or 0))
+        return
+
+    # instance is a room, pk_set holds sessions
+    sessions = instance.work_sessions.all()
+    if action == 'post_add':
+        sessions = WorkSession.objects.filter(pk__in=pk_set)
+    elif action == 'pre_remove':
+        sessions = sessions.filter(pk__in=pk_set)
+    minutes = sessions.aggregate(total=Sum('duration_minutes'))['total'] or 0
+    room_counters.adjust([instance.pk], session_minutes=sign * minutes)
+
+
+m2m_changed.connect(
+    count_session_minutes_on_rooms_change,
+    sender=WorkSession.rooms_worked_on.through,
+    dispatch_uid='count_session_minutes_on_rooms_change',
+)
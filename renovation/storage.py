@@ -0,0 +1,112 @@
+"""
+Content-addressed storage for uploaded photos and receipts.
+
+Uploads are hashed (SHA-256) while they are streamed to disk and stored under
+blobs/<first two hex digits>/<digest><extension>, so identical bytes uploaded
+twice end up in one file. Which records use a blob is tracked by the
+StoredFile reference counts (see renovation/uploads.py). Downscaled copies of
+photos (renovation/images.py) are named after the digest of their original.
+"""
+import hashlib
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+BLOB_DIR = 'blobs'
+DERIVATIVE_DIR = 'derivatives'
+
+# Widths of the downscaled photo copies used in srcset
+DERIVATIVE_WIDTHS = (320, 640, 1280)
+
+
+def blob_name(digest, extension=''):
+    return f'{BLOB_DIR}/{digest[:2]}/{digest}{extension.lower()}'
+
+
+def blob_digest(name):
+    """SHA-256 digest encoded in a blob name, or None for files stored elsewhere"""
+    directory, filename = os.path.split(name or '')
+    digest = os.path.splitext(filename)[0]
+    if directory != f'{BLOB_DIR}/{digest[:2]}' or len(digest) != 64:
+        return None
+    return digest
+
+
+def derivative_name(digest, width):
+    return f'{DERIVATIVE_DIR}/{digest[:2]}/{digest}-{width}w.webp'
+
+
+def derivative_source_prefix(name):
+    """Blob name prefix (without extension) of the original of a derivative, or None"""
+    directory, filename = os.path.split(name or '')
+    digest = filename.split('-', 1)[0]
+    if directory != f'{DERIVATIVE_DIR}/{digest[:2]}' or len(digest) != 64 or not filename.endswith('w.webp'):
+        return None
+    return blob_name(digest)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names files after their content.
+
+    The upload name only contributes its extension (photo derivatives keep
+    their name). After saving, the content object carries `sha256` and
+    `is_duplicate` (True when the file already existed and the upload was
+    discarded), so views can tell users about it.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is the content hash, so the requested one never collides
+        return name
+
+    def _save(self, name, content):
+        temp_dir = self.path(f'{BLOB_DIR}/tmp')
+        os.makedirs(temp_dir, exist_ok=True)
+        temp_path = os.path.join(temp_dir, uuid.uuid4().hex)
+
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            content.seek(0)
+        except (AttributeError, OSError):
+            pass
+        with open(temp_path, 'wb') as temp_file:
+            for chunk in content.chunks():
+                digest.update(chunk)
+                temp_file.write(chunk)
+                size += len(chunk)
+
+        if derivative_source_prefix(name) is None:
+            name = blob_name(digest.hexdigest(), os.path.splitext(name)[1])
+        # else: derivatives are already named after the digest of their original
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            os.remove(temp_path)
+            content.is_duplicate = True
+        else:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.replace(temp_path, full_path)
+            if self.file_permissions_mode is not None:
+                os.chmod(full_path, self.file_permissions_mode)
+            content.is_duplicate = False
+
+        content.sha256 = digest.hexdigest()
+        content.stored_size = size
+        return name
+
+    def delete(self, name):
+        # A shared blob stays until its last reference is released
+        from .models import StoredFile
+
+        if name and StoredFile.objects.filter(name=name, ref_count__gt=0).exists():
+            return
+        super().delete(name)
+
+        digest = blob_digest(name)
+        if digest:
+            for width in DERIVATIVE_WIDTHS:
+                super().delete(derivative_name(digest, width))
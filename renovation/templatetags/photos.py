@@ -0,0 +1,40 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from renovation.images import srcset
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_img(image, sizes='100vw', alt='', css_class='', style='', eager=False):
+    """
+    <img> for a progress or equipment photo with width/height (no layout shift),
+    srcset/sizes over its downscaled copies and lazy loading.
+
+    {% responsive_img photo.photo sizes="(min-width: 768px) 25vw, 50vw" alt=photo.caption css_class="img-fluid" %}
+    Pass eager=True for photos visible without scrolling.
+    """
+    if not image:
+        return ''
+
+    width = getattr(image.instance, 'width', None)
+    height = getattr(image.instance, 'height', None)
+    attrs = {
+        'src': image.url,
+        'alt': alt,
+        'class': css_class or None,
+        'style': style or None,
+        'loading': None if eager else 'lazy',
+        'decoding': 'async',
+    }
+    if width and height:
+        attrs['width'] = width
+        attrs['height'] = height
+        candidates = srcset(image)
+        if candidates:
+            attrs['srcset'] = candidates
+            attrs['sizes'] = sizes
+
+    return format_html('<img{}>', flatatt({key: value for key, value in attrs.items() if value is not None}))
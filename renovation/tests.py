@@ -1,3 +1,761 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import re
+import shutil
+import tempfile
+import zipfile
+from datetime import date, time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django import forms
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
+from django.contrib.auth.models import User
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from . import archives, room_counters, search, utilization
+from .bundles import BundleError, BundleImporter, stream_bundle
+from .caching import cached_fragments, fragment_vary_on
+from .forms import WorkSessionForm
+from .models import (
+    DropdownChoice, Equipment, EquipmentAssignment, MonthlySpend, Property, Purchase, PurchaseCategory,
+    RenovationTask, Room, RoomProgress, RoomProgressPhoto, RoomWallFinish, ShoppingItem, StoredFile, Vendor,
+    VendorAlias, WorkSession,
+)
+from .views import DASHBOARD_SECTIONS
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+STORAGES = {
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, STORAGES=STORAGES)
+class RenovationTestCase(TestCase):
+    """Logged-in owner with one property"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', password='secret')
+        cls.property = Property.objects.create(name='Mieszkanie', owner=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+
+def image_file(name='photo.jpg', color='red', size=(40, 30)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class RoomAddTests(RenovationTestCase):
+
+    def test_room_add_creates_room(self):
+        response = self.client.post(reverse('room_add'), {
+            'name': Room.ROOM_CHOICES[0][0],
+            'width': '3.00',
+            'length': '4.00',
+            'height': '2.50',
+            'progress_percentage': '0',
+        })
+        self.assertRedirects(response, reverse('room_list'))
+        room = Room.objects.get(property=self.property)
+        self.assertEqual(room.floor_area, 12)
+
+
+class PurchaseImportTests(RenovationTestCase):
+
+    def post_import(self, content):
+        category = PurchaseCategory.objects.create(name=PurchaseCategory.CATEGORY_CHOICES[0][0])
+        return self.client.post(reverse('purchase_import'), {
+            'file': SimpleUploadedFile('wyciag.csv', content.encode()),
+            'default_category': category.pk,
+            'amount_sign': 'negative',
+        })
+
+    def test_invalid_files_are_form_errors(self):
+        category = PurchaseCategory.objects.create(name=PurchaseCategory.CATEGORY_CHOICES[0][0])
+        for name, content in (('wyciag.xlsx', b'not a workbook'), ('wyciag.csv', b'data;kwota\0\xff\xfe')):
+            with self.subTest(name=name):
+                response = self.client.post(reverse('purchase_import'), {
+                    'file': SimpleUploadedFile(name, content),
+                    'default_category': category.pk,
+                    'amount_sign': 'negative',
+                })
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.context['form'].has_error('file'))
+
+    def test_import_invalidates_dashboard_etag(self):
+        etag = self.client.get(reverse('dashboard')).headers['ETag']
+        self.assertEqual(self.client.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        response = self.post_import('data;kwota;sklep\n2024-03-01;-120,50;Castorama\n2024-03-02;-80,00;OBI\n')
+        self.assertRedirects(response, reverse('purchases_list'), fetch_redirect_response=False)
+        self.assertEqual(Purchase.objects.filter(property=self.property).count(), 2)
+
+        # The first page shows the import message and has no validators
+        self.client.get(reverse('dashboard'))
+        response = self.client.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+
+class MonthlySpendTests(RenovationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.category = PurchaseCategory.objects.create(name=PurchaseCategory.CATEGORY_CHOICES[0][0])
+
+    def purchase(self, day, amount):
+        return Purchase.objects.create(
+            property=self.property, category=self.category, date=day, amount=Decimal(amount),
+            vendor='Castorama', description='Farba'
+        )
+
+    def rollup(self):
+        return list(MonthlySpend.objects.order_by('month').values_list('month', 'total', 'count'))
+
+    def test_purchase_changes_update_the_rollup(self):
+        first = self.purchase(date(2024, 3, 1), '100.00')
+        self.purchase(date(2024, 3, 20), '50.50')
+        self.assertEqual(self.rollup(), [(date(2024, 3, 1), Decimal('150.50'), 2)])
+
+        first.date = date(2024, 4, 2)
+        first.save()
+        self.assertEqual(self.rollup(), [
+            (date(2024, 3, 1), Decimal('50.50'), 1), (date(2024, 4, 1), Decimal('100.00'), 1),
+        ])
+
+        first.delete()
+        self.assertEqual(self.rollup(), [(date(2024, 3, 1), Decimal('50.50'), 1)])
+        self.assertEqual(MonthlySpend.monthly_totals(self.property, date(2024, 2, 1), date(2024, 4, 1)), [
+            (date(2024, 2, 1), Decimal('0.00')),
+            (date(2024, 3, 1), Decimal('50.50')),
+            (date(2024, 4, 1), Decimal('0.00')),
+        ])
+
+    def test_rebuild(self):
+        self.purchase(date(2024, 3, 1), '100.00')
+        MonthlySpend.objects.update(total=1, count=7)
+        self.assertEqual(MonthlySpend.rebuild(), 1)
+        self.assertEqual(self.rollup(), [(date(2024, 3, 1), Decimal('100.00'), 1)])
+
+
+class DashboardFragmentTests(RenovationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def cached_sections(self, request):
+        return cached_fragments(DASHBOARD_SECTIONS, fragment_vary_on(request, self.property))
+
+    def test_sections_are_cached_per_data_version(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(self.cached_sections(response.wsgi_request), set(DASHBOARD_SECTIONS))
+
+        category = PurchaseCategory.objects.create(name=PurchaseCategory.CATEGORY_CHOICES[0][0])
+        Purchase.objects.create(
+            property=self.property, category=category, date=date.today(), amount=Decimal('99.00'),
+            vendor='Castorama', description='Farba'
+        )
+        request = RequestFactory().get('/')
+        self.assertEqual(self.cached_sections(request), set())
+        self.assertContains(self.client.get(reverse('dashboard')), 'Castorama')
+        self.assertEqual(self.cached_sections(request), set(DASHBOARD_SECTIONS))
+
+
+class StaticAssetTests(RenovationTestCase):
+
+    def assert_vendored_assets(self, response):
+        content = response.content.decode()
+        self.assertNotIn('cdn.', content)
+        assets = re.findall(r'(?:href|src)="%s([^"]+)"' % re.escape(settings.STATIC_URL), content)
+        self.assertIn('vendor/bootstrap/css/bootstrap.min.css', assets)
+        for asset in assets:
+            self.assertTrue(finders.find(asset), asset)
+
+    def test_pages_load_only_vendored_assets(self):
+        self.assert_vendored_assets(self.client.get(reverse('dashboard')))
+        self.client.logout()
+        self.assert_vendored_assets(self.client.get(reverse('login')))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, STORAGES=STORAGES)
+class AsyncDashboardTests(TransactionTestCase):
+    """Under ASGI the sections are built on worker threads with their own connections"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner')
+        self.property = Property.objects.create(name='Mieszkanie', owner=self.user)
+        category = PurchaseCategory.objects.create(name=PurchaseCategory.CATEGORY_CHOICES[0][0])
+        Purchase.objects.create(
+            property=self.property, category=category, date=date.today(), amount=Decimal('99.00'),
+            vendor='Castorama', description='Farba'
+        )
+
+    async def test_dashboard_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('dashboard'))
+        self.assertContains(response, 'Castorama')
+
+        response = await self.async_client.get(reverse('dashboard'), headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+
+class ChartSpendingTests(RenovationTestCase):
+
+    def test_range_up_to_last_month(self):
+        response = self.client.get(reverse('chart_spending_data'), {'start': '9999-11', 'end': '9999-12'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'], [0.0, 0.0])
+
+        response = self.client.get(reverse('chart_spending_data'), {'end': '9999-12'})
+        self.assertEqual(len(response.json()['labels']), 6)
+
+    def test_default_start_before_year_one(self):
+        response = self.client.get(reverse('chart_spending_data'), {'end': '0001-03'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SearchTests(RenovationTestCase):
+
+    def test_l_with_stroke_matches_plain_l(self):
+        RenovationTask.objects.create(related_property=self.property, title='Kupno płytek')
+
+        for query in ('plytek', 'płytek', 'PŁYT'):
+            with self.subTest(query=query):
+                results = search.search(self.user, self.property, query)
+                self.assertEqual([result.kind for result in results], ['task'])
+                self.assertEqual(results[0].title, 'Kupno <mark>płytek</mark>')
+
+
+class StoredFileTests(RenovationTestCase):
+
+    def test_identical_uploads_share_one_file(self):
+        room = Room.objects.create(property=self.property, name=Room.ROOM_CHOICES[0][0])
+        progress = RoomProgress.objects.create(room=room, property=self.property, date=date(2024, 3, 1))
+        first = RoomProgressPhoto.objects.create(progress=progress, property=self.property, photo=image_file('a.jpg'))
+        second = RoomProgressPhoto.objects.create(progress=progress, property=self.property, photo=image_file('b.jpg'))
+        other = RoomProgressPhoto.objects.create(
+            progress=progress, property=self.property, photo=image_file('a.jpg', color='blue')
+        )
+
+        self.assertEqual(first.photo.name, second.photo.name)
+        self.assertNotEqual(first.photo.name, other.photo.name)
+        self.assertEqual(StoredFile.objects.get(name=first.photo.name).ref_count, 2)
+        storage, name = first.photo.storage, first.photo.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+
+
+class MediaFileTests(RenovationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        room = Room.objects.create(property=self.property, name=Room.ROOM_CHOICES[0][0])
+        progress = RoomProgress.objects.create(room=room, property=self.property, date=date(2024, 3, 1))
+        photo = RoomProgressPhoto.objects.create(progress=progress, property=self.property, photo=image_file())
+        self.photo = photo.photo
+        self.size = self.photo.size
+
+    def test_owner_only(self):
+        response = self.client.get(self.photo.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.photo.open('rb').read())
+
+        self.client.force_login(User.objects.create_user('other'))
+        self.assertEqual(self.client.get(self.photo.url).status_code, 404)
+
+    def test_ranges_and_revalidation(self):
+        response = self.client.get(self.photo.url, headers={'range': 'bytes=0-9'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 0-9/{self.size}')
+        self.assertEqual(len(b''.join(response.streaming_content)), 10)
+
+        response = self.client.get(self.photo.url, headers={'range': f'bytes={self.size}-'})
+        self.assertEqual(response.status_code, 416)
+
+        # A range of an older version of the file gets the whole current file
+        response = self.client.get(self.photo.url, headers={'range': 'bytes=0-9', 'if-range': '"old"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b''.join(response.streaming_content)), self.size)
+
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.photo.url, headers={'if-none-match': etag}).status_code, 304)
+
+    @override_settings(MEDIA_SERVER='nginx', MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_nginx_sends_the_file(self):
+        response = self.client.get(self.photo.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.photo.name}')
+        self.assertEqual(response.content, b'')
+
+
+class ResponsiveImageTests(RenovationTestCase):
+
+    def test_dimensions_and_srcset(self):
+        room = Room.objects.create(property=self.property, name=Room.ROOM_CHOICES[0][0])
+        progress = RoomProgress.objects.create(room=room, property=self.property, date=date(2024, 3, 1))
+        photo = RoomProgressPhoto.objects.create(
+            progress=progress, property=self.property, photo=image_file(size=(800, 600))
+        )
+        photo.refresh_from_db()
+        self.assertEqual((photo.width, photo.height), (800, 600))
+
+        html = Template('{% load photos %}{% responsive_img photo.photo sizes="50vw" %}').render(
+            Context({'photo': photo})
+        )
+        candidates = [entry.split(' ') for entry in re.search(r'srcset="([^"]+)"', html).group(1).split(', ')]
+        self.assertEqual([width for _url, width in candidates], ['320w', '640w', '800w'])
+        self.assertEqual(candidates[-1][0], photo.photo.url)
+        for attribute in ('width="800"', 'height="600"', 'sizes="50vw"', 'loading="lazy"'):
+            self.assertIn(attribute, html)
+
+        # Derivatives are served to the photo's owner
+        response = self.client.get(candidates[0][0])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Image.open(io.BytesIO(b''.join(response.streaming_content))).size, (320, 240))
+
+
+class GalleryTests(RenovationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        room = Room.objects.create(property=self.property, name=Room.ROOM_CHOICES[0][0])
+        progress = RoomProgress.objects.create(room=room, property=self.property, date=date(2024, 3, 1))
+        self.photos = [
+            RoomProgressPhoto.objects.create(progress=progress, property=self.property, photo=image_file(color=color))
+            for color in ('red', 'green', 'blue')
+        ]
+
+    def test_cursor_pages_cover_every_photo_once(self):
+        seen = []
+        params = {'limit': 2}
+        while True:
+            data = self.client.get(reverse('gallery_photos'), params).json()
+            seen.extend(item['id'] for item in data['results'])
+            if not data['next']:
+                break
+            params['cursor'] = data['next']
+        self.assertEqual(seen, [photo.pk for photo in reversed(self.photos)])
+
+    def test_out_of_range_parameters(self):
+        infinite_cursor = base64.urlsafe_b64encode(json.dumps(['2024-03-01T00:00:00', 1e999, 1]).encode()).decode()
+        for params in ({'date_to': '9999-12-31'}, {'date_from': '0001-01-01'}, {'cursor': infinite_cursor}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(reverse('gallery_photos'), params).status_code, 400)
+
+
+class EquipmentAvailabilityTests(RenovationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other = Property.objects.create(name='Dom', owner=self.user)
+        self.equipment = Equipment.objects.create(owner=self.user, name='Wiertarka', purpose='Wiercenie')
+        EquipmentAssignment.objects.create(
+            equipment=self.equipment, assigned_property=self.property,
+            start_date=date(2024, 3, 1), end_date=date(2024, 3, 10)
+        )
+
+    def assign(self, start, end=None):
+        with transaction.atomic():
+            return EquipmentAssignment.objects.create(
+                equipment=self.equipment, assigned_property=self.other, start_date=start, end_date=end
+            )
+
+    def test_overlapping_periods_are_rejected(self):
+        for start, end in ((date(2024, 3, 9), date(2024, 3, 20)), (date(2024, 2, 1), None),
+                           (date(2024, 3, 2), date(2024, 3, 3))):
+            with self.subTest(start=start, end=end), self.assertRaises(IntegrityError):
+                self.assign(start, end)
+
+        # Released on the 10th, free again that day
+        later = self.assign(date(2024, 3, 10))
+        later.start_date = date(2024, 3, 5)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            later.save()
+
+    def test_availability_api(self):
+        url = reverse('equipment_availability')
+        response = self.client.get(url, {'date': '2024-03-09'})
+        self.assertFalse(response.json()['results'][0]['available'])
+
+        response = self.client.get(url, {'date_from': '2024-03-10', 'date_to': '2024-03-31'})
+        self.assertTrue(response.json()['results'][0]['available'])
+
+        response = self.client.get(url, {'date_from': '2024-02-01', 'property': self.other.pk})
+        self.assertEqual(response.json()['results'], [])
+
+        response = self.client.get(url, {'date_from': '9999-12-31', 'date_to': '9999-12-31'})
+        self.assertEqual(response.status_code, 400)
+
+
+class EquipmentAssignTests(RenovationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.equipment = Equipment.objects.create(owner=self.user, name='Wiertarka', purpose='Wiercenie')
+        self.url = reverse('equipment_assign', args=[self.equipment.pk])
+
+    def post(self, start_date):
+        return self.client.post(self.url, {'assigned_property': self.property.pk, 'start_date': start_date})
+
+    def test_assign_while_assigned(self):
+        self.assertRedirects(self.post('2024-03-01'), reverse('equipment_detail', args=[self.equipment.pk]))
+
+        response = self.post('2024-04-01')
+        self.assertRedirects(response, reverse('equipment_detail', args=[self.equipment.pk]))
+        self.assertEqual(self.equipment.assignments.count(), 1)
+
+    def test_assign_into_a_past_period(self):
+        EquipmentAssignment.objects.create(
+            equipment=self.equipment, assigned_property=self.property,
+            start_date=date(2024, 3, 1), end_date=date(2024, 3, 10)
+        )
+        response = self.post('2024-03-05')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('start_date', response.context['form'].errors)
+        self.assertEqual(self.equipment.assignments.count(), 1)
+
+
+class EquipmentUtilizationTests(RenovationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_days_of_use_and_cost_per_day(self):
+        other = Property.objects.create(name='Dom', owner=self.user)
+        drill = Equipment.objects.create(
+            owner=self.user, name='Wiertarka', purpose='Wiercenie', purchase_date=date(2024, 1, 1),
+            purchase_price=Decimal('100.00'), is_sold=True, sold_date=date(2024, 1, 31), sold_price=Decimal('40.00')
+        )
+        ladder = Equipment.objects.create(owner=self.user, name='Drabina', purpose='Malowanie')
+        for property_obj, start, end in ((self.property, date(2024, 1, 1), date(2024, 1, 11)),
+                                         (other, date(2024, 1, 11), date(2024, 1, 16))):
+            EquipmentAssignment.objects.create(
+                equipment=drill, assigned_property=property_obj, start_date=start, end_date=end
+            )
+
+        ladder_row, drill_row = utilization.utilization_report(self.user)
+        self.assertEqual(drill_row._replace(properties=None), utilization.EquipmentUtilization(
+            drill.pk, 'Wiertarka', True, owned_days=30, used_days=15, idle_days=15,
+            net_cost=Decimal('60.00'), cost_per_day=Decimal('4.00'), properties=None
+        ))
+        self.assertEqual(
+            sorted((use.name, use.days) for use in drill_row.properties), [('Dom', 5), ('Mieszkanie', 10)]
+        )
+        self.assertEqual((ladder_row.used_days, ladder_row.cost_per_day, ladder_row.properties), (0, None, []))
+
+        # The cached report is dropped when assignments change
+        EquipmentAssignment.objects.create(
+            equipment=ladder, assigned_property=self.property, start_date=date.today() - timedelta(days=3)
+        )
+        ladder_row = utilization.utilization_report(self.user)[0]
+        self.assertEqual((ladder_row.used_days, ladder_row.properties[0].days), (3, 3))
+
+        response = self.client.get(reverse('equipment_utilization'))
+        self.assertContains(response, 'Wiertarka')
+
+
+class SessionCalendarTests(RenovationTestCase):
+
+    def test_default_start_clamped_to_first_day(self):
+        response = self.client.get(reverse('session_calendar'), {'date_to': '0001-01-05'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['start'], '0001-01-01')
+        self.assertEqual(len(response.json()['days']), 5)
+
+
+class WorkSessionFormTests(RenovationTestCase):
+
+    def test_rooms_of_another_property_are_a_form_error(self):
+        other = Property.objects.create(name='Dom', owner=self.user)
+        room = Room.objects.create(property=other, name=Room.ROOM_CHOICES[0][0])
+        session = WorkSession(related_property=self.property)
+        form = WorkSessionForm({
+            'date': '2024-03-01',
+            'start_time': '08:00',
+            'end_time': '10:00',
+            'rooms_worked_on': [room.pk],
+        }, instance=session)
+        self.assertFalse(form.is_valid())
+        self.assertIn('rooms_worked_on', form.errors)
+
+
+class RoomMoveTests(RenovationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other = Property.objects.create(name='Dom', owner=self.user)
+        self.room = Room.objects.create(property=self.property, name=Room.ROOM_CHOICES[0][0])
+
+    def session(self, *rooms):
+        session = WorkSession.objects.create(
+            related_property=rooms[0].property, date=date(2024, 3, 1), start_time=time(8), end_time=time(10)
+        )
+        session.rooms_worked_on.add(*rooms)
+        return session
+
+    def test_moved_room_takes_its_records_along(self):
+        progress = RoomProgress.objects.create(room=self.room, property=self.property, date=date(2024, 3, 1))
+        task = RenovationTask.objects.create(related_property=self.property, room=self.room, title='Malowanie')
+        item = ShoppingItem.objects.create(related_property=self.property, room=self.room, title='Farba')
+        session = self.session(self.room)
+
+        self.room.property = self.other
+        self.room.save()
+
+        for record, field in ((progress, 'property'), (task, 'related_property'), (item, 'related_property'),
+                              (session, 'related_property')):
+            record.refresh_from_db()
+            self.assertEqual(getattr(record, f'{field}_id'), self.other.pk)
+
+    def test_move_splitting_a_session_is_a_form_error(self):
+        kept = Room.objects.create(property=self.property, name=Room.ROOM_CHOICES[1][0])
+        session = self.session(self.room, kept)
+        form_class = forms.modelform_factory(Room, fields=['property', 'name'])
+        form = form_class({'property': self.other.pk, 'name': self.room.name}, instance=self.room)
+        self.assertFalse(form.is_valid())
+
+        # Code that skips validation detaches the room from the shared session
+        self.room.property = self.other
+        self.room.save()
+        self.assertEqual(list(session.rooms_worked_on.all()), [kept])
+        session.refresh_from_db()
+        self.assertEqual(session.related_property_id, self.property.pk)
+
+    def test_save_without_move_skips_the_updates(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.room.save()
+        updated = {query['sql'].split('"')[1] for query in queries if query['sql'].startswith('UPDATE')}
+        self.assertEqual(updated, {'renovation_room', 'renovation_propertydataversion'})
+
+
+class RoomCounterTests(RenovationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.room = Room.objects.create(property=self.property, name=Room.ROOM_CHOICES[0][0])
+
+    def counters(self):
+        self.room.refresh_from_db()
+        return (self.room.progress_count, self.room.photo_count, self.room.open_task_count,
+                self.room.session_minutes, self.room.last_progress_date)
+
+    def test_signals_keep_counters(self):
+        progress = RoomProgress.objects.create(room=self.room, property=self.property, date=date(2024, 3, 1))
+        RoomProgressPhoto.objects.create(progress=progress, property=self.property, photo=image_file())
+        task = RenovationTask.objects.create(related_property=self.property, room=self.room, title='Malowanie')
+        session = WorkSession.objects.create(
+            related_property=self.property, date=date(2024, 3, 1), start_time=time(8), end_time=time(9, 30)
+        )
+        session.rooms_worked_on.add(self.room)
+        self.assertEqual(self.counters(), (1, 1, 1, 90, date(2024, 3, 1)))
+
+        task.status = RenovationTask.STATUS_COMPLETED
+        task.save()
+        session.delete()
+        progress.delete()
+        self.assertEqual(self.counters(), (0, 0, 0, 0, None))
+
+    def test_reconcile_corrects_drift(self):
+        RoomProgress.objects.create(room=self.room, property=self.property, date=date(2024, 3, 1))
+        untouched = Room.objects.create(property=self.property, name=Room.ROOM_CHOICES[1][0])
+        Room.objects.filter(pk=self.room.pk).update(progress_count=5, last_progress_date=None)
+
+        self.assertEqual(room_counters.reconcile(), 1)
+        self.assertEqual(self.counters(), (1, 0, 0, 0, date(2024, 3, 1)))
+        self.assertEqual(room_counters.reconcile(Room.objects.filter(pk=untouched.pk)), 0)
+
+
+class VendorAutocompleteTests(RenovationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.category = PurchaseCategory.objects.create(name=PurchaseCategory.CATEGORY_CHOICES[0][0])
+
+    def purchase(self, vendor, property_obj=None):
+        Purchase.objects.create(
+            property=property_obj or self.property, category=self.category, date=date(2024, 3, 1),
+            amount=Decimal('10.00'), vendor=vendor, description='Farba'
+        )
+
+    def suggestions(self, query):
+        response = self.client.get(reverse('vendor_autocomplete'), {'q': query})
+        return [(result['name'], result['uses']) for result in response.json()['results']]
+
+    def test_suggestions_by_word_prefix_and_use(self):
+        for vendor in ('Merkury Market', 'Leroy Merlin', 'Leroy Merlin', 'Castorama'):
+            self.purchase(vendor)
+        other = Property.objects.create(name='Dom', owner=User.objects.create_user('other'))
+        self.purchase('Mercator', other)
+
+        self.assertEqual(self.suggestions('MER'), [('Leroy Merlin', 2), ('Merkury Market', 1)])
+        self.assertEqual(self.suggestions('  '), [])
+
+        # New purchases refresh the cached index
+        self.purchase('Merkury Market')
+        self.purchase('Merkury Market')
+        self.assertEqual(self.suggestions('mer'), [('Merkury Market', 3), ('Leroy Merlin', 2)])
+
+
+class VendorAliasTests(RenovationTestCase):
+
+    def purchase(self, vendor):
+        category, _created = PurchaseCategory.objects.get_or_create(name=PurchaseCategory.CATEGORY_CHOICES[0][0])
+        return Purchase.objects.create(
+            property=self.property, category=category, date=date(2024, 3, 1), amount=10, vendor=vendor,
+            description=vendor
+        )
+
+    def test_new_alias_merges_the_aliased_vendor(self):
+        castorama = self.purchase('Castorama').normalized_vendor
+        branch = self.purchase('CASTORAMA Kraków')
+        self.assertNotEqual(branch.normalized_vendor, castorama)
+
+        VendorAlias.objects.create(vendor=castorama, alias='Castorama Krakow')
+        branch.refresh_from_db()
+        self.assertEqual(branch.normalized_vendor, castorama)
+        self.assertEqual(list(Vendor.objects.all()), [castorama])
+
+    def test_moved_alias_takes_its_records_along(self):
+        castorama = self.purchase('Castorama').normalized_vendor
+        obi = self.purchase('OBI').normalized_vendor
+        alias = VendorAlias.objects.create(vendor=castorama, alias='Castorama Krakow')
+        branch = self.purchase('CASTORAMA Kraków')
+        self.assertEqual(branch.normalized_vendor, castorama)
+
+        alias.vendor = obi
+        alias.save()
+        branch.refresh_from_db()
+        self.assertEqual(branch.normalized_vendor, obi)
+        self.assertEqual(Purchase.objects.filter(normalized_vendor=castorama).count(), 1)
+
+
+class WallFinishTests(RenovationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        DropdownChoice.objects.create(choice_type='wall_finish', value='glina', label_pl='Tynk gliniany',
+                                      label_en='Clay plaster')
+
+    def test_configured_finish_is_listed_with_its_label(self):
+        response = self.client.post(reverse('room_add'), {
+            'name': Room.ROOM_CHOICES[0][0],
+            'progress_percentage': '0',
+            'wall_finishes_multi': ['glina'],
+        })
+        self.assertRedirects(response, reverse('room_list'), fetch_redirect_response=False)
+        room = Room.objects.get(property=self.property)
+        self.assertEqual(list(room.wall_finishes.values_list('finish', flat=True)), ['glina'])
+
+        response = self.client.get(reverse('room_list'))
+        self.assertEqual(response.context['finish_counts'], [{'value': 'glina', 'label': 'Tynk gliniany', 'count': 1}])
+
+    def test_model_validation_uses_configured_finishes(self):
+        room = Room.objects.create(property=self.property, name=Room.ROOM_CHOICES[0][0])
+        RoomWallFinish(room=room, finish='glina').full_clean()
+        with self.assertRaises(ValidationError):
+            RoomWallFinish(room=room, finish='farba').full_clean()
+
+
+class PropertyArchiveTests(RenovationTestCase):
+
+    def test_archive_of_photos_and_receipts(self):
+        room = Room.objects.create(property=self.property, name=Room.ROOM_CHOICES[0][0])
+        progress = RoomProgress.objects.create(room=room, property=self.property, date=date(2024, 3, 1))
+        photo = RoomProgressPhoto.objects.create(progress=progress, property=self.property, photo=image_file())
+        category = PurchaseCategory.objects.create(name=PurchaseCategory.CATEGORY_CHOICES[0][0])
+        purchase = Purchase.objects.create(
+            property=self.property, category=category, date=date(2024, 3, 2), amount=Decimal('10.00'),
+            vendor='Castorama', description='Farba', receipt_photo=image_file('paragon.jpg', color='white')
+        )
+
+        response = self.client.get(reverse('property_archive', args=[self.property.pk]))
+        self.assertTrue(response.streaming)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        contents = sorted(archive.read(name) for name in archive.namelist())
+        files = [photo.photo, purchase.receipt_photo]
+        self.assertEqual(contents, sorted(field_file.open('rb').read() for field_file in files))
+
+        other = Property.objects.create(name='Dom', owner=User.objects.create_user('other'))
+        self.assertEqual(self.client.get(reverse('property_archive', args=[other.pk])).status_code, 404)
+
+    def test_missing_files_are_skipped(self):
+        room = Room.objects.create(property=self.property, name=Room.ROOM_CHOICES[0][0])
+        progress = RoomProgress.objects.create(room=room, property=self.property, date=date(2024, 3, 1))
+        photo = RoomProgressPhoto.objects.create(progress=progress, property=self.property, photo=image_file())
+        RoomProgressPhoto.objects.filter(pk=photo.pk).update(photo='brak.jpg')
+
+        skipped = []
+        archive = b''.join(archives.stream_zip(archives.property_archive_entries(self.property), skipped))
+        self.assertEqual(zipfile.ZipFile(io.BytesIO(archive)).namelist(), [])
+        self.assertEqual(len(skipped), 1)
+
+
+class BundleTests(RenovationTestCase):
+
+    def bundle(self):
+        return io.BytesIO(b''.join(stream_bundle(self.property)))
+
+    def test_round_trip(self):
+        room = Room.objects.create(property=self.property, name=Room.ROOM_CHOICES[0][0], width=3, length=4)
+        room.set_wall_finishes(['farba'])
+        progress = RoomProgress.objects.create(room=room, property=self.property, date=date(2024, 3, 1))
+        RoomProgressPhoto.objects.create(progress=progress, property=self.property, photo=image_file())
+        session = WorkSession.objects.create(
+            related_property=self.property, date=date(2024, 3, 1), start_time=time(8), end_time=time(10)
+        )
+        session.rooms_worked_on.add(room)
+
+        other_user = User.objects.create_user('other')
+        imported = BundleImporter(other_user).run(self.bundle()).property
+
+        self.assertEqual(imported.owner, other_user)
+        copy = imported.rooms.get()
+        self.assertNotEqual(copy.pk, room.pk)
+        self.assertEqual(copy.floor_area, 12)
+        self.assertEqual(list(copy.wall_finishes.values_list('finish', flat=True)), ['farba'])
+        self.assertEqual((copy.progress_count, copy.photo_count, copy.session_minutes), (1, 1, 120))
+        photo = RoomProgressPhoto.objects.get(property=imported)
+        self.assertEqual(photo.photo.name, RoomProgressPhoto.objects.get(property=self.property).photo.name)
+
+    def test_invalid_manifest_version(self):
+        original = zipfile.ZipFile(self.bundle())
+        for version in ('2', None, 0):
+            bundle = io.BytesIO()
+            with zipfile.ZipFile(bundle, 'w') as archive:
+                for name in original.namelist():
+                    content = original.read(name)
+                    if name == 'manifest.json':
+                        content = json.dumps({**json.loads(content), 'version': version})
+                    archive.writestr(name, content)
+            with self.subTest(version=version), self.assertRaises(BundleError):
+                BundleImporter(self.user).run(bundle)
@@ -0,0 +1,136 @@
+"""
+Reference counting of the photos and receipts kept in content-addressed storage
+"""
+import os
+
+from django.core.files import File
+from django.db.models import Count, Sum
+
+from .models import Property, PropertyDataVersion, Purchase, RoomProgressPhoto, Equipment, EquipmentPhoto, StoredFile
+from .storage import blob_digest, derivative_source_prefix
+
+
+# Models and file fields whose files are shared through StoredFile
+STORED_FILE_FIELDS = {
+    Purchase: ['receipt_photo'],
+    RoomProgressPhoto: ['photo'],
+    Equipment: ['receipt_photo'],
+    EquipmentPhoto: ['photo'],
+}
+
+# Models -> lookup of the user owning a record, through its property where it has one
+FILE_OWNER_LOOKUPS = {
+    Purchase: 'property__owner',
+    RoomProgressPhoto: 'property__owner',
+    Equipment: 'owner',
+    EquipmentPhoto: 'equipment__owner',
+}
+
+
+def file_names(instance):
+    """Field name -> stored file name of a record ('' when empty)"""
+    return {field: getattr(instance, field).name or '' for field in STORED_FILE_FIELDS[type(instance)]}
+
+
+def _storage(model, field):
+    return model._meta.get_field(field).storage
+
+
+def acquire(model, field, name):
+    digest = blob_digest(name)
+    if digest is None:
+        # Not (yet) in content-addressed storage, see the rebuild_stored_files command
+        return
+    storage = _storage(model, field)
+    try:
+        size = storage.size(name)
+    except OSError:
+        size = 0
+    StoredFile.acquire(name, digest, size)
+
+
+def release(model, field, name):
+    if blob_digest(name) is not None:
+        StoredFile.release(name, _storage(model, field))
+
+
+def user_can_access(user, name):
+    """Whether any record of the user uses the file (deduplicated files can be shared)"""
+    names = [name]
+    source_prefix = derivative_source_prefix(name)
+    if source_prefix:
+        # Downscaled copies are visible to whoever may see their original
+        names = list(StoredFile.objects.filter(sha256=os.path.basename(source_prefix)).values_list('name', flat=True))
+        if not names:
+            return False
+
+    # Equality lookups on the indexed file columns
+    for model, fields in STORED_FILE_FIELDS.items():
+        owner = {FILE_OWNER_LOOKUPS[model]: user}
+        for field in fields:
+            if model.objects.filter(**{f'{field}__in': names}, **owner).exists():
+                return True
+    return False
+
+
+def duplicate_uploads(files):
+    """Number of the given uploaded files that were already stored before"""
+    return sum(1 for uploaded in files if uploaded and getattr(uploaded, 'is_duplicate', False))
+
+
+def rebuild_stored_files(stdout=None):
+    """
+    Move files uploaded before content-addressed storage into blobs and
+    recompute all reference counts. Returns (moved files, stored files).
+    """
+    moved = 0
+    references = {}
+    for model, fields in STORED_FILE_FIELDS.items():
+        for field in fields:
+            storage = _storage(model, field)
+            rows = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            for pk, name in rows.values_list('pk', field).iterator():
+                if blob_digest(name) is None:
+                    if not storage.exists(name):
+                        if stdout:
+                            stdout.write(f'Missing file: {name}')
+                        continue
+                    with storage.open(name, 'rb') as original:
+                        new_name = storage.save(os.path.basename(name), File(original))
+                    # Bypass the signals: the counts are recomputed below
+                    model.objects.filter(pk=pk).update(**{field: new_name})
+                    storage.delete(name)
+                    name = new_name
+                    moved += 1
+                references.setdefault(name, [0, storage])[0] += 1
+
+    if moved:
+        # File URLs changed without signals; pages of every property may show them
+        PropertyDataVersion.bump(Property.objects.values_list('pk', flat=True))
+
+    existing = dict(StoredFile.objects.values_list('name', 'pk'))
+    for name, (count, storage) in references.items():
+        if name in existing:
+            StoredFile.objects.filter(pk=existing[name]).update(ref_count=count)
+        else:
+            StoredFile.objects.create(
+                name=name,
+                sha256=blob_digest(name),
+                size=storage.size(name) if storage.exists(name) else 0,
+                ref_count=count
+            )
+
+    # Rows left over by deletes that bypassed the signals
+    unused = list(StoredFile.objects.exclude(name__in=list(references)).values_list('name', flat=True))
+    StoredFile.objects.filter(name__in=unused).delete()
+    default_storage = _storage(Purchase, 'receipt_photo')
+    for name in unused:
+        default_storage.delete(name)
+
+    return moved, len(references)
+
+
+def stored_file_stats():
+    """(stored files, records using them) - the difference is the number of deduplicated uploads"""
+    stats = StoredFile.objects.aggregate(files=Count('id'), references=Sum('ref_count'))
+    return stats['files'], stats['references'] or 0
@@ -3,14 +3,20 @@ from . import views
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('api/charts/categories/', views.chart_categories_data, name='chart_categories_data'),
+    path('api/charts/spending/', views.chart_spending_data, name='chart_spending_data'),
+    path('api/vendors/', views.vendor_autocomplete, name='vendor_autocomplete'),
     path('login/', views.user_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
+    path('search/', views.search_view, name='search'),
 
     # Properties
     path('properties/', views.property_list, name='property_list'),
     path('properties/add/', views.property_add, name='property_add'),
     path('properties/<int:pk>/edit/', views.property_edit, name='property_edit'),
     path('properties/<int:pk>/switch/', views.property_switch, name='property_switch'),
+    path('properties/<int:pk>/archive/', views.property_archive, name='property_archive'),
+    path('properties/<int:pk>/export/', views.property_export, name='property_export'),
 
     # Rooms
     path('rooms/', views.room_list, name='room_list'),
@@ -21,15 +27,22 @@ urlpatterns = [
     # Purchases
     path('purchases/', views.purchases_list, name='purchases_list'),
     path('purchases/add/', views.purchase_add, name='purchase_add'),
+    path('purchases/import/', views.purchase_import, name='purchase_import'),
     path('purchases/<int:pk>/edit/', views.purchase_edit, name='purchase_edit'),
 
     # Progress
     path('progress/', views.progress_list, name='progress_list'),
     path('progress/add/', views.progress_add, name='progress_add'),
 
+    # Photo gallery
+    path('gallery/', views.gallery_view, name='gallery'),
+    path('api/gallery/', views.gallery_photos, name='gallery_photos'),
+    path('api/equipment/availability/', views.equipment_availability, name='equipment_availability'),
+
     # Sessions
     path('sessions/', views.sessions_list, name='sessions_list'),
     path('sessions/add/', views.session_add, name='session_add'),
+    path('api/sessions/calendar/', views.session_calendar, name='session_calendar'),
 
     # Electrical circuits
     path('circuits/add/', views.circuit_add, name='circuit_add'),
@@ -43,6 +56,7 @@ urlpatterns = [
     # Equipment management
     path('equipment/', views.equipment_list, name='equipment_list'),
     path('equipment/add/', views.equipment_add, name='equipment_add'),
+    path('equipment/utilization/', views.equipment_utilization, name='equipment_utilization'),
     path('equipment/<int:pk>/', views.equipment_detail, name='equipment_detail'),
     path('equipment/<int:pk>/edit/', views.equipment_edit, name='equipment_edit'),
     path('equipment/<int:pk>/delete/', views.equipment_delete, name='equipment_delete'),
@@ -0,0 +1,105 @@
+"""
+Equipment utilization and cost of ownership.
+
+For every piece of equipment of a user: the days it was assigned to each
+property, the days it was owned but idle, and the net cost (purchase price
+minus sale price) per day of use. A single query computes it: assignments are
+joined to the equipment and their lengths summed per equipment and per
+property with window functions. The report is cached per owner and dropped
+whenever equipment or assignments change (see signals.py).
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import DateField, DurationField, ExpressionWrapper, F, FilteredRelation, Q, Sum, Value, Window
+from django.db.models.functions import Coalesce, Least, TruncDate
+from django.utils import timezone
+
+from .models import Equipment
+
+
+REPORT_TIMEOUT = 24 * 60 * 60
+
+PropertyUse = namedtuple('PropertyUse', ['property_id', 'name', 'days'])
+
+EquipmentUtilization = namedtuple('EquipmentUtilization', [
+    'equipment_id', 'name', 'is_sold', 'owned_days', 'used_days', 'idle_days',
+    'net_cost', 'cost_per_day', 'properties',
+])
+
+
+def _report_key(owner_id, today):
+    # The open periods end today, so the report changes with the date as well
+    return f'equipment-utilization:{owner_id}:{today.isoformat()}'
+
+
+def invalidate_report(owner_ids):
+    today = timezone.localdate()
+    cache.delete_many([_report_key(owner_id, today) for owner_id in owner_ids if owner_id])
+
+
+def _days(duration):
+    return max(duration.days, 0) if duration is not None else 0
+
+
+def _utilization_rows(owner_id, today):
+    """One row per (equipment, property) with the window totals; equipment never assigned has one empty row"""
+    today_value = Value(today, output_field=DateField())
+    # Assignments starting in the future have not been used yet; open ones run until today
+    period_end = Least(Coalesce('used__end_date', today_value), today_value)
+    period = ExpressionWrapper(period_end - F('used__start_date'), output_field=DurationField())
+    owned = ExpressionWrapper(
+        Coalesce('sold_date', today_value) - Coalesce('purchase_date', TruncDate('created_at')),
+        output_field=DurationField()
+    )
+    return Equipment.objects.filter(owner_id=owner_id).alias(
+        used=FilteredRelation('assignments', condition=Q(assignments__start_date__lte=today)),
+    ).annotate(
+        owned=owned,
+        property_days=Window(Sum(period), partition_by=[F('pk'), F('used__assigned_property')]),
+        used_days=Window(Sum(period), partition_by=[F('pk')]),
+    ).values(
+        'pk', 'name', 'is_sold', 'purchase_price', 'sold_price', 'owned', 'used_days',
+        'used__assigned_property', 'used__assigned_property__name', 'property_days',
+    ).distinct().order_by('name', 'pk', '-property_days')
+
+
+def _build_report(owner_id, today):
+    report = []
+    current = None
+    for row in _utilization_rows(owner_id, today):
+        if current is None or current.equipment_id != row['pk']:
+            owned_days = _days(row['owned'])
+            used_days = _days(row['used_days'])
+            net_cost = None
+            if row['purchase_price'] is not None:
+                net_cost = row['purchase_price'] - (row['sold_price'] or Decimal('0'))
+            current = EquipmentUtilization(
+                equipment_id=row['pk'],
+                name=row['name'],
+                is_sold=row['is_sold'],
+                owned_days=owned_days,
+                used_days=used_days,
+                idle_days=max(owned_days - used_days, 0),
+                net_cost=net_cost,
+                cost_per_day=(net_cost / used_days).quantize(Decimal('0.01')) if net_cost is not None and used_days else None,
+                properties=[],
+            )
+            report.append(current)
+        if row['used__assigned_property'] is not None:
+            current.properties.append(PropertyUse(
+                row['used__assigned_property'], row['used__assigned_property__name'], _days(row['property_days'])
+            ))
+    return report
+
+
+def utilization_report(owner):
+    """The owner's equipment utilization, most recently computed today (cached)"""
+    today = timezone.localdate()
+    key = _report_key(owner.pk, today)
+    report = cache.get(key)
+    if report is None:
+        report = _build_report(owner.pk, today)
+        cache.set(key, report, REPORT_TIMEOUT)
+    return report
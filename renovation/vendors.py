@@ -0,0 +1,229 @@
+"""
+Vendor normalization and autocomplete.
+
+Free-text vendor names on purchases, equipment and shopping items are mapped
+onto shared Vendor rows (normalized name plus aliases), so statistics and
+suggestions aggregate on the integer vendor key. Suggestions are ranked by how
+often the user has bought from a vendor. On PostgreSQL names are matched with
+a trigram index (migration 0012), elsewhere with a per-user sorted prefix index
+kept in the cache.
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+
+from .models import DropdownChoice, Equipment, Property, PropertyDataVersion, Purchase, ShoppingItem, Vendor, VendorAlias
+
+
+MAX_SUGGESTIONS = 20
+
+PREFIX_INDEX_TIMEOUT = 60 * 60
+
+# Letters that Unicode does not decompose into a base letter + accent
+LETTER_REPLACEMENTS = str.maketrans({'ł': 'l', 'đ': 'd', 'ø': 'o', 'ß': 'ss'})
+
+
+def normalize_vendor_name(name):
+    """
+    Case-, accent- and punctuation-insensitive form of a vendor name:
+    "CASTORAMA  Kraków," -> "castorama krakow"
+    """
+    name = unicodedata.normalize('NFKD', str(name).casefold().translate(LETTER_REPLACEMENTS))
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[\W_]+', ' ', name).split())
+
+
+class VendorResolver:
+    """
+    Map free-text vendor names onto vendor IDs, creating vendors on first use.
+
+    A name matches a vendor by its exact normalized form or by an alias added
+    in the admin. Vendors are shared by all users, so a name is never folded
+    into a shorter one ("media markt" is not "media"); bank descriptions with a
+    location suffix are mapped onto configured vendors by the importer.
+    Results are cached per resolver, so reuse one for a batch of rows. The
+    model classes are parameters so callers can pass historical models.
+    """
+
+    def __init__(self, vendor_model=Vendor, alias_model=VendorAlias):
+        self.vendor_model = vendor_model
+        self.alias_model = alias_model
+        self.resolved = {}
+
+    def resolve(self, name):
+        key = normalize_vendor_name(name or '')
+        if not key:
+            return None
+        if key not in self.resolved:
+            self.resolved[key] = self._lookup(key) or self._create(key, name)
+        return self.resolved[key]
+
+    def _lookup(self, key):
+        alias = self.alias_model.objects.filter(alias=key).values_list('vendor_id', flat=True).first()
+        if alias:
+            return alias
+        return self.vendor_model.objects.filter(normalized_name=key).values_list('pk', flat=True).first()
+
+    def _create(self, key, name):
+        vendor, _created = self.vendor_model.objects.get_or_create(
+            normalized_name=key,
+            defaults={'name': ' '.join(str(name).split())}
+        )
+        return vendor.pk
+
+
+VENDOR_RECORD_MODELS = (Purchase, Equipment, ShoppingItem)
+
+
+def _record_property_ids(records):
+    """Properties whose pages show the given purchases, equipment or shopping items"""
+    if records.model is Purchase:
+        return records.values_list('property_id', flat=True)
+    if records.model is ShoppingItem:
+        return records.values_list('related_property_id', flat=True)
+    # Equipment is listed per owner
+    return Property.objects.filter(owner__equipment__in=records).values_list('pk', flat=True)
+
+
+def apply_alias(alias, previous_vendor_id=None):
+    """
+    Link the records named by a saved alias to its vendor: the vendor created
+    earlier for the aliased name is merged into it, and when the alias was moved
+    from another vendor, that vendor's records spelled like the alias follow.
+    """
+    duplicate = Vendor.objects.filter(normalized_name=alias.alias).exclude(pk=alias.vendor_id).first()
+    moved = []
+    for model in VENDOR_RECORD_MODELS:
+        if duplicate:
+            moved.append(model.objects.filter(normalized_vendor=duplicate))
+        if previous_vendor_id and previous_vendor_id != alias.vendor_id:
+            rows = model.objects.filter(normalized_vendor_id=previous_vendor_id).values_list('pk', 'vendor')
+            spelled = [pk for pk, name in rows if normalize_vendor_name(name) == alias.alias]
+            moved.append(model.objects.filter(pk__in=spelled))
+    if not moved:
+        return
+
+    with transaction.atomic():
+        property_ids = set()
+        for records in moved:
+            property_ids.update(_record_property_ids(records))
+            records.update(normalized_vendor_id=alias.vendor_id)
+        if duplicate:
+            duplicate.aliases.update(vendor_id=alias.vendor_id)
+            duplicate.delete()
+        PropertyDataVersion.bump(property_ids)
+    invalidate_prefix_index(Property.objects.filter(pk__in=property_ids).values_list('owner_id', flat=True))
+
+
+def _prefix_index_key(owner_id):
+    return f'vendor-prefix-index:{owner_id}'
+
+
+def invalidate_prefix_index(owner_ids):
+    cache.delete_many([_prefix_index_key(owner_id) for owner_id in owner_ids if owner_id])
+
+
+def vendor_usage(owner_id):
+    """Vendor ID -> number of the user's purchases, equipment and shopping items using it"""
+    uses = Counter()
+    sources = [
+        Purchase.objects.filter(property__owner_id=owner_id),
+        Equipment.objects.filter(owner_id=owner_id),
+        ShoppingItem.objects.filter(related_property__owner_id=owner_id),
+    ]
+    for queryset in sources:
+        rows = queryset.filter(normalized_vendor__isnull=False).values_list('normalized_vendor').annotate(
+            uses=Count('id')
+        ).order_by()
+        uses.update(dict(rows))
+
+    # Configured vendors are suggested even before their first use
+    configured = {
+        normalize_vendor_name(label)
+        for label in DropdownChoice.objects.filter(choice_type='vendor', is_active=True).values_list('label_pl', flat=True)
+    }
+    for vendor_id in Vendor.objects.filter(normalized_name__in=configured).values_list('pk', flat=True):
+        uses.setdefault(vendor_id, 0)
+    return uses
+
+
+def _vendor_index(owner_id):
+    """
+    Cached per user: vendor usage, vendor names and a sorted list of (key, vendor ID)
+    where every word of a vendor name starts a key, so "mer" finds "Leroy Merlin"
+    as well as "Merkury Market".
+    """
+    index = cache.get(_prefix_index_key(owner_id))
+    if index is not None:
+        return index
+
+    usage = vendor_usage(owner_id)
+    names = dict(Vendor.objects.filter(pk__in=list(usage)).values_list('pk', 'name'))
+    entries = []
+    for vendor_id, name in names.items():
+        words = normalize_vendor_name(name).split(' ')
+        for position in range(len(words)):
+            entries.append((' '.join(words[position:]), vendor_id))
+    entries.sort()
+
+    index = (usage, names, [key for key, _vendor_id in entries], [vendor_id for _key, vendor_id in entries])
+    cache.set(_prefix_index_key(owner_id), index, PREFIX_INDEX_TIMEOUT)
+    return index
+
+
+def _prefix_matches(index, query):
+    _usage, _names, keys, vendor_ids = index
+    prefix = normalize_vendor_name(query)
+    matches = set()
+    position = bisect_left(keys, prefix)
+    while position < len(keys) and keys[position].startswith(prefix):
+        matches.add(vendor_ids[position])
+        position += 1
+    # Every match is a prefix match
+    return {vendor_id: (True, 1.0) for vendor_id in matches}
+
+
+def _like_prefix(query):
+    return query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def _trigram_matches(index, query):
+    """Vendor ID -> (is prefix match, trigram similarity), using the trigram index on vendor names"""
+    usage = index[0]
+    if not usage:
+        return {}
+    sql = """
+        SELECT id, name ILIKE %(prefix)s, similarity(name, %(query)s)
+        FROM renovation_vendor
+        WHERE id = ANY(%(ids)s) AND (name ILIKE %(prefix)s OR name %% %(query)s)
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {'ids': list(usage), 'prefix': _like_prefix(query), 'query': query})
+        return {vendor_id: (is_prefix, similarity) for vendor_id, is_prefix, similarity in cursor.fetchall()}
+
+
+def vendor_suggestions(user, query, limit=10):
+    """Top vendor names matching what the user has typed so far, with use counts"""
+    query = ' '.join(query.split())
+    if not query:
+        return []
+    limit = max(1, min(limit, MAX_SUGGESTIONS))
+
+    index = _vendor_index(user.pk)
+    usage, names = index[0], index[1]
+    if connection.vendor == 'postgresql':
+        matches = _trigram_matches(index, query)
+    else:
+        matches = _prefix_matches(index, query)
+
+    # Prefix matches first, then fuzzy ones; most used first within each
+    ranked = sorted(
+        matches.items(),
+        key=lambda item: (not item[1][0], -usage[item[0]], -item[1][1], names[item[0]].casefold())
+    )
+    return [(names[vendor_id], usage[vendor_id]) for vendor_id, _match in ranked[:limit]]
@@ -1,24 +1,44 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib import messages
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import content_disposition_header, urlencode
+from django.views.decorators.http import require_safe
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.utils.cache import patch_cache_control
 from django.utils.translation import gettext_lazy as _
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, connection, transaction
 from django.db.models import Sum, Count, Q
-from django.db.models.functions import TruncMonth
+from asgiref.sync import sync_to_async
 from datetime import timedelta, datetime, date
 from calendar import monthrange
-import json
-from .models import Purchase, RoomProgress, RoomProgressPhoto, WorkSession, PurchaseCategory, Room, ElectricalCircuit, Property, DropdownChoice, Equipment, EquipmentPhoto, EquipmentAssignment, RenovationTask, ShoppingItem
-from .forms import PurchaseForm, RoomProgressForm, WorkSessionForm, ElectricalCircuitForm, PropertyForm, RoomForm, DropdownChoiceForm, EquipmentForm, EquipmentPhotoForm, EquipmentAssignmentForm, RenovationTaskForm, ShoppingItemForm
+from functools import wraps
+import asyncio
+from .models import Purchase, MonthlySpend, RoomProgress, RoomProgressPhoto, WorkSession, PurchaseCategory, Room, RoomWallFinish, ElectricalCircuit, Property, DropdownChoice, Equipment, EquipmentPhoto, EquipmentAssignment, RenovationTask, ShoppingItem, Vendor
+from .forms import PurchaseForm, PurchaseImportForm, RoomProgressForm, WorkSessionForm, ElectricalCircuitForm, PropertyForm, RoomForm, DropdownChoiceForm, EquipmentForm, EquipmentPhotoForm, EquipmentAssignmentForm, RenovationTaskForm, ShoppingItemForm
+from .caching import cached_fragments, fragment_vary_on, property_conditional
+from .importers import PurchaseImporter
+from . import archives, availability, bundles, gallery, media, search, uploads, utilization, vendors, work_calendar
 
 
 def get_current_property(request):
     """Get the current property from session or user's first property"""
     property_id = request.session.get('current_property_id')
 
+    # Resolved once per request (conditional GET checks need it before the view)
+    cached = getattr(request, '_current_property', None)
+    if cached is not None and cached.id == property_id:
+        return cached
+
     if property_id:
         try:
-            return Property.objects.get(id=property_id, owner=request.user)
+            request._current_property = Property.objects.get(id=property_id, owner=request.user)
+            return request._current_property
         except Property.DoesNotExist:
             pass
 
@@ -26,152 +46,318 @@ def get_current_property(request):
     property_obj = Property.objects.filter(owner=request.user, is_active=True).first()
     if property_obj:
         request.session['current_property_id'] = property_obj.id
+        request._current_property = property_obj
     return property_obj
 
 
-@login_required
-def dashboard(request):
-    """Comprehensive dashboard with analytics"""
-
-    # Get current property
-    current_property = get_current_property(request)
-    if not current_property:
-        messages.warning(request, _('Proszę dodać nieruchomość przed rozpoczęciem pracy.'))
-        return redirect('property_add')
+def warn_duplicate_uploads(request):
+    """Tell the user when uploaded files were already stored (e.g. sent from another phone)"""
+    files = [uploaded for _field, field_files in request.FILES.lists() for uploaded in field_files]
+    duplicates = uploads.duplicate_uploads(files)
+    if duplicates:
+        messages.info(
+            request,
+            _('Przesłane pliki były już zapisane wcześniej ({}) - użyto istniejących kopii zamiast zapisywać je ponownie.').format(duplicates)
+        )
+
+
+def async_login_required(view_func):
+    """login_required for async views (Django 5.0's decorator only wraps sync views)"""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if user.is_authenticated:
+            return await view_func(request, *args, **kwargs)
+        return redirect_to_login(request.get_full_path())
+    return wrapper
+
+
+def _dashboard_spend_totals(current_property):
+    """Total spending and purchase count, read from the monthly rollup"""
+    spend_totals = MonthlySpend.objects.filter(property=current_property).aggregate(
+        total=Sum('total'),
+        count=Sum('count')
+    )
+    return {
+        'total_spent': spend_totals['total'] or 0,
+        'purchase_count': spend_totals['count'] or 0,
+    }
 
-    # Total spending (for current property)
-    total_spent = Purchase.objects.filter(property=current_property).aggregate(Sum('amount'))['amount__sum'] or 0
-    purchase_count = Purchase.objects.filter(property=current_property).count()
 
-    # Recent purchases (last 10) from current property
-    recent_purchases = Purchase.objects.filter(property=current_property).select_related('category').order_by('-date')[:10]
+def _dashboard_progress_counts(current_property):
+    """Progress entries and photos of the current property"""
+    return {
+        'progress_entries_count': RoomProgress.objects.filter(property=current_property).count(),
+        'total_photos': RoomProgressPhoto.objects.filter(property=current_property).count(),
+    }
 
-    # Progress entries from current property
-    progress_entries_count = RoomProgress.objects.filter(room__property=current_property).count()
-    recent_progress = RoomProgress.objects.filter(room__property=current_property).select_related('room').prefetch_related('photos').order_by('-date')[:5]
 
-    # Work sessions - This month vs Total (filtered by current property through rooms)
+def _dashboard_work_hours(current_property):
+    """Work sessions and hours - this month vs total"""
     today = date.today()
     first_day_of_month = date(today.year, today.month, 1)
 
-    # Total hours - filter by property through rooms_worked_on relationship
-    all_sessions = WorkSession.objects.filter(
-        rooms_worked_on__property=current_property
-    ).distinct()
-    total_duration = timedelta()
-    for session in all_sessions:
-        if session.duration:
-            total_duration += session.duration
-    total_work_hours = total_duration.total_seconds() / 3600
-
-    # This month hours - filter by property through rooms
-    this_month_sessions = WorkSession.objects.filter(
-        rooms_worked_on__property=current_property,
-        date__gte=first_day_of_month
-    ).distinct()
-    month_duration = timedelta()
-    for session in this_month_sessions:
-        if session.duration:
-            month_duration += session.duration
-    month_work_hours = month_duration.total_seconds() / 3600
-
-    work_sessions_count = all_sessions.count()
-    month_sessions_count = this_month_sessions.count()
-
-    # Photos - filter by property
-    total_photos = RoomProgressPhoto.objects.filter(
-        progress__room__property=current_property
-    ).count()
-
-    # Category spending for pie chart - filter by property
-    categories = PurchaseCategory.objects.annotate(
-        total=Sum('purchases__amount', filter=Q(purchases__property=current_property)),
-        count=Count('purchases', filter=Q(purchases__property=current_property))
-    ).filter(total__isnull=False).order_by('-total')
-
-    category_labels = []
-    category_data = []
-    category_colors = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40', '#C9CBCF', '#4BC0C0']
-
-    for idx, cat in enumerate(categories):
-        category_labels.append(cat.get_name_display())
-        category_data.append(float(cat.total))
-
-    # Monthly spending trends (last 6 months) - filter by property
-    six_months_ago = today - timedelta(days=180)
-    monthly_data = Purchase.objects.filter(
-        property=current_property,
-        date__gte=six_months_ago
-    ).annotate(
-        month=TruncMonth('date')
-    ).values('month').annotate(
-        total=Sum('amount')
-    ).order_by('month')
-
-    monthly_labels = []
-    monthly_amounts = []
-    for item in monthly_data:
-        month_name = item['month'].strftime('%b %Y')
-        monthly_labels.append(month_name)
-        monthly_amounts.append(float(item['total']))
-
-    # Room progress status - filter by property and optimize queries
-    all_rooms = Room.objects.filter(property=current_property).prefetch_related(
-        'progress_entries__photos'
+    # Both totals in one pass over the property's sessions index
+    totals = WorkSession.objects.filter(related_property=current_property).aggregate(
+        sessions=Count('id'),
+        minutes=Sum('duration_minutes'),
+        month_sessions=Count('id', filter=Q(date__gte=first_day_of_month)),
+        month_minutes=Sum('duration_minutes', filter=Q(date__gte=first_day_of_month)),
     )
+
+    return {
+        'work_sessions_count': totals['sessions'],
+        'month_sessions_count': totals['month_sessions'],
+        'total_work_hours': (totals['minutes'] or 0) / 60,
+        'month_work_hours': (totals['month_minutes'] or 0) / 60,
+    }
+
+
+def _dashboard_rooms(current_property):
+    """Room cards with progress and latest photo"""
+
+    # Counts and the latest photo are kept on the room (see room_counters.py)
+    all_rooms = Room.objects.filter(property=current_property).select_related('latest_photo')
     room_status = []
     for room in all_rooms:
-        latest_progress = room.progress_entries.order_by('-date').first()
-        progress_count = room.progress_entries.count()
-
         # Calculate progress percentage (based on number of updates)
         max_expected_updates = 10  # Assume 10 updates means 100%
-        progress_percentage = min(100, (progress_count / max_expected_updates) * 100)
-
-        latest_photo = None
-        if latest_progress:
-            latest_photo_obj = latest_progress.photos.first()
-            if latest_photo_obj:
-                latest_photo = latest_photo_obj.photo.url
+        progress_percentage = min(100, (room.progress_count / max_expected_updates) * 100)
 
         room_status.append({
             'room': room,
             'name': room.get_name_display(),
-            'progress_count': progress_count,
+            'progress_count': room.progress_count,
             'progress_percentage': int(progress_percentage),
-            'latest_progress': latest_progress,
-            'latest_photo': latest_photo,
+            'last_progress_date': room.last_progress_date,
+            'latest_photo': room.latest_photo.photo if room.latest_photo else None,
         })
 
-    # Top vendors by spending - filter by property
-    top_vendors = Purchase.objects.filter(property=current_property).values('vendor').annotate(
-        total=Sum('amount'),
-        count=Count('id')
-    ).order_by('-total')[:5]
+    return {'room_status': room_status}
+
+
+def _dashboard_recent_purchases(current_property):
+    """Last 10 purchases of the current property"""
+    return {
+        'recent_purchases': list(
+            Purchase.objects.filter(property=current_property).select_related('category').order_by('-date')[:10]
+        ),
+    }
+
+
+def _dashboard_top_vendors(current_property):
+    """Top vendors by spending"""
+    top_vendors = list(
+        Purchase.objects.filter(property=current_property).values('normalized_vendor').annotate(
+            total=Sum('amount'),
+            count=Count('id')
+        ).order_by('-total')[:5]
+    )
+    # Grouped on the integer vendor key; names are looked up afterwards
+    names = Vendor.objects.in_bulk([row['normalized_vendor'] for row in top_vendors if row['normalized_vendor']])
+    for row in top_vendors:
+        row['vendor'] = names.get(row['normalized_vendor'], '-')
+    return {'top_vendors': top_vendors}
+
+
+def _dashboard_recent_progress(current_property):
+    """Last 5 progress entries with their photos"""
+    return {
+        'recent_progress': list(
+            RoomProgress.objects.filter(property=current_property).select_related('room').prefetch_related('photos').order_by('-date')[:5]
+        ),
+    }
+
+
+# Dashboard sections cached as template fragments, with the independent
+# queries that fill each of them
+DASHBOARD_SECTIONS = {
+    'dashboard_stats': (_dashboard_spend_totals, _dashboard_progress_counts, _dashboard_work_hours),
+    'dashboard_rooms': (_dashboard_rooms,),
+    'dashboard_purchases': (_dashboard_recent_purchases, _dashboard_top_vendors),
+    'dashboard_progress': (_dashboard_recent_progress,),
+}
+
+
+class DashboardSection:
+    """
+    Context of one cached dashboard section. The template reads it inside the
+    section's {% cache %} block, so the queries run whenever the fragment has
+    to be rendered, even if it expired after the view checked the cache.
+    """
+
+    def __init__(self, builders, current_property):
+        self.builders = builders
+        self.current_property = current_property
+        self.data = None
+
+    def __getitem__(self, key):
+        if self.data is None:
+            self.data = {}
+            for build in self.builders:
+                self.data.update(build(self.current_property))
+        return self.data[key]
+
+
+def _dashboard_sections(request, current_property):
+    """Sections of the dashboard, and the builders of those whose fragment is not cached yet"""
+    cached = cached_fragments(DASHBOARD_SECTIONS, fragment_vary_on(request, current_property))
+    sections = {
+        name: DashboardSection(builders, current_property)
+        for name, builders in DASHBOARD_SECTIONS.items()
+    }
+    missing = [name for name in DASHBOARD_SECTIONS if name not in cached]
+    return sections, missing
+
+
+def _run_on_own_connection(build, current_property):
+    """Run a dashboard builder in a worker thread, then release its DB connection"""
+    try:
+        return build(current_property)
+    finally:
+        connection.close()
+
+
+async def _gather_dashboard_sections(request, builders, current_property):
+    """
+    Run the section builders concurrently under ASGI, each on its own worker
+    thread and database connection. Under WSGI (one thread per request) they
+    run one after another on the request's connection.
+    """
+    if isinstance(request, ASGIRequest):
+        return await asyncio.gather(*(
+            sync_to_async(_run_on_own_connection, thread_sensitive=False)(build, current_property)
+            for build in builders
+        ))
+
+    return await sync_to_async(lambda: [build(current_property) for build in builders])()
+
+
+@async_login_required
+@property_conditional
+async def dashboard(request):
+    """Comprehensive dashboard with analytics"""
+
+    # Get current property
+    current_property = await sync_to_async(get_current_property)(request)
+    if not current_property:
+        messages.warning(request, _('Proszę dodać nieruchomość przed rozpoczęciem pracy.'))
+        return redirect('property_add')
+
+    # Compute the sections whose rendered fragment is missing from the cache up
+    # front, concurrently; any other section computes itself if the template needs it
+    sections, missing = await sync_to_async(_dashboard_sections)(request, current_property)
+    builders = [(name, build) for name in missing for build in DASHBOARD_SECTIONS[name]]
+    results = await _gather_dashboard_sections(request, [build for _name, build in builders], current_property)
+    for (name, _build), data in zip(builders, results):
+        if sections[name].data is None:
+            sections[name].data = {}
+        sections[name].data.update(data)
 
     context = {
         'current_property': current_property,
-        'total_spent': total_spent,
-        'purchase_count': purchase_count,
-        'recent_purchases': recent_purchases,
-        'progress_entries_count': progress_entries_count,
-        'recent_progress': recent_progress,
-        'work_sessions_count': work_sessions_count,
-        'month_sessions_count': month_sessions_count,
-        'total_work_hours': total_work_hours,
-        'month_work_hours': month_work_hours,
-        'total_photos': total_photos,
-        'room_status': room_status,
-        'top_vendors': top_vendors,
-        # Chart data
-        'category_labels_json': json.dumps(category_labels),
-        'category_data_json': json.dumps(category_data),
-        'category_colors_json': json.dumps(category_colors[:len(category_labels)]),
-        'monthly_labels_json': json.dumps(monthly_labels),
-        'monthly_amounts_json': json.dumps(monthly_amounts),
+        'dashboard_sections': sections,
     }
 
-    return render(request, 'renovation/dashboard.html', context)
+    return await sync_to_async(render)(request, 'renovation/dashboard.html', context)
+
+
+CHART_GRANULARITIES = ('month', 'quarter', 'year')
+
+
+def _chart_params(request):
+    """
+    Read the start/end (YYYY-MM) and granularity query parameters of a chart
+    endpoint. Missing months come back as None; malformed values raise ValueError.
+    """
+    start, end = (
+        datetime.strptime(request.GET[name], '%Y-%m').date() if request.GET.get(name) else None
+        for name in ('start', 'end')
+    )
+    granularity = request.GET.get('granularity', 'month')
+    if (start and end and start > end) or granularity not in CHART_GRANULARITIES:
+        raise ValueError
+    return start, end, granularity
+
+
+def _chart_period_label(month, granularity):
+    if granularity == 'year':
+        return str(month.year)
+    if granularity == 'quarter':
+        return f'Q{(month.month - 1) // 3 + 1} {month.year}'
+    return month.strftime('%b %Y')
+
+
+@login_required
+@property_conditional
+def chart_categories_data(request):
+    """JSON for the category pie chart: spending per category in a month range"""
+    current_property = get_current_property(request)
+    if not current_property:
+        return JsonResponse({'error': str(_('Brak nieruchomości.'))}, status=404)
+
+    try:
+        start, end = _chart_params(request)[:2]
+    except ValueError:
+        return JsonResponse({'error': str(_('Nieprawidłowe parametry wykresu.'))}, status=400)
+
+    # Without an explicit range the chart covers all spending
+    rows = MonthlySpend.category_totals(current_property, start, end)
+    category_names = dict(PurchaseCategory.CATEGORY_CHOICES)
+    labels = []
+    data = []
+    for row in rows:
+        labels.append(str(category_names.get(row['category__name'], row['category__name'])))
+        data.append(float(row['category_total']))
+
+    return JsonResponse({'labels': labels, 'data': data})
+
+
+@login_required
+@property_conditional
+def chart_spending_data(request):
+    """JSON for the spending trend chart: totals per month, quarter or year"""
+    current_property = get_current_property(request)
+    if not current_property:
+        return JsonResponse({'error': str(_('Brak nieruchomości.'))}, status=404)
+
+    try:
+        start, end, granularity = _chart_params(request)
+        # Default to the last 6 months (ValueError before year 1)
+        end = end or MonthlySpend.month_start(date.today())
+        start = start or MonthlySpend.add_months(end, -5)
+    except ValueError:
+        return JsonResponse({'error': str(_('Nieprawidłowe parametry wykresu.'))}, status=400)
+    if start > end:
+        return JsonResponse({'error': str(_('Nieprawidłowe parametry wykresu.'))}, status=400)
+
+    # Months come back in order, so periods can be merged as they appear
+    labels = []
+    data = []
+    for month, total in MonthlySpend.monthly_totals(current_property, start, end):
+        label = _chart_period_label(month, granularity)
+        if labels and labels[-1] == label:
+            data[-1] += float(total)
+        else:
+            labels.append(label)
+            data.append(float(total))
+
+    return JsonResponse({'labels': labels, 'data': data})
+
+
+@login_required
+def vendor_autocomplete(request):
+    """JSON vendor suggestions for the vendor inputs, most used first"""
+    try:
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        limit = 10
+
+    suggestions = vendors.vendor_suggestions(request.user, request.GET.get('q', ''), limit)
+    response = JsonResponse({'results': [{'name': name, 'uses': uses} for name, uses in suggestions]})
+    # Typing repeats the same prefixes; the browser may reuse answers briefly
+    patch_cache_control(response, private=True, max_age=60)
+    return response
 
 
 def user_login(request):
@@ -204,6 +390,39 @@ def user_logout(request):
 
 
 @login_required
+def search_view(request):
+    """Full-text search across the current property's records"""
+    current_property = get_current_property(request)
+    if not current_property:
+        messages.warning(request, _('Proszę dodać nieruchomość przed rozpoczęciem pracy.'))
+        return redirect('property_add')
+
+    query = request.GET.get('q', '').strip()
+    results = search.search(request.user, current_property, query) if query else []
+
+    context = {
+        'current_property': current_property,
+        'search_query': query,
+        'results': results,
+    }
+
+    return render(request, 'renovation/search.html', context)
+
+
+@login_required
+@require_safe
+def media_file(request, path):
+    """Uploaded photo or receipt, only for users whose records use it"""
+    if not uploads.user_can_access(request.user, path):
+        raise Http404
+    try:
+        return media.serve_media(request, path, default_storage)
+    except (OSError, SuspiciousFileOperation):
+        raise Http404
+
+
+@login_required
+@property_conditional
 def purchases_list(request):
     """List all purchases"""
     current_property = get_current_property(request)
@@ -223,6 +442,7 @@ def purchases_list(request):
 
 
 @login_required
+@property_conditional
 def progress_list(request):
     """List all progress entries"""
     current_property = get_current_property(request)
@@ -231,7 +451,7 @@ def progress_list(request):
         return redirect('property_add')
 
     progress_entries = RoomProgress.objects.filter(
-        room__property=current_property
+        property=current_property
     ).select_related('room').prefetch_related('photos').order_by('-date')
 
     context = {
@@ -243,6 +463,70 @@ def progress_list(request):
 
 
 @login_required
+def gallery_view(request):
+    """Infinite-scroll gallery of the property's progress and equipment photos"""
+    current_property = get_current_property(request)
+    if not current_property:
+        messages.warning(request, _('Proszę dodać nieruchomość przed rozpoczęciem pracy.'))
+        return redirect('property_add')
+
+    # The page only renders the filters; photos come from gallery_photos
+    filters = {name: request.GET.get(name, '') for name in ('room', 'date_from', 'date_to')}
+
+    context = {
+        'current_property': current_property,
+        'rooms': Room.objects.filter(property=current_property),
+        'filters': filters,
+        'photos_url': reverse('gallery_photos') + '?' + urlencode({k: v for k, v in filters.items() if v}),
+    }
+    return render(request, 'renovation/gallery.html', context)
+
+
+def _gallery_params(request, current_property):
+    """
+    Read the room, date_from/date_to (YYYY-MM-DD), cursor and limit query
+    parameters of the gallery API; malformed values raise ValueError.
+    """
+    room_id = request.GET.get('room') or None
+    if room_id and not Room.objects.filter(pk=int(room_id), property=current_property).exists():
+        raise ValueError
+    date_from, date_to = (
+        datetime.strptime(request.GET[name], '%Y-%m-%d').date() if request.GET.get(name) else None
+        for name in ('date_from', 'date_to')
+    )
+    uploaded_from, uploaded_before = gallery.upload_range(date_from, date_to)
+    cursor = request.GET.get('cursor')
+    limit = int(request.GET.get('limit', gallery.PAGE_SIZE))
+    if not 1 <= limit <= gallery.MAX_PAGE_SIZE:
+        raise ValueError
+    return {
+        'room_id': int(room_id) if room_id else None,
+        'uploaded_from': uploaded_from,
+        'uploaded_before': uploaded_before,
+        'cursor': gallery.decode_cursor(cursor) if cursor else None,
+        'limit': limit,
+    }
+
+
+@login_required
+@property_conditional
+def gallery_photos(request):
+    """JSON page of gallery photos, newest first, with the cursor of the next page"""
+    current_property = get_current_property(request)
+    if not current_property:
+        return JsonResponse({'error': str(_('Brak nieruchomości.'))}, status=404)
+
+    try:
+        params = _gallery_params(request, current_property)
+    except (ValueError, OverflowError):
+        return JsonResponse({'error': str(_('Nieprawidłowe parametry galerii.'))}, status=400)
+
+    results, next_cursor = gallery.gallery_page(current_property, **params)
+    return JsonResponse({'results': results, 'next': next_cursor})
+
+
+@login_required
+@property_conditional
 def sessions_list(request):
     """List all work sessions"""
     current_property = get_current_property(request)
@@ -250,27 +534,48 @@ def sessions_list(request):
         messages.warning(request, _('Proszę dodać nieruchomość przed rozpoczęciem pracy.'))
         return redirect('property_add')
 
-    # Filter sessions by rooms that belong to current property
     sessions = WorkSession.objects.filter(
-        rooms_worked_on__property=current_property
-    ).distinct().prefetch_related('rooms_worked_on').order_by('-date', '-start_time')
+        related_property=current_property
+    ).prefetch_related('rooms_worked_on').order_by('-date', '-start_time')
 
     # Calculate total hours
-    total_duration = timedelta()
-    for session in sessions:
-        if session.duration:
-            total_duration += session.duration
-    total_hours = total_duration.total_seconds() / 3600
+    total_minutes = sessions.aggregate(total=Sum('duration_minutes'))['total'] or 0
+    total_hours = total_minutes / 60
 
+    today = date.today()
     context = {
         'current_property': current_property,
         'sessions': sessions,
         'total_hours': total_hours,
+        'calendar': work_calendar.work_calendar(current_property, today - timedelta(days=364), today),
     }
 
     return render(request, 'renovation/sessions_list.html', context)
 
 
+@login_required
+@property_conditional
+def session_calendar(request):
+    """JSON minutes worked per day, week, month and room of the current property (last year by default)"""
+    current_property = get_current_property(request)
+    if not current_property:
+        return JsonResponse({'error': str(_('Brak nieruchomości.'))}, status=404)
+
+    try:
+        date_to = datetime.strptime(request.GET['date_to'], '%Y-%m-%d').date() if request.GET.get('date_to') else date.today()
+        date_from = (
+            datetime.strptime(request.GET['date_from'], '%Y-%m-%d').date() if request.GET.get('date_from')
+            # The last year, cut off at the first representable day
+            else date_to - min(timedelta(days=364), date_to - date.min)
+        )
+        if not 0 <= (date_to - date_from).days < work_calendar.MAX_DAYS:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({'error': str(_('Nieprawidłowe parametry kalendarza.'))}, status=400)
+
+    return JsonResponse(work_calendar.work_calendar(current_property, date_from, date_to))
+
+
 @login_required
 def purchase_add(request):
     """Add a new purchase with beautiful form"""
@@ -286,6 +591,7 @@ def purchase_add(request):
             purchase.property = current_property
             purchase.save()
             messages.success(request, _('Zakup został dodany pomyślnie!'))
+            warn_duplicate_uploads(request)
             return redirect('purchases_list')
     else:
         form = PurchaseForm()
@@ -314,6 +620,7 @@ def purchase_edit(request, pk):
         if form.is_valid():
             form.save()
             messages.success(request, _('Zakup został zaktualizowany!'))
+            warn_duplicate_uploads(request)
             return redirect('purchases_list')
     else:
         form = PurchaseForm(instance=purchase)
@@ -328,6 +635,48 @@ def purchase_edit(request, pk):
     return render(request, 'renovation/purchase_form.html', context)
 
 
+@login_required
+def purchase_import(request):
+    """Bulk import purchases from a bank statement or receipt export"""
+    current_property = get_current_property(request)
+    if not current_property:
+        messages.warning(request, _('Proszę dodać nieruchomość przed rozpoczęciem pracy.'))
+        return redirect('property_add')
+
+    result = None
+    if request.method == 'POST':
+        form = PurchaseImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            importer = PurchaseImporter(
+                current_property,
+                default_category=form.cleaned_data['default_category'],
+                decimal_separator=form.cleaned_data['decimal_separator'] or None,
+                expenses_negative=form.cleaned_data['amount_sign'] == 'negative',
+            )
+            try:
+                result = importer.run(form.cleaned_data['file'])
+            except ValueError as exc:
+                # Problems with the file as a whole (format, header)
+                form.add_error('file', str(exc))
+            else:
+                messages.success(
+                    request,
+                    _('Zaimportowano {} zakupów, pominięto {} duplikatów.').format(result.created, result.duplicates)
+                )
+                if not result.has_errors:
+                    return redirect('purchases_list')
+    else:
+        form = PurchaseImportForm()
+
+    context = {
+        'current_property': current_property,
+        'form': form,
+        'result': result,
+        'title': _('Importuj zakupy'),
+    }
+    return render(request, 'renovation/purchase_import.html', context)
+
+
 @login_required
 def progress_add(request):
     """Add a new room progress entry with photos"""
@@ -348,6 +697,7 @@ def progress_add(request):
                 RoomProgressPhoto.objects.create(progress=progress, photo=photo)
 
             messages.success(request, _('Postęp został dodany pomyślnie!'))
+            warn_duplicate_uploads(request)
             return redirect('progress_list')
     else:
         form = RoomProgressForm(current_property=current_property)
@@ -370,7 +720,10 @@ def session_add(request):
     if request.method == 'POST':
         form = WorkSessionForm(request.POST, current_property=current_property)
         if form.is_valid():
-            form.save()
+            session = form.save(commit=False)
+            session.related_property = current_property
+            session.save()
+            form.save_m2m()
             messages.success(request, _('Sesja została dodana pomyślnie!'))
             return redirect('sessions_list')
     else:
@@ -470,6 +823,31 @@ def property_edit(request, pk):
     return render(request, 'renovation/property_form.html', context)
 
 
+@login_required
+def property_archive(request, pk):
+    """Download all photos and receipts of a property as a ZIP streamed while it is built"""
+    property_obj = get_object_or_404(Property, pk=pk, owner=request.user)
+
+    response = StreamingHttpResponse(
+        archives.stream_zip(archives.property_archive_entries(property_obj)),
+        content_type='application/zip'
+    )
+    response['Content-Disposition'] = content_disposition_header(True, archives.archive_filename(property_obj))
+    patch_cache_control(response, private=True, no_store=True)
+    return response
+
+
+@login_required
+def property_export(request, pk):
+    """Download a property with all its records and media as an import bundle"""
+    property_obj = get_object_or_404(Property, pk=pk, owner=request.user)
+
+    response = StreamingHttpResponse(bundles.stream_bundle(property_obj), content_type='application/zip')
+    response['Content-Disposition'] = content_disposition_header(True, bundles.bundle_filename(property_obj))
+    patch_cache_control(response, private=True, no_store=True)
+    return response
+
+
 @login_required
 def property_switch(request, pk):
     """Switch to a different property"""
@@ -490,10 +868,27 @@ def room_list(request):
         return redirect('property_add')
 
     rooms = Room.objects.filter(property=current_property).order_by('name')
+    # Summed over the generated columns, rooms without full dimensions are skipped
+    areas = rooms.aggregate(floor_area=Sum('floor_area'), wall_area=Sum('wall_area'), volume=Sum('volume'))
+
+    # Rooms per wall finish, and the rooms with the selected one
+    finish_labels = Room.wall_finish_labels()
+    finish_counts = [
+        {'value': row['finish'], 'label': finish_labels.get(row['finish'], row['finish']), 'count': row['count']}
+        for row in RoomWallFinish.objects.filter(room__property=current_property).values('finish').annotate(
+            count=Count('room')
+        ).order_by('-count', 'finish')
+    ]
+    selected_finish = request.GET.get('finish', '')
+    if selected_finish:
+        rooms = rooms.filter(wall_finishes__finish=selected_finish)
 
     context = {
         'current_property': current_property,
         'rooms': rooms,
+        'areas': areas,
+        'finish_counts': finish_counts,
+        'selected_finish': selected_finish,
     }
     return render(request, 'renovation/room_list.html', context)
 
@@ -512,6 +907,7 @@ def room_add(request):
             room = form.save(commit=False)
             room.property = current_property
             room.save()
+            form.save_m2m()
             messages.success(request, _('Pomieszczenie zostało dodane pomyślnie!'))
             return redirect('room_list')
     else:
@@ -563,15 +959,20 @@ def room_detail(request, pk):
 
     room = get_object_or_404(Room, pk=pk, property=current_property)
 
-    # Get wall finishes as list
-    wall_finishes_list = []
-    if room.wall_finishes:
-        wall_finishes_list = [finish.strip() for finish in room.wall_finishes.split(',')]
+    finish_labels = Room.wall_finish_labels()
+    wall_finishes_list = [
+        finish_labels.get(finish, finish) for finish in room.wall_finishes.values_list('finish', flat=True)
+    ]
+
+    photos = RoomProgressPhoto.objects.filter(progress__room=room).select_related('progress').order_by(
+        '-progress__date', '-uploaded_at'
+    )[:12]
 
     context = {
         'current_property': current_property,
         'room': room,
         'wall_finishes_list': wall_finishes_list,
+        'photos': photos,
     }
     return render(request, 'renovation/room_detail.html', context)
 
@@ -684,6 +1085,7 @@ def dropdown_choice_delete(request, pk):
 # ========================================
 
 @login_required
+@property_conditional
 def equipment_list(request):
     """List all equipment for the current user"""
     current_property = get_current_property(request)
@@ -701,6 +1103,24 @@ def equipment_list(request):
     return render(request, 'renovation/equipment_list.html', context)
 
 
+@login_required
+def equipment_utilization(request):
+    """Days of use per property, idle time and net cost per day of use of the user's equipment"""
+    current_property = get_current_property(request)
+    if not current_property:
+        messages.warning(request, _('Proszę dodać nieruchomość przed rozpoczęciem pracy.'))
+        return redirect('property_add')
+
+    report = utilization.utilization_report(request.user)
+    context = {
+        'current_property': current_property,
+        'report': report,
+        'total_used_days': sum(row.used_days for row in report),
+        'total_idle_days': sum(row.idle_days for row in report),
+    }
+    return render(request, 'renovation/equipment_utilization.html', context)
+
+
 @login_required
 def equipment_add(request):
     """Add new equipment"""
@@ -716,6 +1136,7 @@ def equipment_add(request):
             equipment.owner = request.user
             equipment.save()
             messages.success(request, _('Sprzęt został dodany pomyślnie.'))
+            warn_duplicate_uploads(request)
             return redirect('equipment_detail', pk=equipment.pk)
     else:
         form = EquipmentForm()
@@ -765,6 +1186,7 @@ def equipment_edit(request, pk):
         if form.is_valid():
             form.save()
             messages.success(request, _('Sprzęt został zaktualizowany.'))
+            warn_duplicate_uploads(request)
             return redirect('equipment_detail', pk=equipment.pk)
     else:
         form = EquipmentForm(instance=equipment)
@@ -822,6 +1244,7 @@ def equipment_photo_add(request, equipment_pk):
             photo.equipment = equipment
             photo.save()
             messages.success(request, _('Zdjęcie zostało dodane.'))
+            warn_duplicate_uploads(request)
             return redirect('equipment_detail', pk=equipment.pk)
     else:
         form = EquipmentPhotoForm()
@@ -874,19 +1297,24 @@ def equipment_assign(request, equipment_pk):
         messages.error(request, _('Nie można przypisać sprzedanego sprzętu do nieruchomości.'))
         return redirect('equipment_detail', pk=equipment.pk)
 
-    # Check if already assigned
-    if equipment.is_assigned:
-        messages.error(request, _('Sprzęt jest już przypisany do nieruchomości. Zwolnij go najpierw.'))
-        return redirect('equipment_detail', pk=equipment.pk)
-
     if request.method == 'POST':
         form = EquipmentAssignmentForm(request.POST, user=request.user)
         if form.is_valid():
             assignment = form.save(commit=False)
             assignment.equipment = equipment
-            assignment.save()
-            messages.success(request, _('Sprzęt został przypisany do nieruchomości.'))
-            return redirect('equipment_detail', pk=equipment.pk)
+            # No availability pre-check: the database constraints decide, also
+            # for concurrent requests, and only a rejection costs a query
+            try:
+                with transaction.atomic():
+                    assignment.save()
+            except IntegrityError:
+                if equipment.assignments.filter(end_date__isnull=True).exists():
+                    messages.error(request, _('Sprzęt jest już przypisany do nieruchomości. Zwolnij go najpierw.'))
+                    return redirect('equipment_detail', pk=equipment.pk)
+                form.add_error('start_date', _('W tym okresie sprzęt był już przypisany do nieruchomości.'))
+            else:
+                messages.success(request, _('Sprzęt został przypisany do nieruchomości.'))
+                return redirect('equipment_detail', pk=equipment.pk)
     else:
         form = EquipmentAssignmentForm(user=request.user, initial={'start_date': date.today()})
 
@@ -915,7 +1343,8 @@ def equipment_unassign(request, equipment_pk):
         return redirect('equipment_detail', pk=equipment.pk)
 
     if request.method == 'POST':
-        assignment.end_date = date.today()
+        # An assignment starting in the future is released as an empty period
+        assignment.end_date = max(date.today(), assignment.start_date)
         assignment.save()
         messages.success(request, _('Sprzęt został zwolniony z nieruchomości.'))
         return redirect('equipment_detail', pk=equipment.pk)
@@ -928,9 +1357,68 @@ def equipment_unassign(request, equipment_pk):
     return render(request, 'renovation/equipment_unassign_confirm.html', context)
 
 
+def _availability_params(request):
+    """
+    Period of the availability API: `date` for a single day, or `date_from` and
+    optionally `date_to` (both inclusive). Returns (start, end) with end exclusive
+    or None for an open-ended period; malformed values raise ValueError, a
+    period ending on the last representable day OverflowError.
+    """
+    def parse(name):
+        return datetime.strptime(request.GET[name], '%Y-%m-%d').date() if request.GET.get(name) else None
+
+    day = parse('date')
+    if day:
+        return day, day + timedelta(days=1)
+    start = parse('date_from') or date.today()
+    end = parse('date_to')
+    if end is not None:
+        if end < start:
+            raise ValueError
+        end += timedelta(days=1)
+    return start, end
+
+
+@login_required
+def equipment_availability(request):
+    """JSON availability of the user's equipment on a day or in a period, optionally at one property"""
+    try:
+        start, end = _availability_params(request)
+        property_id = int(request.GET['property']) if request.GET.get('property') else None
+    except (ValueError, OverflowError):
+        # OverflowError: the exclusive end of a period ending on date.max
+        return JsonResponse({'error': str(_('Nieprawidłowe parametry dostępności.'))}, status=400)
+
+    property_obj = None
+    if property_id is not None:
+        property_obj = get_object_or_404(Property, pk=property_id, owner=request.user)
+
+    results = []
+    for equipment in availability.equipment_availability(request.user, start, end, property_obj):
+        results.append({
+            'id': equipment.pk,
+            'name': equipment.name,
+            'url': reverse('equipment_detail', args=[equipment.pk]),
+            'is_sold': equipment.is_sold,
+            'available': not equipment.is_sold and not equipment.busy_assignments,
+            'assignments': [{
+                'property_id': assignment.assigned_property_id,
+                'property': assignment.assigned_property.name,
+                'start_date': assignment.start_date,
+                'end_date': assignment.end_date,
+            } for assignment in equipment.busy_assignments],
+        })
+    return JsonResponse({
+        'date_from': start,
+        'date_to': end - timedelta(days=1) if end else None,
+        'results': results,
+    })
+
+
 # To-Do List Views
 
 @login_required
+@property_conditional
 def todo_list(request):
     """Display combined to-do list for current property"""
     current_property = get_current_property(request)
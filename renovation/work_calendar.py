@@ -0,0 +1,84 @@
+"""
+Hours worked per day, week and month in a property, with a split per room.
+
+The minutes of every session are stored on the session (duration_minutes), so
+one grouped query over the property's sessions, left-joined to their rooms,
+returns the minutes per (day, room). A session spanning several rooms is split
+evenly between them, so the room totals add up to the hours actually worked;
+sessions without rooms count towards the days only. The result is returned as
+dense arrays aligned to the start of the period, which the heatmap draws
+without looking at individual sessions.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+
+from .models import Room, WorkSession
+
+
+# Longest period the calendar API returns at once
+MAX_DAYS = 3 * 366
+
+
+def _month_index(start, day):
+    return (day.year - start.year) * 12 + day.month - start.month
+
+
+def minutes_by_day_and_room(property_obj, date_from, date_to):
+    """(date, room_id or None, minutes) rows of the property's sessions in the period"""
+    room_count = WorkSession.rooms_worked_on.through.objects.filter(
+        worksession_id=OuterRef('pk')
+    ).values('worksession_id').annotate(count=Count('*')).values('count')
+
+    return WorkSession.objects.filter(
+        related_property=property_obj,
+        date__range=(date_from, date_to),
+        duration_minutes__isnull=False,
+    ).values_list('date', 'rooms_worked_on').annotate(
+        minutes=Sum(Cast('duration_minutes', FloatField()) / Coalesce(Subquery(room_count), Value(1)))
+    ).order_by()
+
+
+def work_calendar(property_obj, date_from, date_to):
+    """
+    Minutes worked per day, per week (weeks start on Monday) and per month of
+    the period, and per room (total and per month), all as lists aligned to the
+    start of the period.
+    """
+    week_start = date_from - timedelta(days=date_from.weekday())
+    days = [0.0] * ((date_to - date_from).days + 1)
+    weeks = [0.0] * ((date_to - week_start).days // 7 + 1)
+    months = [0.0] * (_month_index(date_from, date_to) + 1)
+    room_months = {}
+
+    for day, room_id, minutes in minutes_by_day_and_room(property_obj, date_from, date_to):
+        days[(day - date_from).days] += minutes
+        weeks[(day - week_start).days // 7] += minutes
+        months[_month_index(date_from, day)] += minutes
+        if room_id is None:
+            continue
+        room_months.setdefault(room_id, [0.0] * len(months))[_month_index(date_from, day)] += minutes
+
+    rooms = []
+    for room in Room.objects.filter(pk__in=room_months):
+        minutes = room_months[room.pk]
+        total = round(sum(minutes))
+        rooms.append({
+            'id': room.pk,
+            'name': room.get_display_name(),
+            'minutes': total,
+            'hours': round(total / 60, 1),
+            'months': [round(value) for value in minutes],
+        })
+    rooms.sort(key=lambda room: room['minutes'], reverse=True)
+
+    return {
+        'start': date_from,
+        'end': date_to,
+        'total_minutes': round(sum(days)),
+        'days': [round(value) for value in days],
+        'weeks': {'start': week_start, 'minutes': [round(value) for value in weeks]},
+        'months': {'start': date_from.replace(day=1), 'minutes': [round(value) for value in months]},
+        'rooms': rooms,
+    }
@@ -0,0 +1,157 @@
+/*
+ * Infinite-scroll photo gallery for .photo-gallery[data-photos-url].
+ *
+ * Pages come from the keyset JSON API ({results, next}). Tiles are laid out in
+ * a fixed grid, so the position of every photo is known without rendering it,
+ * and only the rows around the viewport are kept in the DOM.
+ */
+(function() {
+    'use strict';
+
+    const MIN_TILE_WIDTH = 180;
+    const GAP = 8;
+    // Rows rendered above and below the viewport
+    const BUFFER_ROWS = 3;
+    // Start fetching the next page this many rows before the end
+    const PREFETCH_ROWS = 6;
+
+    function attach(container) {
+        const status = document.querySelector('.gallery-status');
+        const items = [];
+        const tiles = new Map();
+        let next = null;
+        let done = false;
+        let loading = false;
+        let columns = 1;
+        let tileSize = MIN_TILE_WIDTH;
+        let frame = null;
+
+        function setStatus(key) {
+            status.textContent = key ? status.dataset[key] : '';
+        }
+
+        function layout() {
+            const width = container.clientWidth;
+            columns = Math.max(1, Math.floor((width + GAP) / (MIN_TILE_WIDTH + GAP)));
+            tileSize = (width - GAP * (columns - 1)) / columns;
+            container.style.height = Math.ceil(items.length / columns) * (tileSize + GAP) + 'px';
+            tiles.forEach(function(tile, index) { place(tile, index); });
+        }
+
+        function place(tile, index) {
+            const row = Math.floor(index / columns);
+            const column = index % columns;
+            tile.style.width = tileSize + 'px';
+            tile.style.height = tileSize + 'px';
+            tile.style.transform = 'translate(' + column * (tileSize + GAP) + 'px, ' + row * (tileSize + GAP) + 'px)';
+        }
+
+        function createTile(item) {
+            const tile = document.createElement('a');
+            tile.className = 'gallery-tile';
+            tile.href = item.url;
+            tile.target = '_blank';
+            tile.title = item.caption || item.title;
+
+            const img = document.createElement('img');
+            img.src = item.thumbnail;
+            if (item.srcset) {
+                img.srcset = item.srcset;
+                img.sizes = Math.ceil(tileSize) + 'px';
+            }
+            if (item.width && item.height) {
+                img.width = item.width;
+                img.height = item.height;
+            }
+            img.alt = item.caption || item.title;
+            img.decoding = 'async';
+            img.loading = 'lazy';
+
+            const caption = document.createElement('div');
+            caption.className = 'gallery-tile-caption';
+            caption.textContent = item.title + ' · ' + new Date(item.uploaded_at).toLocaleDateString();
+
+            tile.append(img, caption);
+            return tile;
+        }
+
+        function render() {
+            frame = null;
+            const rowHeight = tileSize + GAP;
+            const top = window.scrollY - (container.getBoundingClientRect().top + window.scrollY);
+            const firstRow = Math.max(0, Math.floor(top / rowHeight) - BUFFER_ROWS);
+            const lastRow = Math.ceil((top + window.innerHeight) / rowHeight) + BUFFER_ROWS;
+            const first = firstRow * columns;
+            const last = Math.min(items.length, (lastRow + 1) * columns);
+
+            tiles.forEach(function(tile, index) {
+                if (index < first || index >= last) {
+                    tile.remove();
+                    tiles.delete(index);
+                }
+            });
+            const fragment = document.createDocumentFragment();
+            for (let index = first; index < last; index++) {
+                if (!tiles.has(index)) {
+                    const tile = createTile(items[index]);
+                    place(tile, index);
+                    tiles.set(index, tile);
+                    fragment.append(tile);
+                }
+            }
+            container.append(fragment);
+
+            if (!done && !loading && last + PREFETCH_ROWS * columns >= items.length) {
+                load();
+            }
+        }
+
+        function schedule() {
+            if (frame === null) {
+                frame = requestAnimationFrame(render);
+            }
+        }
+
+        function load() {
+            loading = true;
+            setStatus('loadingText');
+            const url = new URL(container.dataset.photosUrl, window.location.origin);
+            if (next) {
+                url.searchParams.set('cursor', next);
+            }
+            fetch(url, {credentials: 'same-origin'})
+                .then(function(response) {
+                    if (!response.ok) {
+                        throw new Error(response.statusText);
+                    }
+                    return response.json();
+                })
+                .then(function(page) {
+                    items.push.apply(items, page.results);
+                    next = page.next;
+                    done = !next;
+                    loading = false;
+                    setStatus(items.length ? null : 'emptyText');
+                    layout();
+                    schedule();
+                })
+                .catch(function() {
+                    loading = false;
+                    done = true;
+                    setStatus('errorText');
+                });
+        }
+
+        window.addEventListener('scroll', schedule, {passive: true});
+        new ResizeObserver(function() {
+            layout();
+            schedule();
+        }).observe(container);
+        layout();
+        load();
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        document.querySelectorAll('.photo-gallery[data-photos-url]').forEach(attach);
+    });
+})();
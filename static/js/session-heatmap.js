@@ -0,0 +1,56 @@
+/*
+ * Heatmap of hours worked per day for .session-heatmap[data-calendar-id].
+ *
+ * The calendar data ({start, days, ...} as returned by the session calendar
+ * API) is read from the json_script element named by data-calendar-id. Days
+ * are laid out in columns of weeks starting on Monday, shaded by the minutes
+ * worked relative to the busiest day.
+ */
+(function() {
+    'use strict';
+
+    const CELL = 12;
+    const GAP = 2;
+    const LEVELS = 4;
+
+    function parseDate(value) {
+        const parts = value.split('-').map(Number);
+        return new Date(parts[0], parts[1] - 1, parts[2]);
+    }
+
+    function draw(container) {
+        const calendar = JSON.parse(document.getElementById(container.dataset.calendarId).textContent);
+        const start = parseDate(calendar.start);
+        // Monday-based weekday of the first day
+        const offset = (start.getDay() + 6) % 7;
+        const max = Math.max.apply(null, calendar.days.concat([1]));
+        const weeks = Math.ceil((offset + calendar.days.length) / 7);
+
+        const grid = document.createElement('div');
+        grid.className = 'session-heatmap-grid';
+        grid.style.display = 'grid';
+        grid.style.gridTemplateRows = 'repeat(7, ' + CELL + 'px)';
+        grid.style.gridTemplateColumns = 'repeat(' + weeks + ', ' + CELL + 'px)';
+        grid.style.gridAutoFlow = 'column';
+        grid.style.gap = GAP + 'px';
+
+        const fragment = document.createDocumentFragment();
+        for (let index = 0; index < offset; index++) {
+            fragment.append(document.createElement('div'));
+        }
+        calendar.days.forEach(function(minutes, index) {
+            const day = new Date(start.getFullYear(), start.getMonth(), start.getDate() + index);
+            const cell = document.createElement('div');
+            const level = minutes ? Math.ceil(minutes / max * LEVELS) : 0;
+            cell.className = 'session-heatmap-cell level-' + level;
+            cell.title = day.toLocaleDateString() + ': ' + (minutes / 60).toFixed(1) + ' h';
+            fragment.append(cell);
+        });
+        grid.append(fragment);
+        container.append(grid);
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        document.querySelectorAll('.session-heatmap[data-calendar-id]').forEach(draw);
+    });
+})();
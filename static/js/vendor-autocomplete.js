@@ -0,0 +1,63 @@
+/*
+ * Vendor suggestions for inputs marked with data-vendor-autocomplete="<api url>".
+ * Matches are fetched as the user types and shown through a <datalist>.
+ */
+(function() {
+    'use strict';
+
+    const DEBOUNCE_MS = 150;
+
+    function attach(input) {
+        const datalist = document.createElement('datalist');
+        datalist.id = input.id + '-suggestions';
+        input.after(datalist);
+        input.setAttribute('list', datalist.id);
+
+        const answers = new Map();
+        let timer = null;
+        let controller = null;
+
+        function show(results) {
+            datalist.replaceChildren(...results.map(function(result) {
+                const option = document.createElement('option');
+                option.value = result.name;
+                return option;
+            }));
+        }
+
+        function lookup(query) {
+            if (answers.has(query)) {
+                show(answers.get(query));
+                return;
+            }
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            const url = input.dataset.vendorAutocomplete + '?q=' + encodeURIComponent(query);
+            fetch(url, {credentials: 'same-origin', signal: controller.signal})
+                .then(function(response) {
+                    return response.ok ? response.json() : {results: []};
+                })
+                .then(function(data) {
+                    answers.set(query, data.results);
+                    show(data.results);
+                })
+                .catch(function() {});
+        }
+
+        input.addEventListener('input', function() {
+            const query = input.value.trim();
+            clearTimeout(timer);
+            if (!query) {
+                show([]);
+                return;
+            }
+            timer = setTimeout(function() { lookup(query); }, DEBOUNCE_MS);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        document.querySelectorAll('input[data-vendor-autocomplete]').forEach(attach);
+    });
+})();